@@ -1,12 +1,14 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
 from datetime import datetime, timedelta
+from app.services.analytics.metrics import MetricsService
 from app.services.genesys.client import GenesysService
 from app.services.powerbi.client import PowerBIService
 
 router = APIRouter()
 genesys_service = GenesysService()
 powerbi_service = PowerBIService()
+metrics_service = MetricsService()
 
 @router.get("/dashboard/overview")
 async def get_dashboard_overview(
@@ -21,9 +23,9 @@ async def get_dashboard_overview(
     """
     try:
         if not start_date:
-            start_date = datetime.now() - timedelta(days=1)
+            start_date = datetime.utcnow() - timedelta(days=1)
         if not end_date:
-            end_date = datetime.now()
+            end_date = datetime.utcnow()
 
         interactions = await genesys_service.get_interactions(
             start_date=start_date,
@@ -33,20 +35,21 @@ async def get_dashboard_overview(
             channel_types=channel_types
         )
 
-        # Processar dados para o dashboard
+        # Processar dados para o dashboard (todos os KPIs em uma única passada)
+        overview = metrics_service.compute_overview(interactions)
         metrics = {
-            "total_customers": len(set(i["customer_id"] for i in interactions)),
-            "total_calls": len(interactions),
-            "answered_calls": len([i for i in interactions if i["status"] == "answered"]),
-            "service_level": calculate_service_level(interactions),
-            "average_handle_time": calculate_aht(interactions),
-            "average_wait_time": calculate_awt(interactions),
-            "average_talk_time": calculate_att(interactions),
-            "logged_in_agents": len(set(i["agent_id"] for i in interactions if i["agent_id"])),
-            "auto_service_interactions": len([i for i in interactions if i["type"] == "auto_service"]),
-            "top_reasons": get_top_reasons(interactions),
-            "callback_count": len([i for i in interactions if i["type"] == "callback"]),
-            "duplicate_channel_interactions": len([i for i in interactions if i["duplicate_channel"]])
+            "total_customers": overview["total_customers"],
+            "total_calls": overview["total_received_calls"],
+            "answered_calls": overview["total_answered_calls"],
+            "service_level": overview["service_level"],
+            "average_handle_time": overview["average_handle_time"],
+            "average_wait_time": overview["average_wait_time"],
+            "average_talk_time": overview["average_talk_time"],
+            "logged_in_agents": overview["logged_in_agents"],
+            "auto_service_interactions": overview["auto_service_interactions"],
+            "top_reasons": overview["top_reasons"],
+            "callback_count": overview["total_callbacks"],
+            "duplicate_channel_interactions": overview["duplicate_channel_interactions"]
         }
 
         return metrics
@@ -64,9 +67,9 @@ async def get_csat_analytics(
     """
     try:
         if not start_date:
-            start_date = datetime.now() - timedelta(days=30)
+            start_date = datetime.utcnow() - timedelta(days=30)
         if not end_date:
-            end_date = datetime.now()
+            end_date = datetime.utcnow()
 
         csat_data = await genesys_service.get_csat_scores(
             start_date=start_date,
@@ -93,9 +96,9 @@ async def get_hsm_analytics(
     """
     try:
         if not start_date:
-            start_date = datetime.now() - timedelta(days=30)
+            start_date = datetime.utcnow() - timedelta(days=30)
         if not end_date:
-            end_date = datetime.now()
+            end_date = datetime.utcnow()
 
         hsm_data = await genesys_service.get_hsm_metrics(
             start_date=start_date,
@@ -114,26 +117,6 @@ async def get_hsm_analytics(
         raise HTTPException(status_code=500, detail=str(e))
 
 # Funções auxiliares
-def calculate_service_level(interactions):
-    # Implementar cálculo de nível de serviço
-    pass
-
-def calculate_aht(interactions):
-    # Implementar cálculo de tempo médio de atendimento
-    pass
-
-def calculate_awt(interactions):
-    # Implementar cálculo de tempo médio de espera
-    pass
-
-def calculate_att(interactions):
-    # Implementar cálculo de tempo médio de conversação
-    pass
-
-def get_top_reasons(interactions):
-    # Implementar obtenção dos principais motivos
-    pass
-
 def calculate_average_csat(csat_data):
     # Implementar cálculo da média de CSAT
     pass
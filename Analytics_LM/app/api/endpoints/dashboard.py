@@ -1,54 +1,54 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import List, Optional, Dict
 from datetime import datetime, timedelta
-from app.services.genesys.client import GenesysService
+from app.services.storage.access import DataAccessService
+from app.services.storage.repository import InteractionRepository
 from app.services.analytics.metrics import MetricsService
+from app.services.analytics.parallel import ParallelAggregator
+from app.services.analytics.streaming import StreamingAggregator
 
 router = APIRouter()
-genesys_service = GenesysService()
+interaction_repository = InteractionRepository()
+data_access = DataAccessService()
 metrics_service = MetricsService()
+parallel_aggregator = ParallelAggregator()
 
 @router.get("/dashboard/overview")
 async def get_dashboard_overview(
+    response: Response,
     start_date: datetime = Query(default=None),
     end_date: datetime = Query(default=None),
     queue_ids: Optional[List[str]] = Query(default=None),
     team_ids: Optional[List[str]] = Query(default=None),
-    channel_types: Optional[List[str]] = Query(default=None)
+    channel_types: Optional[List[str]] = Query(default=None),
+    target_seconds: int = Query(default=20, ge=0),
+    targets: Optional[List[float]] = Query(default=None)
 ):
     """
-    Obtém dados para o dashboard principal (Tela Inicial)
+    Obtém dados para o dashboard principal (Tela Inicial). O nível de serviço usa
+    `target_seconds`; `targets` adiciona a curva de nível de serviço por tempo alvo.
     """
     try:
         if not start_date:
-            start_date = datetime.now() - timedelta(days=1)
+            start_date = datetime.utcnow() - timedelta(days=1)
         if not end_date:
-            end_date = datetime.now()
+            end_date = datetime.utcnow()
 
-        # Obter dados da Genesys
-        interactions = await genesys_service.get_interactions(
+        # Dados locais; serve o último resultado bom enquanto revalida
+        result = await data_access.get_interactions(
             start_date=start_date,
             end_date=end_date,
             queue_ids=queue_ids,
             team_ids=team_ids,
             channel_types=channel_types
         )
+        interactions = result.interactions
+        response.headers.update(data_access.freshness_headers(result))
 
-        # Calcular todas as métricas da Tela Inicial
-        metrics = {
-            "total_customers": metrics_service.get_total_customers(interactions),
-            "total_received_calls": metrics_service.get_total_received_calls(interactions),
-            "total_answered_calls": metrics_service.get_total_answered_calls(interactions),
-            "service_level": metrics_service.calculate_service_level(interactions),
-            "average_handle_time": metrics_service.calculate_aht(interactions),
-            "average_wait_time": metrics_service.calculate_awt(interactions),
-            "average_talk_time": metrics_service.calculate_att(interactions),
-            "logged_in_agents": metrics_service.get_logged_in_agents(interactions),
-            "auto_service_interactions": metrics_service.get_auto_service_interactions(interactions),
-            "top_reasons": metrics_service.get_top_reasons(interactions),
-            "total_callbacks": metrics_service.get_total_callbacks(interactions),
-            "duplicate_channel_interactions": metrics_service.get_duplicate_channel_interactions(interactions)
-        }
+        # Calcular todas as métricas da Tela Inicial em uma única passada, fora do event loop
+        # (janelas grandes são agregadas em paralelo por dia)
+        aggregate = await parallel_aggregator.aggregate(interactions, target_seconds=target_seconds)
+        metrics = aggregate.to_overview(targets=targets)
 
         return metrics
     except Exception as e:
@@ -56,86 +56,156 @@ async def get_dashboard_overview(
 
 @router.get("/dashboard/overview/volume_by_period")
 async def get_overview_volume_by_period(
+    response: Response,
     start_date: datetime = Query(default=None),
     end_date: datetime = Query(default=None),
     queue_ids: Optional[List[str]] = Query(default=None),
     channel_types: Optional[List[str]] = Query(default=None),
-    period: str = Query("H", regex="^(H|D)$")  # H para hora, D para dia
+    period: str = Query("H", regex="^(15min|H|D|W)$"),  # 15 minutos, hora, dia ou semana
+    tz: Optional[str] = Query(default=None)  # fuso dos buckets; padrão DASHBOARD_TIMEZONE
 ):
     """
     Obtém o volume de clientes e chamadas por período para a Tela Inicial.
     """
     try:
         if not start_date:
-            start_date = datetime.now() - timedelta(days=7)
+            start_date = datetime.utcnow() - timedelta(days=7)
         if not end_date:
-            end_date = datetime.now()
+            end_date = datetime.utcnow()
 
-        interactions = await genesys_service.get_interactions(
+        # Dados locais; serve o último resultado bom enquanto revalida
+        result = await data_access.get_interactions(
             start_date=start_date,
             end_date=end_date,
             queue_ids=queue_ids,
             channel_types=channel_types
         )
+        interactions = result.interactions
+        response.headers.update(data_access.freshness_headers(result))
 
-        volume_data = metrics_service.get_interactions_volume_by_period(interactions, period=period)
+        # O gráfico de TMA/TME reaproveita a mesma passada de buckets (mesmo batch do cache)
+        volume_data = metrics_service.get_interactions_volume_by_period(interactions, period=period, tz=tz)
         return volume_data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao obter volume por período: {str(e)}")
 
 @router.get("/dashboard/overview/tma_tme_by_period")
 async def get_overview_tma_tme_by_period(
+    response: Response,
     start_date: datetime = Query(default=None),
     end_date: datetime = Query(default=None),
     queue_ids: Optional[List[str]] = Query(default=None),
     channel_types: Optional[List[str]] = Query(default=None),
-    period: str = Query("H", regex="^(H|D)$")  # H para hora, D para dia
+    period: str = Query("H", regex="^(15min|H|D|W)$"),  # 15 minutos, hora, dia ou semana
+    tz: Optional[str] = Query(default=None)  # fuso dos buckets; padrão DASHBOARD_TIMEZONE
 ):
     """
     Obtém TMA e TME por período para a Tela Inicial.
     """
     try:
         if not start_date:
-            start_date = datetime.now() - timedelta(days=7)
+            start_date = datetime.utcnow() - timedelta(days=7)
         if not end_date:
-            end_date = datetime.now()
+            end_date = datetime.utcnow()
 
-        interactions = await genesys_service.get_interactions(
+        # Dados locais; serve o último resultado bom enquanto revalida
+        result = await data_access.get_interactions(
             start_date=start_date,
             end_date=end_date,
             queue_ids=queue_ids,
             channel_types=channel_types
         )
+        interactions = result.interactions
+        response.headers.update(data_access.freshness_headers(result))
 
-        tma_tme_data = metrics_service.get_tma_tme_by_period(interactions, period=period)
+        # O gráfico de volume reaproveita a mesma passada de buckets (mesmo batch do cache)
+        tma_tme_data = metrics_service.get_tma_tme_by_period(interactions, period=period, tz=tz)
         return tma_tme_data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao obter TMA e TME por período: {str(e)}")
 
+@router.get("/dashboard/report")
+async def get_dashboard_report(
+    start_date: datetime = Query(default=None),
+    end_date: datetime = Query(default=None),
+    queue_ids: Optional[List[str]] = Query(default=None),
+    channel_types: Optional[List[str]] = Query(default=None),
+    period: str = Query("D", regex="^(15min|H|D|W)$"),
+    tz: Optional[str] = Query(default=None),
+    target_seconds: int = Query(default=20, ge=0),
+    targets: Optional[List[float]] = Query(default=None)
+):
+    """
+    Relatório de períodos longos (ex.: trimestre): KPIs da Tela Inicial, séries por período
+    e desempenho por fila e por agente em uma única varredura em blocos do armazenamento
+    local, com memória proporcional ao bloco (STREAM_CHUNK_ROWS) e não ao período.
+    """
+    try:
+        if not start_date:
+            start_date = datetime.utcnow() - timedelta(days=90)
+        if not end_date:
+            end_date = datetime.utcnow()
+
+        chunks = interaction_repository.stream_interactions(
+            start_date=start_date,
+            end_date=end_date,
+            queue_ids=queue_ids,
+            channel_types=channel_types
+        )
+        report = await StreamingAggregator(target_seconds, period=period, tz=tz).consume(chunks)
+
+        csat_scores = await interaction_repository.get_csat_scores(start_date=start_date, end_date=end_date)
+        agent_csat = metrics_service.average_csat_by_agent(csat_scores, start_date, end_date)
+
+        return {
+            "overview": report.overview.to_overview(targets=targets),
+            "series": report.periods.series(),
+            "queues": [
+                metrics_service.build_queue_metrics(key, aggregate, start_date, target_seconds=target_seconds, targets=targets)
+                for key, aggregate in report.queues.items()
+            ],
+            "agents": [
+                metrics_service.build_agent_metrics(key, aggregate, start_date, csat_score=agent_csat.get(key, 0.0))
+                for key, aggregate in report.agents.items()
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao gerar relatório: {str(e)}")
+
 @router.get("/dashboard/csat")
 async def get_csat_dashboard(
+    response: Response,
     start_date: datetime = Query(default=None),
     end_date: datetime = Query(default=None),
     agent_id: Optional[str] = Query(default=None)
 ):
     """
-    Obtém dados para o dashboard de CSAT
+    Obtém dados para o dashboard de CSAT, com a nota média por fila e por canal
     """
     try:
         if not start_date:
-            start_date = datetime.now() - timedelta(days=30)
+            start_date = datetime.utcnow() - timedelta(days=30)
         if not end_date:
-            end_date = datetime.now()
+            end_date = datetime.utcnow()
 
-        # Obter dados da Genesys
-        csat_data = await genesys_service.get_csat_scores(
+        # Obter dados do armazenamento local
+        csat_data = await interaction_repository.get_csat_scores(
             start_date=start_date,
             end_date=end_date,
             agent_id=agent_id
         )
 
+        # Interações avaliadas, para quebrar as notas por fila e por canal
+        result = await data_access.get_interactions(
+            start_date=start_date,
+            end_date=end_date,
+            agent_ids=[agent_id] if agent_id else None
+        )
+        response.headers.update(data_access.freshness_headers(result))
+
         # Calcular métricas
         metrics = metrics_service.calculate_csat_metrics(csat_data)
+        metrics.update(metrics_service.calculate_csat_breakdown(result.interactions, csat_data))
 
         return metrics
     except Exception as e:
@@ -151,12 +221,12 @@ async def get_hsm_dashboard(
     """
     try:
         if not start_date:
-            start_date = datetime.now() - timedelta(days=30)
+            start_date = datetime.utcnow() - timedelta(days=30)
         if not end_date:
-            end_date = datetime.now()
+            end_date = datetime.utcnow()
 
-        # Obter dados da Genesys
-        hsm_data = await genesys_service.get_hsm_metrics(
+        # Obter dados do armazenamento local
+        hsm_data = await interaction_repository.get_hsm_messages(
             start_date=start_date,
             end_date=end_date
         )
@@ -179,12 +249,12 @@ async def get_speech_analytics_dashboard(
     """
     try:
         if not start_date:
-            start_date = datetime.now() - timedelta(days=30)
+            start_date = datetime.utcnow() - timedelta(days=30)
         if not end_date:
-            end_date = datetime.now()
+            end_date = datetime.utcnow()
 
-        # Obter dados da Genesys
-        speech_data = await genesys_service.get_speech_analytics(
+        # Obter dados do armazenamento local
+        speech_data = await interaction_repository.get_speech_analytics(
             start_date=start_date,
             end_date=end_date,
             topic=topic
@@ -207,6 +277,7 @@ async def get_speech_analytics_dashboard(
 
 @router.get("/dashboard/agent-performance")
 async def get_agent_performance_dashboard(
+    response: Response,
     start_date: datetime = Query(default=None),
     end_date: datetime = Query(default=None),
     agent_id: Optional[str] = Query(default=None)
@@ -216,63 +287,110 @@ async def get_agent_performance_dashboard(
     """
     try:
         if not start_date:
-            start_date = datetime.now() - timedelta(days=30)
+            start_date = datetime.utcnow() - timedelta(days=30)
         if not end_date:
-            end_date = datetime.now()
+            end_date = datetime.utcnow()
 
-        # Obter dados da Genesys
-        interactions = await genesys_service.get_interactions(
+        # Rollups diários materializados; só as bordas do período vêm das interações
+        result = await data_access.get_agent_aggregates(
             start_date=start_date,
             end_date=end_date,
             agent_ids=[agent_id] if agent_id else None
         )
+        response.headers.update(data_access.freshness_headers(result))
 
-        csat_scores = await genesys_service.get_csat_scores(
+        csat_scores = await interaction_repository.get_csat_scores(
             start_date=start_date,
             end_date=end_date,
             agent_id=agent_id
         )
+        agent_csat = metrics_service.average_csat_by_agent(csat_scores, start_date, end_date)
 
         # Calcular métricas
-        agent_metrics = metrics_service.calculate_agent_metrics(
-            interactions=interactions,
-            csat_scores=csat_scores,
-            start_date=start_date,
-            end_date=end_date
-        )
+        agent_metrics = [
+            metrics_service.build_agent_metrics(key, aggregate, start_date, csat_score=agent_csat.get(key, 0.0))
+            for key, aggregate in result.aggregates.items()
+        ]
 
         return agent_metrics
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/dashboard/concurrency")
+async def get_concurrency_dashboard(
+    response: Response,
+    start_date: datetime = Query(default=None),
+    end_date: datetime = Query(default=None),
+    group_by: str = Query("agent", regex="^(agent|queue)$"),
+    agent_ids: Optional[List[str]] = Query(default=None),
+    queue_ids: Optional[List[str]] = Query(default=None),
+    channel_types: Optional[List[str]] = Query(default=None),
+    period: str = Query("H", regex="^(15min|H|D|W)$"),  # 15 minutos, hora, dia ou semana
+    tz: Optional[str] = Query(default=None)  # fuso dos buckets; padrão DASHBOARD_TIMEZONE
+):
+    """
+    Obtém a concorrência (pico, média e ocupação por período) de agentes ou filas para o
+    dashboard de performance dos agentes
+    """
+    try:
+        if not start_date:
+            start_date = datetime.utcnow() - timedelta(days=7)
+        if not end_date:
+            end_date = datetime.utcnow()
+
+        # Dados locais; serve o último resultado bom enquanto revalida
+        result = await data_access.get_interactions(
+            start_date=start_date,
+            end_date=end_date,
+            queue_ids=queue_ids,
+            channel_types=channel_types,
+            agent_ids=agent_ids
+        )
+        response.headers.update(data_access.freshness_headers(result))
+
+        # Uma varredura de eventos ordenada por agente/fila, sem contagem minuto a minuto
+        concurrency_data = metrics_service.get_concurrency_by_period(
+            result.interactions,
+            column="agent_id" if group_by == "agent" else "queue_id",
+            period=period,
+            tz=tz
+        )
+        return concurrency_data
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao obter concorrência: {str(e)}")
+
 @router.get("/dashboard/queue-performance")
 async def get_queue_performance_dashboard(
+    response: Response,
     start_date: datetime = Query(default=None),
     end_date: datetime = Query(default=None),
-    queue_ids: Optional[List[str]] = Query(default=None)
+    queue_ids: Optional[List[str]] = Query(default=None),
+    target_seconds: int = Query(default=20, ge=0),
+    targets: Optional[List[float]] = Query(default=None)
 ):
     """
-    Obtém dados para o dashboard de performance das filas
+    Obtém dados para o dashboard de performance das filas. O nível de serviço usa
+    `target_seconds`; `targets` adiciona a curva de nível de serviço de cada fila.
     """
     try:
         if not start_date:
-            start_date = datetime.now() - timedelta(days=30)
+            start_date = datetime.utcnow() - timedelta(days=30)
         if not end_date:
-            end_date = datetime.now()
+            end_date = datetime.utcnow()
 
-        # Obter dados da Genesys
-        interactions = await genesys_service.get_interactions(
+        # Rollups diários e horários materializados; só as bordas do período vêm das interações
+        result = await data_access.get_queue_aggregates(
             start_date=start_date,
             end_date=end_date,
             queue_ids=queue_ids
         )
+        response.headers.update(data_access.freshness_headers(result))
 
         # Calcular métricas
-        queue_metrics = metrics_service.calculate_queue_metrics(
-            interactions=interactions,
-            start_date=start_date,
-            end_date=end_date
-        )
+        queue_metrics = [
+            metrics_service.build_queue_metrics(key, aggregate, start_date, target_seconds=target_seconds, targets=targets)
+            for key, aggregate in result.aggregates.items()
+        ]
 
         return queue_metrics
     except Exception as e:
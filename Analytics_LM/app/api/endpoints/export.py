@@ -4,10 +4,10 @@ from typing import List, Optional
 from datetime import datetime
 import os
 from app.services.analytics.export import ExportService
-from app.services.genesys.client import GenesysService
+from app.services.storage.repository import InteractionRepository
 
 router = APIRouter()
-genesys_service = GenesysService()
+interaction_repository = InteractionRepository()
 export_service = ExportService()
 
 @router.get("/export/interactions")
@@ -24,7 +24,7 @@ async def export_interactions(
     """
     try:
         # Obter dados
-        interactions = await genesys_service.get_interactions(
+        interactions = await interaction_repository.get_interactions(
             start_date=start_date,
             end_date=end_date,
             queue_ids=queue_ids,
@@ -67,7 +67,7 @@ async def export_csat(
     """
     try:
         # Obter dados
-        csat_data = await genesys_service.get_csat_scores(
+        csat_data = await interaction_repository.get_csat_scores(
             start_date=start_date,
             end_date=end_date,
             agent_id=agent_id
@@ -107,7 +107,7 @@ async def export_hsm(
     """
     try:
         # Obter dados
-        hsm_data = await genesys_service.get_hsm_metrics(
+        hsm_data = await interaction_repository.get_hsm_messages(
             start_date=start_date,
             end_date=end_date
         )
@@ -147,7 +147,7 @@ async def export_speech_analytics(
     """
     try:
         # Obter dados
-        speech_data = await genesys_service.get_speech_analytics(
+        speech_data = await interaction_repository.get_speech_analytics(
             start_date=start_date,
             end_date=end_date,
             topic=topic
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException, Query
+from datetime import datetime
+from app.services.storage.ingestion import IngestionService
+from app.services.storage.sync import SyncService
+
+router = APIRouter()
+ingestion_service = IngestionService()
+sync_service = SyncService()
+
+@router.post("/ingestion/run")
+async def run_ingestion(
+    start_date: datetime = Query(...),
+    end_date: datetime = Query(...)
+):
+    """
+    Carrega (ou recarrega) o período informado da Genesys para o armazenamento local
+    """
+    try:
+        ingested = await ingestion_service.ingest(start_date=start_date, end_date=end_date)
+        return {"message": "Ingestão concluída com sucesso", "ingested": ingested}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/ingestion/sync")
+async def run_incremental_sync():
+    """
+    Executa imediatamente uma sincronização incremental (a partir do watermark)
+    """
+    try:
+        return await sync_service.sync_once()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -2,11 +2,11 @@ from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional, Dict
 from datetime import datetime
 from app.services.powerbi.client import PowerBIService
-from app.services.genesys.client import GenesysService
+from app.services.storage.repository import InteractionRepository
 
 router = APIRouter()
 powerbi_service = PowerBIService()
-genesys_service = GenesysService()
+interaction_repository = InteractionRepository()
 
 @router.post("/powerbi/refresh")
 async def refresh_powerbi_dataset(
@@ -49,8 +49,8 @@ async def update_interactions_dataset(
     Atualiza o dataset de interações no Power BI
     """
     try:
-        # Obter dados da Genesys
-        interactions = await genesys_service.get_interactions(
+        # Obter dados do armazenamento local
+        interactions = await interaction_repository.get_interactions(
             start_date=start_date,
             end_date=end_date,
             queue_ids=queue_ids,
@@ -58,8 +58,8 @@ async def update_interactions_dataset(
             channel_types=channel_types
         )
         
-        # Atualizar dataset
-        success = await powerbi_service.update_dataset(dataset_id, interactions)
+        # Atualizar dataset (linhas convertidas do batch colunar)
+        success = await powerbi_service.update_dataset(dataset_id, interactions.to_records())
         if not success:
             raise HTTPException(status_code=500, detail="Falha ao atualizar dataset")
             
@@ -78,8 +78,8 @@ async def update_csat_dataset(
     Atualiza o dataset de CSAT no Power BI
     """
     try:
-        # Obter dados da Genesys
-        csat_data = await genesys_service.get_csat_scores(
+        # Obter dados do armazenamento local
+        csat_data = await interaction_repository.get_csat_scores(
             start_date=start_date,
             end_date=end_date,
             agent_id=agent_id
@@ -104,8 +104,8 @@ async def update_hsm_dataset(
     Atualiza o dataset de HSM no Power BI
     """
     try:
-        # Obter dados da Genesys
-        hsm_data = await genesys_service.get_hsm_metrics(
+        # Obter dados do armazenamento local
+        hsm_data = await interaction_repository.get_hsm_messages(
             start_date=start_date,
             end_date=end_date
         )
@@ -130,8 +130,8 @@ async def update_speech_analytics_dataset(
     Atualiza o dataset de Speech Analytics no Power BI
     """
     try:
-        # Obter dados da Genesys
-        speech_data = await genesys_service.get_speech_analytics(
+        # Obter dados do armazenamento local
+        speech_data = await interaction_repository.get_speech_analytics(
             start_date=start_date,
             end_date=end_date,
             topic=topic
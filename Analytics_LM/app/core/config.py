@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 import os
 from dotenv import load_dotenv
 
@@ -14,6 +14,32 @@ class Settings(BaseSettings):
     GENESYS_CLIENT_ID: str = os.getenv("GENESYS_CLIENT_ID")
     GENESYS_CLIENT_SECRET: str = os.getenv("GENESYS_CLIENT_SECRET")
     GENESYS_ENVIRONMENT: str = os.getenv("GENESYS_ENVIRONMENT")
+    # Hosts opcionais (ex.: servidor local de testes); por padrão derivados do GENESYS_ENVIRONMENT
+    GENESYS_API_HOST: str = os.getenv("GENESYS_API_HOST", "")
+    GENESYS_LOGIN_HOST: str = os.getenv("GENESYS_LOGIN_HOST", "")
+    
+    # Configurações do transporte HTTP da Genesys
+    GENESYS_MAX_CONNECTIONS: int = int(os.getenv("GENESYS_MAX_CONNECTIONS", "20"))
+    GENESYS_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("GENESYS_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    GENESYS_KEEPALIVE_EXPIRY: float = float(os.getenv("GENESYS_KEEPALIVE_EXPIRY", "30"))
+    GENESYS_MAX_CONCURRENCY: int = int(os.getenv("GENESYS_MAX_CONCURRENCY", "10"))
+    GENESYS_TIMEOUT: float = float(os.getenv("GENESYS_TIMEOUT", "30"))
+    # Limite de requisições da organização (token bucket) e concorrência adaptativa
+    GENESYS_RATE_LIMIT_PER_SECOND: float = float(os.getenv("GENESYS_RATE_LIMIT_PER_SECOND", "5"))
+    GENESYS_RATE_LIMIT_BURST: int = int(os.getenv("GENESYS_RATE_LIMIT_BURST", "10"))
+    GENESYS_MIN_CONCURRENCY: int = int(os.getenv("GENESYS_MIN_CONCURRENCY", "1"))
+    GENESYS_INITIAL_CONCURRENCY: int = int(os.getenv("GENESYS_INITIAL_CONCURRENCY", "4"))
+    GENESYS_MAX_RETRIES: int = int(os.getenv("GENESYS_MAX_RETRIES", "4"))
+    # Paginação da query de detalhes (máximo de 100 conversas por página na API)
+    GENESYS_PAGE_SIZE: int = int(os.getenv("GENESYS_PAGE_SIZE", "100"))
+    GENESYS_PAGE_FANOUT: int = int(os.getenv("GENESYS_PAGE_FANOUT", "4"))
+    # Divisão de intervalos longos em shards paralelos
+    GENESYS_EXPECTED_CONVERSATIONS_PER_HOUR: int = int(os.getenv("GENESYS_EXPECTED_CONVERSATIONS_PER_HOUR", "500"))
+    GENESYS_MAX_CONVERSATIONS_PER_SHARD: int = int(os.getenv("GENESYS_MAX_CONVERSATIONS_PER_SHARD", "2000"))
+    GENESYS_SHARD_FANOUT: int = int(os.getenv("GENESYS_SHARD_FANOUT", "4"))
+    # Disjuntor: falhas seguidas até abrir e tempo (s) até nova tentativa
+    GENESYS_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("GENESYS_BREAKER_FAILURE_THRESHOLD", "5"))
+    GENESYS_BREAKER_RESET_SECONDS: float = float(os.getenv("GENESYS_BREAKER_RESET_SECONDS", "30"))
     
     # Configurações do Power BI
     POWERBI_CLIENT_ID: str = os.getenv("POWERBI_CLIENT_ID")
@@ -29,7 +55,7 @@ class Settings(BaseSettings):
     ALLOWED_HOSTS: List[str] = os.getenv("ALLOWED_HOSTS", "localhost,127.0.0.1").split(",")
     
     # Configurações de Filas
-    QUEUES = {
+    QUEUES: Dict[str, str] = {
         "whatsapp_entrega": "Ativo - WhatsApp Gestão da Entrega",
         "whatsapp_marketplace": "Ativo WhatsApp Marketplace",
         "whatsapp_qualidade": "Ativo WhatsApp Qualidade",
@@ -46,7 +72,7 @@ class Settings(BaseSettings):
     }
     
     # Configurações de Autosserviço
-    AUTOSERVICE = [
+    AUTOSERVICE: List[str] = [
         "2° Via de nota Fiscal",
         "2° Via de boleto faturado",
         "Status de pedido",
@@ -60,6 +86,53 @@ class Settings(BaseSettings):
     # Configurações de Atualização
     UPDATE_INTERVAL: int = 60  # segundos
     
+    # Sincronização incremental com a Genesys
+    SYNC_ENABLED: bool = os.getenv("SYNC_ENABLED", "True").lower() == "true"
+    SYNC_INITIAL_LOOKBACK_HOURS: int = int(os.getenv("SYNC_INITIAL_LOOKBACK_HOURS", "24"))
+    SYNC_OVERLAP_MINUTES: int = int(os.getenv("SYNC_OVERLAP_MINUTES", "5"))
+    SYNC_OPEN_LOOKBACK_HOURS: int = int(os.getenv("SYNC_OPEN_LOOKBACK_HOURS", "48"))
+    
+    # Rollups materializados por fila/agente (queue_metrics / agent_metrics)
+    ROLLUPS_ENABLED: bool = os.getenv("ROLLUPS_ENABLED", "True").lower() == "true"
+    ROLLUP_INTERVAL: int = int(os.getenv("ROLLUP_INTERVAL", "60"))  # segundos
+    
+    # Agregação em paralelo (pool de processos) para janelas grandes
+    PARALLEL_WORKERS: int = int(os.getenv("PARALLEL_WORKERS", str(os.cpu_count() or 1)))
+    PARALLEL_MIN_ROWS: int = int(os.getenv("PARALLEL_MIN_ROWS", "250000"))
+    
+    # Agregação em blocos (streaming) do relatório de períodos longos
+    STREAM_CHUNK_ROWS: int = int(os.getenv("STREAM_CHUNK_ROWS", "50000"))
+    
+    # Rechamadas: novo contato do mesmo cliente até CALLBACK_WINDOW_HOURS após o anterior
+    # (em qualquer fila ou, com CALLBACK_SAME_QUEUE, só na mesma fila)
+    CALLBACK_WINDOW_HOURS: float = float(os.getenv("CALLBACK_WINDOW_HOURS", "72"))
+    CALLBACK_SAME_QUEUE: bool = os.getenv("CALLBACK_SAME_QUEUE", "False").lower() == "true"
+    # Duplicidade de canal: contato em outro canal (mediaType; WhatsApp = message) enquanto
+    # o anterior do mesmo cliente está aberto ou terminou há até DUPLICATE_CHANNEL_GAP_MINUTES
+    DUPLICATE_CHANNELS: List[str] = os.getenv("DUPLICATE_CHANNELS", "voice,message").split(",")
+    DUPLICATE_CHANNEL_GAP_MINUTES: float = float(os.getenv("DUPLICATE_CHANNEL_GAP_MINUTES", "10"))
+    
+    # Cache de interações por blocos de tempo
+    CACHE_BLOCK_MINUTES: int = int(os.getenv("CACHE_BLOCK_MINUTES", "60"))
+    CACHE_MAX_MB: int = int(os.getenv("CACHE_MAX_MB", "256"))
+    CACHE_OPEN_BLOCK_TTL: float = float(os.getenv("CACHE_OPEN_BLOCK_TTL", "30"))  # segundos
+    
+    # Stale-while-revalidate dos dashboards (segundos)
+    SWR_FRESH_TTL: float = float(os.getenv("SWR_FRESH_TTL", "15"))
+    SWR_MAX_STALE: float = float(os.getenv("SWR_MAX_STALE", "900"))
+    
+    # Fuso horário dos gráficos por período (buckets em hora local)
+    DASHBOARD_TIMEZONE: str = os.getenv("DASHBOARD_TIMEZONE", "America/Sao_Paulo")
+    
+    # Contagem de clientes distintos: exata até HLL_EXACT_LIMIT valores, depois HyperLogLog
+    # com 2**HLL_PRECISION registradores (12 = 4 KB por contador, erro padrão ~1,6%)
+    HLL_PRECISION: int = int(os.getenv("HLL_PRECISION", "12"))
+    HLL_EXACT_LIMIT: int = int(os.getenv("HLL_EXACT_LIMIT", "512"))
+    # Contadores do top-K de motivos (Space-Saving): exato até essa quantidade de motivos distintos
+    TOP_REASONS_CAPACITY: int = int(os.getenv("TOP_REASONS_CAPACITY", "200"))
+    # Erro relativo máximo dos percentis de espera/conversação/atendimento (DDSketch)
+    DDSKETCH_RELATIVE_ACCURACY: float = float(os.getenv("DDSKETCH_RELATIVE_ACCURACY", "0.01"))
+    
     class Config:
         case_sensitive = True
 
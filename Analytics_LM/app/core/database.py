@@ -0,0 +1,26 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.models.interaction import Base
+
+# SQLite precisa liberar o uso da conexão fora da thread que a criou (consultas rodam em threadpool)
+connect_args = {"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
+
+engine = create_engine(settings.DATABASE_URL, connect_args=connect_args, pool_pre_ping=True)
+SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
+
+def init_db():
+    """
+    Cria as tabelas que ainda não existem no banco local
+    """
+    Base.metadata.create_all(bind=engine)
+
+def get_db():
+    """
+    Fornece uma sessão do banco (para uso com Depends do FastAPI)
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,139 @@
+from typing import Any, Awaitable, Callable, Hashable, NamedTuple, Optional, Set
+from collections import OrderedDict
+from datetime import datetime
+import asyncio
+import logging
+import time
+from app.core.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(Exception):
+    """
+    Chamada recusada porque o circuito está aberto (upstream com falhas repetidas)
+    """
+
+class CircuitBreaker:
+    """
+    Disjuntor clássico: após `failure_threshold` falhas seguidas o circuito abre e as
+    chamadas falham imediatamente por `reset_timeout` segundos; depois disso uma única
+    chamada de teste (half-open) decide se o circuito fecha ou abre de novo.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def _before_call(self):
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._probe_in_flight):
+            raise CircuitOpenError(f"Circuito '{self.name}' aberto após {self.failures} falhas consecutivas")
+        if state == self.HALF_OPEN:
+            self._probe_in_flight = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Circuito '{self.name}' aberto após {self.failures} falhas consecutivas")
+            self.opened_at = time.monotonic()
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self._before_call()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._probe_in_flight = False
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+class CachedResult(NamedTuple):
+    value: Any
+    fetched_at: datetime  # UTC, sem fuso
+    stale: bool
+
+class _Entry(NamedTuple):
+    value: Any
+    fetched_at: datetime
+    loaded_at: float
+
+class StaleWhileRevalidate:
+    """
+    Serve o último resultado bom imediatamente: dentro de `fresh_ttl` ele é considerado
+    atual; até `max_stale` é devolvido como desatualizado enquanto uma atualização roda em
+    segundo plano. Se a carga falhar, o último resultado bom continua sendo servido.
+    """
+    def __init__(self, fresh_ttl: float, max_stale: float, max_entries: int = 256):
+        self.fresh_ttl = fresh_ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._flight = SingleFlight()
+        self._background: Set[asyncio.Task] = set()
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> _Entry:
+        async def run():
+            value = await loader()
+            entry = _Entry(value, datetime.utcnow(), time.monotonic())
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+        return await self._flight.do(key, run)
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        async def refresh():
+            try:
+                await self._load(key, loader)
+            except Exception as e:
+                logger.warning(f"Falha ao revalidar dados em segundo plano: {str(e)}")
+
+        task = asyncio.ensure_future(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> CachedResult:
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.loaded_at
+            if age < self.fresh_ttl:
+                return CachedResult(entry.value, entry.fetched_at, False)
+            if age < self.max_stale:
+                self._refresh_in_background(key, loader)
+                return CachedResult(entry.value, entry.fetched_at, True)
+
+        try:
+            entry = await self._load(key, loader)
+            return CachedResult(entry.value, entry.fetched_at, False)
+        except Exception:
+            # Sem atualização possível: o último resultado bom é melhor que um erro
+            if entry is not None:
+                return CachedResult(entry.value, entry.fetched_at, True)
+            raise
@@ -0,0 +1,40 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+import asyncio
+
+def normalize_filter(values: Optional[Iterable[str]]) -> tuple:
+    """
+    Normaliza listas de filtros para compor chaves (ordem e repetições não importam)
+    """
+    return tuple(sorted(set(values))) if values else ()
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes idênticas: enquanto uma busca com a mesma chave
+    estiver em andamento, os demais chamadores aguardam e recebem o mesmo resultado
+    (ou a mesma exceção) em vez de disparar uma nova busca.
+    """
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._in_flight[key] = future
+
+            def forget(done: asyncio.Future):
+                if self._in_flight.get(key) is done:
+                    del self._in_flight[key]
+                # Evita o aviso de exceção não lida quando todos os chamadores foram cancelados
+                if not done.cancelled():
+                    done.exception()
+
+            future.add_done_callback(forget)
+        else:
+            self.shared += 1
+
+        # shield: o cancelamento de um chamador não cancela a busca dos outros
+        return await asyncio.shield(future)
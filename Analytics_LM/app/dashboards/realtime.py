@@ -72,8 +72,10 @@ app.layout = html.Div([
             dcc.Dropdown(
                 id='period-agg-filter',
                 options=[
+                    {'label': 'Por 15 Minutos', 'value': '15min'},
                     {'label': 'Por Hora', 'value': 'H'},
-                    {'label': 'Por Dia', 'value': 'D'}
+                    {'label': 'Por Dia', 'value': 'D'},
+                    {'label': 'Por Semana', 'value': 'W'}
                 ],
                 value='H', # Valor inicial
                 clearable=False
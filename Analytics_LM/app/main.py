@@ -1,7 +1,14 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+import asyncio
 import uvicorn
+from app.core.config import settings
+from app.core.database import init_db
+from app.services.analytics.parallel import shutdown_pool
+from app.services.storage.rollups import RollupMaterializer
+from app.services.storage.sync import SyncService
+from app.services.genesys.transport import close_shared_transports
 
 app = FastAPI(
     title="Analytics Genesys Cloud",
@@ -21,6 +28,28 @@ app.add_middleware(
 # Montar diretórios estáticos
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+@app.on_event("startup")
+async def startup():
+    # Garante as tabelas do armazenamento local de interações
+    init_db()
+    # Sincronização incremental em segundo plano
+    if settings.SYNC_ENABLED:
+        app.state.sync_task = asyncio.create_task(SyncService().run_forever())
+    # Rollups por fila/agente materializados conforme as interações chegam
+    if settings.ROLLUPS_ENABLED:
+        app.state.rollup_task = asyncio.create_task(RollupMaterializer().run_forever())
+
+@app.on_event("shutdown")
+async def shutdown():
+    for name in ("sync_task", "rollup_task"):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
+    # Libera o pool de conexões HTTP da Genesys
+    await close_shared_transports()
+    # Encerra os workers da agregação em paralelo
+    shutdown_pool()
+
 @app.get("/")
 async def root():
     return {"message": "Bem-vindo à API de Analytics Genesys Cloud"}
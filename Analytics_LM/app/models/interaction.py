@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, ForeignKey, Index, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -7,12 +7,13 @@ Base = declarative_base()
 class Interaction(Base):
     __tablename__ = "interactions"
     
-    id = Column(String, primary_key=True)
+    id = Column(String, primary_key=True)  # conversa:sessão:segmento
+    conversation_id = Column(String, index=True)
     customer_id = Column(String, index=True)
     agent_id = Column(String, index=True)
     queue_id = Column(String, index=True)
     channel_type = Column(String)
-    start_time = Column(DateTime)
+    start_time = Column(DateTime, index=True)
     end_time = Column(DateTime)
     duration = Column(Integer)  # em segundos
     wait_time = Column(Integer)  # em segundos
@@ -27,11 +28,18 @@ class Interaction(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Consultas dos dashboards: período + fila/agente
+        Index("ix_interactions_queue_start", "queue_id", "start_time"),
+        Index("ix_interactions_agent_start", "agent_id", "start_time"),
+    )
+
 class CSAT(Base):
     __tablename__ = "csat_scores"
     
     id = Column(Integer, primary_key=True)
-    interaction_id = Column(String, ForeignKey("interactions.id"))
+    # conversationId avaliado (interactions.conversation_id); a pesquisa é da conversa, não de uma perna
+    interaction_id = Column(String, index=True)
     agent_id = Column(String, index=True)
     customer_id = Column(String, index=True)
     score = Column(Integer)
@@ -74,7 +82,9 @@ class AgentMetrics(Base):
     
     id = Column(Integer, primary_key=True)
     agent_id = Column(String, index=True)
-    date = Column(DateTime, index=True)
+    date = Column(DateTime, index=True)  # início do bucket (UTC) nos rollups
+    granularity = Column(String, nullable=True)  # rollups: "day"
+    channel_type = Column(String, nullable=True)
     total_interactions = Column(Integer)
     answered_interactions = Column(Integer)
     average_handle_time = Column(Float)
@@ -82,17 +92,42 @@ class AgentMetrics(Base):
     average_talk_time = Column(Float)
     service_level = Column(Float)
     csat_score = Column(Float)
+    percentiles = Column(JSON, nullable=True)  # p50/p90/p95/p99 de espera, conversação e atendimento
+    aggregate_state = Column(JSON, nullable=True)  # KPIAggregate.to_state(), combinável entre rollups
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_agent_metrics_granularity_date", "granularity", "date"),
+    )
+
 class QueueMetrics(Base):
     __tablename__ = "queue_metrics"
     
     id = Column(Integer, primary_key=True)
     queue_id = Column(String, index=True)
-    date = Column(DateTime, index=True)
+    date = Column(DateTime, index=True)  # início do bucket (UTC) nos rollups
+    granularity = Column(String, nullable=True)  # rollups: "hour" ou "day"
+    channel_type = Column(String, nullable=True)
     total_interactions = Column(Integer)
     answered_interactions = Column(Integer)
     abandoned_interactions = Column(Integer)
     average_wait_time = Column(Float)
     service_level = Column(Float)
-    created_at = Column(DateTime, default=datetime.utcnow) 
\ No newline at end of file
+    target_seconds = Column(Integer, default=20)  # tempo alvo do service_level
+    wait_histogram = Column(JSON, nullable=True)  # bins de espera (WaitHistogram.to_state)
+    service_level_curve = Column(JSON, nullable=True)  # nível de serviço por tempo alvo
+    percentiles = Column(JSON, nullable=True)  # p50/p90/p95/p99 de espera, conversação e atendimento
+    aggregate_state = Column(JSON, nullable=True)  # KPIAggregate.to_state(), combinável entre rollups
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_queue_metrics_granularity_date", "granularity", "date"),
+    )
+
+class SyncWatermark(Base):
+    __tablename__ = "sync_watermarks"
+    
+    source = Column(String, primary_key=True)  # ex.: genesys_interactions
+    last_conversation_end = Column(DateTime, nullable=True)  # maior fim de conversa já gravado
+    last_synced_at = Column(DateTime, nullable=True)  # fim da janela da última sincronização
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
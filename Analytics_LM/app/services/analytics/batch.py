@@ -0,0 +1,305 @@
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Colunas da tabela interactions usadas nas análises (sem os campos de auditoria)
+COLUMNS = (
+    "id", "conversation_id", "customer_id", "agent_id", "queue_id", "channel_type",
+    "start_time", "end_time", "duration", "wait_time", "talk_time", "status", "reason",
+    "is_auto_service", "auto_service_type", "is_callback", "callback_reason", "is_duplicate_channel"
+)
+STRING_COLUMNS = ("id", "conversation_id")
+CATEGORY_COLUMNS = (
+    "customer_id", "agent_id", "queue_id", "channel_type", "status", "reason",
+    "auto_service_type", "callback_reason"
+)
+TIME_COLUMNS = ("start_time", "end_time")
+NUMBER_COLUMNS = ("duration", "wait_time", "talk_time")
+FLAG_COLUMNS = ("is_auto_service", "is_callback", "is_duplicate_channel")
+
+# Estimativa de memória de uma string Python referenciada por uma coluna de objetos
+BYTES_PER_STRING = 80
+
+class InteractionRow(NamedTuple):
+    """
+    Linha leve (somente leitura) de um InteractionBatch, com os mesmos atributos de Interaction
+    """
+    id: Optional[str]
+    conversation_id: Optional[str]
+    customer_id: Optional[str]
+    agent_id: Optional[str]
+    queue_id: Optional[str]
+    channel_type: Optional[str]
+    start_time: Optional[datetime]
+    end_time: Optional[datetime]
+    duration: Optional[float]
+    wait_time: Optional[float]
+    talk_time: Optional[float]
+    status: Optional[str]
+    reason: Optional[str]
+    is_auto_service: bool
+    auto_service_type: Optional[str]
+    is_callback: bool
+    callback_reason: Optional[str]
+    is_duplicate_channel: bool
+
+class Categorical:
+    """
+    Coluna codificada por categoria: códigos int32 (-1 = vazio) que apontam para `categories`
+    """
+    __slots__ = ("codes", "categories")
+
+    def __init__(self, codes: np.ndarray, categories: np.ndarray):
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def encode(cls, values: Sequence) -> "Categorical":
+        codes, categories = pd.factorize(np.asarray(values, dtype=object))
+        return cls(codes.astype(np.int32), np.asarray(categories, dtype=object))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + len(self.categories) * (8 + BYTES_PER_STRING)
+
+    def decode(self) -> np.ndarray:
+        values = np.empty(len(self.codes), dtype=object)
+        valid = self.codes >= 0
+        values[valid] = self.categories[self.codes[valid]]
+        return values
+
+    def equals(self, value: Any) -> np.ndarray:
+        if value is None:
+            return self.codes < 0
+        matches = np.flatnonzero(self.categories == value)
+        if not matches.size:
+            return np.zeros(len(self.codes), dtype=bool)
+        return self.codes == matches[0]
+
+    def take(self, selector) -> "Categorical":
+        return Categorical(self.codes[selector], self.categories)
+
+    @staticmethod
+    def concat(parts: List["Categorical"]) -> "Categorical":
+        categories = parts[0].categories
+        if all(part.categories is categories for part in parts):
+            return Categorical(np.concatenate([part.codes for part in parts]), categories)
+
+        # Categorias diferentes: une os dicionários e recodifica cada parte
+        index = pd.Index(pd.unique(np.concatenate([part.categories for part in parts])))
+        codes = []
+        for part in parts:
+            if not len(part.categories):
+                codes.append(part.codes)
+                continue
+            mapping = index.get_indexer(part.categories).astype(np.int32)
+            codes.append(np.where(part.codes >= 0, mapping[part.codes], -1).astype(np.int32))
+        return Categorical(np.concatenate(codes), np.asarray(index, dtype=object))
+
+def _time_to_python(values: np.ndarray) -> List[Optional[datetime]]:
+    # datetime64 em microssegundos vira datetime (NaT vira None)
+    return values.astype("datetime64[us]").tolist()
+
+def _number_to_python(values: np.ndarray) -> List[Optional[float]]:
+    result = values.astype(object)
+    result[np.isnan(values)] = None
+    return result.tolist()
+
+class InteractionBatch:
+    """
+    Interações em formato colunar: arrays NumPy para tempos, durações e flags e colunas
+    categóricas (fila, agente, canal, status, motivo, cliente) codificadas em inteiros.
+    É o formato que o parser da Genesys e o repositório entregam e que as métricas,
+    exportações e o Power BI consomem, no lugar de listas de objetos ORM.
+    """
+    # __weakref__: resultados derivados podem ser memorizados enquanto o batch existir
+    __slots__ = ("_columns", "_size", "parts", "__weakref__")
+
+    def __init__(self, columns: Dict[str, Union[np.ndarray, Categorical]]):
+        self._columns = columns
+        self._size = len(columns["id"])
+        # Batches de que este foi costurado, em ordem (ex.: blocos do cache do repositório);
+        # vazio quando não é uma costura. Agregados combináveis podem ser memorizados por parte.
+        self.parts: Tuple["InteractionBatch", ...] = ()
+
+    # ------------------------------------------------------------------ construção
+
+    @classmethod
+    def from_columns(cls, values: Dict[str, Sequence]) -> "InteractionBatch":
+        columns: Dict[str, Union[np.ndarray, Categorical]] = {}
+        for name in STRING_COLUMNS:
+            column = np.empty(len(values[name]), dtype=object)
+            column[:] = values[name]
+            columns[name] = column
+        for name in CATEGORY_COLUMNS:
+            columns[name] = Categorical.encode(values[name])
+        for name in TIME_COLUMNS:
+            columns[name] = np.array(values[name], dtype="datetime64[ns]")
+        for name in NUMBER_COLUMNS:
+            columns[name] = np.array(values[name], dtype=np.float64)
+        for name in FLAG_COLUMNS:
+            columns[name] = np.array(values[name], dtype=bool)
+        return cls(columns)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "InteractionBatch":
+        """
+        Monta o batch a partir de dicionários (ex.: linhas geradas pelo parser)
+        """
+        records = records if isinstance(records, list) else list(records)
+        return cls.from_columns({name: [r.get(name) for r in records] for name in COLUMNS})
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence], columns: Sequence[str] = COLUMNS) -> "InteractionBatch":
+        """
+        Monta o batch a partir de tuplas na ordem de `columns` (ex.: resultado de um SELECT)
+        """
+        transposed = list(zip(*rows)) if rows else [()] * len(columns)
+        return cls.from_columns(dict(zip(columns, transposed)))
+
+    @classmethod
+    def empty(cls) -> "InteractionBatch":
+        return cls.from_columns({name: [] for name in COLUMNS})
+
+    @classmethod
+    def concat(cls, batches: List["InteractionBatch"]) -> "InteractionBatch":
+        batches = [b for b in batches if len(b)] or batches[:1]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+
+        columns: Dict[str, Union[np.ndarray, Categorical]] = {}
+        for name in COLUMNS:
+            if name in CATEGORY_COLUMNS:
+                columns[name] = Categorical.concat([b._columns[name] for b in batches])
+            else:
+                columns[name] = np.concatenate([b._columns[name] for b in batches])
+        return cls(columns)
+
+    # ------------------------------------------------------------------ acesso
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[InteractionRow]:
+        return (InteractionRow._make(values) for values in zip(*self._python_columns()))
+
+    @property
+    def nbytes(self) -> int:
+        total = 0
+        for name, column in self._columns.items():
+            total += column.nbytes
+            if name in STRING_COLUMNS:
+                total += len(column) * BYTES_PER_STRING
+        return total
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Valores da coluna (colunas categóricas são decodificadas)
+        """
+        column = self._columns[name]
+        return column.decode() if isinstance(column, Categorical) else column
+
+    def categorical(self, name: str) -> Categorical:
+        return self._columns[name]
+
+    def mask(self, name: str, value: Any) -> np.ndarray:
+        column = self._columns[name]
+        if isinstance(column, Categorical):
+            return column.equals(value)
+        return column == value
+
+    def take(self, selector) -> "InteractionBatch":
+        """
+        Subconjunto por máscara booleana, índices ou fatia
+        """
+        return InteractionBatch({
+            name: column.take(selector) if isinstance(column, Categorical) else column[selector]
+            for name, column in self._columns.items()
+        })
+
+    def with_columns(self, **columns: Union[np.ndarray, Categorical]) -> "InteractionBatch":
+        """
+        Mesmas linhas com colunas substituídas (ex.: flags calculadas); as demais são compartilhadas
+        """
+        return InteractionBatch({**self._columns, **columns})
+
+    def between(self, start_date: datetime, end_date: datetime, name: str = "start_time") -> "InteractionBatch":
+        values = self._columns[name]
+        return self.take((values >= np.datetime64(start_date)) & (values < np.datetime64(end_date)))
+
+    def sorted_by_time(self) -> "InteractionBatch":
+        start_times = self._columns["start_time"]
+        if self._size < 2 or not (start_times[1:] < start_times[:-1]).any():
+            return self
+        return self.take(np.argsort(start_times, kind="stable"))
+
+    def split_by_time(self, boundaries: Sequence[datetime]) -> List["InteractionBatch"]:
+        """
+        Divide um batch ordenado por start_time nas faixas [boundaries[i], boundaries[i + 1])
+        """
+        edges = np.searchsorted(
+            self._columns["start_time"],
+            np.array(boundaries, dtype="datetime64[ns]"),
+            side="left"
+        )
+        return [self.take(slice(edges[i], edges[i + 1])) for i in range(len(edges) - 1)]
+
+    def time_range(self, name: str = "start_time") -> Optional[Tuple[datetime, datetime]]:
+        values = self._columns[name]
+        values = values[~np.isnat(values)]
+        if not values.size:
+            return None
+        low, high = _time_to_python(np.array([values.min(), values.max()]))
+        return low, high
+
+    # ------------------------------------------------------------------ conversão
+
+    def _python_columns(self) -> List[List]:
+        columns = []
+        for name in COLUMNS:
+            column = self._columns[name]
+            if name in CATEGORY_COLUMNS:
+                columns.append(column.decode().tolist())
+            elif name in TIME_COLUMNS:
+                columns.append(_time_to_python(column))
+            elif name in NUMBER_COLUMNS:
+                columns.append(_number_to_python(column))
+            else:
+                columns.append(column.tolist())
+        return columns
+
+    def to_records(self) -> List[Dict]:
+        """
+        Linhas como dicionários com tipos Python (datetime, float, None), para gravação e APIs
+        """
+        return [dict(zip(COLUMNS, values)) for values in zip(*self._python_columns())]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        DataFrame sem cópia das colunas numéricas; as categóricas viram pandas.Categorical
+        """
+        data = {}
+        for name in COLUMNS:
+            column = self._columns[name]
+            if isinstance(column, Categorical):
+                data[name] = pd.Categorical.from_codes(column.codes, categories=pd.Index(column.categories, dtype=object))
+            else:
+                data[name] = column
+        return pd.DataFrame(data, copy=False)
+
+def as_batch(interactions: Union[InteractionBatch, Iterable[Any], None]) -> InteractionBatch:
+    """
+    Aceita um InteractionBatch ou uma sequência de Interaction / InteractionRow / dicionários
+    """
+    if isinstance(interactions, InteractionBatch):
+        return interactions
+    return InteractionBatch.from_records([
+        item if isinstance(item, dict) else {name: getattr(item, name, None) for name in COLUMNS}
+        for item in interactions or []
+    ])
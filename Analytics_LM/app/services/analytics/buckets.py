@@ -0,0 +1,71 @@
+from typing import NamedTuple, Optional
+import numpy as np
+import pandas as pd
+
+# Períodos aceitos pelos gráficos (largura fixa em hora local)
+PERIODS = {
+    "15min": np.timedelta64(15, "m"),
+    "H": np.timedelta64(1, "h"),
+    "D": np.timedelta64(1, "D"),
+    "W": np.timedelta64(7, "D"),
+}
+# 01/01/1970 foi uma quinta-feira: o deslocamento faz as semanas começarem na segunda
+WEEK_OFFSET = np.timedelta64(3, "D")
+
+class TimeBuckets(NamedTuple):
+    ids: np.ndarray     # bucket de cada linha (0 .. len(starts) - 1; -1 para início vazio)
+    starts: np.ndarray  # início de cada bucket em hora local (datetime64 sem fuso)
+
+def to_local(start_times: np.ndarray, tz: Optional[str]) -> np.ndarray:
+    """
+    Converte datetime64 em UTC sem fuso para a hora local de `tz` (também sem fuso)
+    """
+    if not tz or tz == "UTC":
+        return start_times
+    return pd.DatetimeIndex(start_times).tz_localize("UTC").tz_convert(tz).tz_localize(None).values
+
+def bucketize(start_times: np.ndarray, period: str, tz: Optional[str] = None) -> TimeBuckets:
+    """
+    Atribui um id inteiro de bucket a cada linha com divisão inteira sobre o relógio local
+    em nanossegundos. Os ids são contíguos do primeiro ao último bucket com dados (buckets
+    vazios no meio também aparecem, como no resample do pandas), prontos para np.bincount.
+    """
+    if period not in PERIODS:
+        raise ValueError("Período inválido. Use '15min', 'H', 'D' ou 'W'.")
+
+    width = PERIODS[period].astype("timedelta64[ns]").astype(np.int64)
+    offset = WEEK_OFFSET.astype("timedelta64[ns]").astype(np.int64) if period == "W" else 0
+
+    start_times = np.asarray(start_times, dtype="datetime64[ns]")
+    valid = ~np.isnat(start_times)
+    ids = np.full(len(start_times), -1, dtype=np.int64)
+    if not valid.any():
+        return TimeBuckets(ids, np.array([], dtype="datetime64[ns]"))
+
+    local = to_local(start_times[valid], tz).astype("datetime64[ns]").astype(np.int64)
+    raw = (local + offset) // width
+    first = raw.min()
+    ids[valid] = raw - first
+
+    starts = ((first + np.arange(raw.max() - first + 1)) * width - offset).astype("datetime64[ns]")
+    return TimeBuckets(ids, starts)
+
+def bucket_mean(ids: np.ndarray, values: np.ndarray, n_buckets: int) -> np.ndarray:
+    """
+    Média por bucket ignorando valores vazios (NaN); bucket sem valores vale 0
+    """
+    present = ~np.isnan(values)
+    sums = np.bincount(ids[present], weights=values[present], minlength=n_buckets)
+    counts = np.bincount(ids[present], minlength=n_buckets)
+    return np.divide(sums, counts, out=np.zeros(n_buckets), where=counts > 0)
+
+def bucket_distinct(ids: np.ndarray, codes: np.ndarray, n_buckets: int) -> np.ndarray:
+    """
+    Quantidade de códigos distintos (>= 0) por bucket, via pares (bucket, código) únicos
+    """
+    present = (ids >= 0) & (codes >= 0)
+    if not present.any():
+        return np.zeros(n_buckets, dtype=np.int64)
+    stride = int(codes.max()) + 1
+    pairs = np.unique(ids[present] * stride + codes[present])
+    return np.bincount(pairs // stride, minlength=n_buckets)
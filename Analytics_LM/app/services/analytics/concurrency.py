@@ -0,0 +1,147 @@
+from typing import Dict, List, NamedTuple, Optional
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.buckets import PERIODS, bucketize, to_local
+from app.services.analytics.sketches import hash_values
+
+class ConcurrencyCurves(NamedTuple):
+    keys: List[Optional[str]]  # agente ou fila de cada linha das matrizes
+    timestamps: List[str]      # início de cada bucket em hora local
+    peak: np.ndarray           # (entidades, buckets): máximo de interações abertas ao mesmo tempo
+    average: np.ndarray        # média de interações abertas no bucket (integral / largura)
+    occupancy: np.ndarray      # fração do bucket com pelo menos uma interação aberta
+
+def _intervals(batch: InteractionBatch, column: str, answered_only: bool):
+    """
+    Intervalos [início, fim) por (entidade, conversa): as sessões da mesma conversa para o
+    mesmo agente/fila (ex.: transferência de volta) são unidas, ordenadas pelo início, e as
+    que se sobrepõem viram um só intervalo; a conversa não conta em dobro e nenhuma sessão
+    se perde
+    """
+    codes = batch.categorical(column).codes.astype(np.int64)
+    start_times, end_times = batch.column("start_time"), batch.column("end_time")
+    valid = (codes >= 0) & ~np.isnat(start_times) & ~np.isnat(end_times) & (end_times > start_times)
+    if answered_only:
+        valid &= batch.mask("status", "answered")
+    rows = np.flatnonzero(valid)
+    conversations = hash_values(batch.column("conversation_id")[rows])
+    order = np.lexsort((start_times[rows], conversations, codes[rows]))
+    rows, conversations = rows[order], conversations[order]
+    codes, start_times, end_times = codes[rows], start_times[rows].astype(np.int64), end_times[rows].astype(np.int64)
+
+    new_pair = np.ones(len(rows), dtype=bool)
+    new_pair[1:] = (codes[1:] != codes[:-1]) | (conversations[1:] != conversations[:-1])
+    # Maior fim das sessões anteriores do mesmo par: começar depois dele abre outro intervalo
+    pairs = pd.Series(np.cumsum(new_pair))
+    never = np.iinfo(np.int64).min
+    previous_end = pd.Series(end_times).groupby(pairs).cummax().groupby(pairs).shift(1, fill_value=never).to_numpy()
+    first = np.flatnonzero(new_pair | (start_times > previous_end))
+    merged_end = np.maximum.reduceat(end_times, first) if len(first) else end_times
+    return codes[first], start_times[first].astype("datetime64[ns]"), merged_end.astype("datetime64[ns]")
+
+def concurrency_curves(
+    batch: InteractionBatch,
+    column: str = "agent_id",
+    period: str = "H",
+    tz: Optional[str] = None,
+    answered_only: bool = True
+) -> ConcurrencyCurves:
+    """
+    Curvas de concorrência por agente ou fila com uma varredura de eventos: cada intervalo
+    vira +1 no início e -1 no fim; ordenados por (entidade, tempo), a soma acumulada dá o
+    nível de concorrência após cada evento (O(n log n) pela ordenação). Os trechos entre
+    eventos consecutivos são distribuídos nos buckets (hora local de `tz`) com arrays de
+    diferenças, sem contar minuto a minuto.
+    """
+    tz = tz or settings.DASHBOARD_TIMEZONE
+    categories = batch.categorical(column).categories
+    codes, start_times, end_times = _intervals(batch, column, answered_only)
+    if not len(codes):
+        empty = np.zeros((0, 0))
+        return ConcurrencyCurves([], [], empty, empty, empty)
+
+    # Entidades presentes, na ordem dos códigos
+    entities, entity = np.unique(codes, return_inverse=True)
+    n_entities = len(entities)
+    width = int(PERIODS[period].astype("timedelta64[ns]").astype(np.int64))
+
+    # Eventos em hora local; no mesmo instante o fim (-1) vem antes do início (+1)
+    buckets = bucketize(np.concatenate([start_times, end_times]), period, tz)
+    grid = buckets.starts.astype(np.int64)
+    n_buckets = len(grid)
+    times = to_local(np.concatenate([start_times, end_times]), tz).astype("datetime64[ns]").astype(np.int64)
+    delta = np.concatenate([np.ones(len(codes), dtype=np.int64), -np.ones(len(codes), dtype=np.int64)])
+    owner = np.concatenate([entity, entity])
+    order = np.lexsort((delta, times, owner))
+    times, delta, owner, bucket = times[order], delta[order], owner[order], buckets.ids[order]
+    # Os eventos de cada entidade somam zero: a soma acumulada global é o nível por entidade
+    level = np.cumsum(delta)
+
+    # Vários eventos no mesmo instante: só vale o nível após o último deles
+    settled = np.ones(len(times), dtype=bool)
+    settled[:-1] = (owner[:-1] != owner[1:]) | (times[:-1] != times[1:])
+    peak = np.zeros(n_entities * n_buckets, dtype=np.int64)
+    np.maximum.at(peak, owner[settled] * n_buckets + bucket[settled], level[settled])
+
+    # Trechos [t_k, t_k+1) com nível > 0 entre eventos consecutivos da mesma entidade
+    segment = np.flatnonzero((owner[:-1] == owner[1:]) & (level[:-1] > 0))
+    row = owner[segment]
+    first, last = bucket[segment], bucket[segment + 1]
+    t0, t1 = times[segment], times[segment + 1]
+    value = level[segment].astype(np.float64)
+
+    area = np.zeros(n_entities * n_buckets)
+    busy = np.zeros(n_entities * n_buckets)
+    # Nível que atravessa buckets inteiros e nível em vigor no início de cada bucket
+    full = np.zeros((n_entities, n_buckets + 1))
+    carried = np.zeros((n_entities, n_buckets + 1), dtype=np.int64)
+
+    same = first == last
+    np.add.at(area, row[same] * n_buckets + first[same], value[same] * (t1[same] - t0[same]))
+    np.add.at(busy, row[same] * n_buckets + first[same], (t1[same] - t0[same]).astype(np.float64))
+
+    spans = ~same
+    row, first, last, t0, t1, value = row[spans], first[spans], last[spans], t0[spans], t1[spans], value[spans]
+    head = (grid[first] + width - t0).astype(np.float64)
+    tail = (t1 - grid[last]).astype(np.float64)
+    np.add.at(area, row * n_buckets + first, value * head)
+    np.add.at(area, row * n_buckets + last, value * tail)
+    np.add.at(busy, row * n_buckets + first, head)
+    np.add.at(busy, row * n_buckets + last, tail)
+    np.add.at(full, (row, first + 1), value)
+    np.add.at(full, (row, last), -value)
+    np.add.at(carried, (row, first + 1), value.astype(np.int64))
+    np.add.at(carried, (row, last + (tail > 0)), -value.astype(np.int64))
+
+    full = np.cumsum(full, axis=1)[:, :n_buckets]
+    area = area.reshape(n_entities, n_buckets) + full * width
+    busy = busy.reshape(n_entities, n_buckets) + (full > 0) * width
+    peak = np.maximum(peak.reshape(n_entities, n_buckets), np.cumsum(carried, axis=1)[:, :n_buckets])
+
+    return ConcurrencyCurves(
+        keys=categories[entities].tolist(),
+        timestamps=pd.DatetimeIndex(buckets.starts).strftime('%Y-%m-%d %H:%M:%S').tolist(),
+        peak=peak,
+        average=area / width,
+        occupancy=busy / width
+    )
+
+def concurrency_summary(curves: ConcurrencyCurves) -> Dict[Optional[str], Dict]:
+    """
+    Por entidade: pico de concorrência no período, concorrência média enquanto ocupado
+    (interações simultâneas em média quando há pelo menos uma aberta) e ocupação: fração
+    do tempo ocupado nos buckets em que a entidade teve alguma interação aberta
+    """
+    summary = {}
+    for index, key in enumerate(curves.keys):
+        busy = curves.occupancy[index]
+        active = np.count_nonzero(busy)
+        busy_total = float(busy.sum())
+        summary[key] = {
+            "peak_concurrency": int(curves.peak[index].max()) if curves.peak.shape[1] else 0,
+            "average_concurrency": float(curves.average[index].sum() / busy_total) if busy_total else 0.0,
+            "occupancy": float(busy_total / active) if active else 0.0
+        }
+    return summary
@@ -0,0 +1,104 @@
+from typing import NamedTuple, Sequence
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from app.services.analytics.batch import Categorical, InteractionBatch
+from app.services.analytics.sketches import hash_values
+
+class RepeatContacts(NamedTuple):
+    is_callback: np.ndarray       # uma flag por linha do batch
+    callback_reason: Categorical  # motivo do contato anterior (vazio quando não é rechamada)
+
+def _contacts(batch: InteractionBatch, group: np.ndarray):
+    """
+    Ordena as linhas válidas por (grupo, início, conversa, id) e numera os contatos: linhas
+    da mesma conversa (transferências) formam um único contato. Conversa e id entram como
+    hash, para o resultado não depender da ordem em que as linhas chegaram.
+    Devolve a ordem das linhas, o contato de cada linha ordenada e a primeira de cada contato.
+    """
+    start_times = batch.column("start_time")
+    conversations = hash_values(batch.column("conversation_id"))
+    rows = np.flatnonzero((group >= 0) & ~np.isnat(start_times))
+    starts = start_times[rows].astype(np.int64)
+    ids = hash_values(batch.column("id")[rows])
+    order = rows[np.lexsort((ids, conversations[rows], starts, group[rows]))]
+
+    sorted_group, sorted_conversation = group[order], conversations[order]
+    new_contact = np.ones(len(order), dtype=bool)
+    new_contact[1:] = (sorted_group[1:] != sorted_group[:-1]) | (sorted_conversation[1:] != sorted_conversation[:-1])
+    return order, np.cumsum(new_contact) - 1, np.flatnonzero(new_contact)
+
+def detect_repeat_contacts(batch: InteractionBatch, window: timedelta, same_queue: bool = False) -> RepeatContacts:
+    """
+    Rechamadas: contato de um cliente que começa até `window` depois do início do contato
+    anterior do mesmo cliente (na mesma fila, com `same_queue`). Com as linhas ordenadas por
+    cliente e início, basta comparar cada contato com o anterior (O(n log n), sem pares).
+    """
+    reasons = batch.categorical("reason")
+    is_callback = np.zeros(len(batch), dtype=bool)
+    reason_codes = np.full(len(batch), -1, dtype=np.int32)
+
+    group = batch.categorical("customer_id").codes.astype(np.int64)
+    if same_queue:
+        queues = batch.categorical("queue_id")
+        group = np.where(group >= 0, group * (len(queues.categories) + 1) + queues.codes + 1, -1)
+    order, contact, first = _contacts(batch, group)
+    if not len(order):
+        return RepeatContacts(is_callback, Categorical(reason_codes, reasons.categories))
+
+    first_rows = order[first]
+    contact_group = group[first_rows]
+    contact_start = batch.column("start_time")[first_rows].astype(np.int64)
+    window_ns = int(window.total_seconds() * 1e9)
+    repeated = np.zeros(len(first), dtype=bool)
+    repeated[1:] = (contact_group[1:] == contact_group[:-1]) & (contact_start[1:] - contact_start[:-1] <= window_ns)
+    previous_reason = np.full(len(first), -1, dtype=np.int32)
+    previous_reason[1:] = reasons.codes[first_rows[:-1]]
+
+    is_callback[order] = repeated[contact]
+    reason_codes[order] = np.where(repeated[contact], previous_reason[contact], -1)
+    return RepeatContacts(is_callback, Categorical(reason_codes, reasons.categories))
+
+def detect_duplicate_channels(batch: InteractionBatch, gap: timedelta, channels: Sequence[str]) -> np.ndarray:
+    """
+    Duplicidade de canal: contato de um cliente que começa enquanto outro contato dele em
+    outro canal (entre `channels`, ex.: voz e WhatsApp) ainda está aberto ou terminou há no
+    máximo `gap`. O fim de um contato é o maior fim entre as suas pernas (transferências) e
+    um contato sem fim segue aberto. Varredura ordenada por cliente e início: para cada
+    canal, o maior fim entre os contatos anteriores do cliente (máximo acumulado por grupo)
+    decide a sobreposição, sem comparar pares. Só o contato que começou depois é marcado.
+    """
+    is_duplicate = np.zeros(len(batch), dtype=bool)
+    channel_column = batch.categorical("channel_type")
+    channels = {channel.lower() for channel in channels}
+    # Última posição: canal vazio (código -1), nunca considerado
+    considered = np.array([str(name).lower() in channels for name in channel_column.categories] + [False])
+    row_channel = np.where(considered[channel_column.codes], channel_column.codes, -1).astype(np.int64)
+
+    group = np.where(row_channel >= 0, batch.categorical("customer_id").codes.astype(np.int64), -1)
+    order, contact, first = _contacts(batch, group)
+    if not len(order):
+        return is_duplicate
+
+    first_rows = order[first]
+    contact_group = group[first_rows]
+    contact_channel = row_channel[first_rows]
+    contact_start = batch.column("start_time")[first_rows].astype(np.int64)
+    # Fim do contato: maior fim entre as pernas; perna sem fim (ainda aberta) nunca termina
+    end_times = batch.column("end_time")[order]
+    open_ended = np.iinfo(np.int64).max
+    contact_end = np.maximum.reduceat(np.where(np.isnat(end_times), open_ended, end_times.astype(np.int64)), first)
+    gap_ns = int(gap.total_seconds() * 1e9)
+
+    never = np.iinfo(np.int64).min
+    duplicate = np.zeros(len(first), dtype=bool)
+    groups = pd.Series(contact_group)
+    for channel in np.unique(contact_channel):
+        # Maior fim dos contatos anteriores do cliente neste canal (exclui o próprio contato)
+        ends = pd.Series(np.where(contact_channel == channel, contact_end, never))
+        previous_end = ends.groupby(groups).shift(1, fill_value=never).groupby(groups).cummax().to_numpy()
+        # O gap sai do início: somado a um fim em aberto estouraria o int64
+        duplicate |= (contact_channel != channel) & (previous_end > never) & (previous_end >= contact_start - gap_ns)
+
+    is_duplicate[order] = duplicate[contact]
+    return is_duplicate
@@ -0,0 +1,94 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from app.models.interaction import CSAT
+from app.services.analytics.batch import InteractionBatch
+
+class CSATIndex:
+    """
+    Índice das pesquisas CSAT montado uma vez por requisição: pesquisas ordenadas por
+    (agente, created_at) com somas acumuladas das notas, de modo que a média de cada agente
+    em qualquer janela sai de duas buscas binárias, e um hash de interaction_id (o
+    conversationId avaliado) para cruzar as pesquisas com as interações (notas por fila e
+    por canal).
+    """
+    def __init__(self, csat_scores: List[CSAT]):
+        csat_scores = [s for s in csat_scores or [] if s.score is not None and s.created_at is not None]
+        agent_codes, self.agents = pd.factorize(np.array([s.agent_id for s in csat_scores], dtype=object))
+        created_at = np.array([s.created_at for s in csat_scores], dtype="datetime64[ns]")
+        scores = np.array([s.score for s in csat_scores], dtype=np.float64)
+
+        # Ordena por agente e, dentro do agente, por data (pesquisas sem agente ficam de fora)
+        order = np.lexsort((created_at, agent_codes))
+        order = order[agent_codes[order] >= 0]
+        self._created_at = created_at[order]
+        self._cumulative = np.concatenate(([0.0], np.cumsum(scores[order])))
+        self._bounds = np.searchsorted(agent_codes[order], np.arange(len(self.agents) + 1), side="left")
+
+        # Junção por conversa: uma linha por pesquisa com interaction_id (conversationId)
+        linked = np.array([s.interaction_id is not None for s in csat_scores], dtype=bool)
+        self._interaction_ids = pd.Index(np.array([s.interaction_id for s in csat_scores], dtype=object)[linked])
+        self._linked_scores = scores[linked]
+
+    def __len__(self) -> int:
+        return int(self._bounds[-1]) if len(self._bounds) else 0
+
+    def agent_averages(self, start_date: datetime, end_date: datetime) -> Dict[str, float]:
+        """
+        Nota média de cada agente com pesquisas em [start_date, end_date]
+        """
+        start, end = np.datetime64(start_date, "ns"), np.datetime64(end_date, "ns")
+        averages = {}
+        for code, agent_id in enumerate(self.agents):
+            low, high = self._bounds[code], self._bounds[code + 1]
+            times = self._created_at[low:high]
+            first = low + np.searchsorted(times, start, side="left")
+            last = low + np.searchsorted(times, end, side="right")
+            if last > first:
+                averages[agent_id] = float((self._cumulative[last] - self._cumulative[first]) / (last - first))
+        return averages
+
+    @staticmethod
+    def _conversation_rows(interactions: InteractionBatch):
+        """
+        Uma linha por conversa, a que recebe a nota: a última perna atendida (a que encerrou
+        o atendimento depois de transferências) ou, sem perna atendida, a última perna.
+        Devolve o índice dos conversationIds e a linha escolhida de cada um.
+        """
+        codes, conversations = pd.factorize(np.asarray(interactions.column("conversation_id"), dtype=object))
+        answered = interactions.mask("status", "answered")
+        # Início vazio (NaT) ordena antes de qualquer início válido
+        start_times = interactions.column("start_time").astype(np.int64)
+        order = np.lexsort((start_times, answered, codes))
+        order = order[codes[order] >= 0]
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = codes[order][:-1] != codes[order][1:]
+        rows = order[last]
+        return pd.Index(conversations[codes[rows]]), rows
+
+    def breakdown(self, interactions: InteractionBatch, column: str) -> Dict[Optional[str], Dict]:
+        """
+        Nota média e quantidade de pesquisas por valor de uma coluna categórica das
+        conversas avaliadas (ex.: queue_id, channel_type); conversas com várias pernas são
+        atribuídas à última perna atendida
+        """
+        if not len(self._interaction_ids) or not len(interactions):
+            return {}
+        conversations, conversation_rows = self._conversation_rows(interactions)
+        positions = conversations.get_indexer(self._interaction_ids)
+        matched = positions >= 0
+        rows = conversation_rows[positions[matched]]
+        categorical = interactions.categorical(column)
+        # Código 0 = interação sem valor na coluna
+        codes = categorical.codes[rows].astype(np.int64) + 1
+        n_groups = len(categorical.categories) + 1
+        counts = np.bincount(codes, minlength=n_groups)
+        sums = np.bincount(codes, weights=self._linked_scores[matched], minlength=n_groups)
+        return {
+            None if code == 0 else categorical.categories[code - 1]: {
+                "average_score": float(sums[code] / counts[code]),
+                "total_evaluations": int(counts[code])
+            }
+            for code in np.flatnonzero(counts)
+        }
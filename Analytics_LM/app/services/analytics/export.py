@@ -1,35 +1,41 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 from datetime import datetime
 import pandas as pd
 import json
 from app.models.interaction import Interaction, CSAT, HSM, SpeechAnalytics, AgentMetrics, QueueMetrics
+from app.services.analytics.batch import InteractionBatch, as_batch
+
+# Colunas da planilha de interações (coluna do batch -> título)
+INTERACTION_EXPORT_COLUMNS = {
+    "id": "ID",
+    "start_time": "Data",
+    "queue_id": "Fila",
+    "customer_id": "Cliente",
+    "agent_id": "Operador",
+    "channel_type": "Canal",
+    "duration": "Duração",
+    "wait_time": "Tempo de Espera",
+    "talk_time": "Tempo de Conversação",
+    "status": "Status",
+    "is_auto_service": "Auto Serviço",
+    "auto_service_type": "Tipo Auto Serviço",
+    "is_callback": "Rechamada",
+    "callback_reason": "Motivo Rechamada",
+    "is_duplicate_channel": "Canal Duplicado"
+}
 
 class ExportService:
     @staticmethod
     def export_interactions_to_excel(
-        interactions: List[Interaction],
+        interactions: Union[InteractionBatch, List[Interaction]],
         output_path: str
     ) -> str:
         """
         Exporta interações para Excel
         """
-        df = pd.DataFrame([{
-            "ID": i.id,
-            "Data": i.start_time,
-            "Fila": i.queue_id,
-            "Cliente": i.customer_id,
-            "Operador": i.agent_id,
-            "Canal": i.channel_type,
-            "Duração": i.duration,
-            "Tempo de Espera": i.wait_time,
-            "Tempo de Conversação": i.talk_time,
-            "Status": i.status,
-            "Auto Serviço": i.is_auto_service,
-            "Tipo Auto Serviço": i.auto_service_type,
-            "Rechamada": i.is_callback,
-            "Motivo Rechamada": i.callback_reason,
-            "Canal Duplicado": i.is_duplicate_channel
-        } for i in interactions])
+        # Monta a planilha direto das colunas do batch, sem passar por objetos linha a linha
+        df = as_batch(interactions).to_dataframe()[list(INTERACTION_EXPORT_COLUMNS)]
+        df = df.rename(columns=INTERACTION_EXPORT_COLUMNS)
         
         df.to_excel(output_path, index=False)
         return output_path
@@ -153,24 +159,26 @@ class ExportService:
 
     @staticmethod
     def export_to_json(
-        data: List[Dict],
+        data: Union[List[Dict], InteractionBatch],
         output_path: str
     ) -> str:
         """
         Exporta dados para JSON
         """
+        if isinstance(data, InteractionBatch):
+            data = data.to_records()
         with open(output_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2, default=str)
         return output_path
 
     @staticmethod
     def export_to_csv(
-        data: List[Dict],
+        data: Union[List[Dict], InteractionBatch],
         output_path: str
     ) -> str:
         """
         Exporta dados para CSV
         """
-        df = pd.DataFrame(data)
+        df = data.to_dataframe() if isinstance(data, InteractionBatch) else pd.DataFrame(data)
         df.to_csv(output_path, index=False)
         return output_path 
\ No newline at end of file
@@ -1,216 +1,568 @@
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Iterable, Optional, Sequence, Set, Tuple, Union
 from datetime import datetime, timedelta
+import weakref
 import pandas as pd
 import numpy as np
+from app.core.config import settings
 from app.models.interaction import Interaction, CSAT, HSM, SpeechAnalytics, AgentMetrics, QueueMetrics
+from app.services.analytics.batch import Categorical, InteractionBatch, as_batch
+from app.services.analytics.buckets import bucket_distinct, bucket_mean, bucketize
+from app.services.analytics.concurrency import concurrency_curves, concurrency_summary
+from app.services.analytics.csat import CSATIndex
+from app.services.analytics.sketches import DDSketch, HyperLogLog, SpaceSaving, WaitHistogram, hash_values
+
+# As métricas aceitam o batch colunar ou, por compatibilidade, uma lista de Interaction
+Interactions = Union[InteractionBatch, List[Interaction]]
+
+def _answered(batch: InteractionBatch) -> np.ndarray:
+    return batch.mask("status", "answered")
+
+def _groups(column: Categorical) -> Tuple[np.ndarray, int, np.ndarray, List[Optional[str]]]:
+    """
+    Códigos de grupo (0 = valor vazio), quantidade de grupos, grupos presentes na ordem
+    de primeira aparição e o valor (chave) de cada um deles
+    """
+    codes = column.codes.astype(np.int64) + 1
+    present, first_index = np.unique(codes, return_index=True)
+    order = present[np.argsort(first_index, kind="stable")]
+    keys = [None if code == 0 else column.categories[code - 1] for code in order]
+    return codes, len(column.categories) + 1, order, keys
+
+# Séries por período já calculadas para um batch (os gráficos de volume e de TMA/TME
+# pedem o mesmo período e filtros e recebem o mesmo batch do cache)
+_series_memo: "weakref.WeakKeyDictionary[InteractionBatch, Dict[Tuple[str, str], Dict]]" = weakref.WeakKeyDictionary()
+# Agregados da Tela Inicial por batch e tempo alvo (KPIAggregate.for_batch). Os batches do
+# repositório são costurados de blocos do cache; cada bloco guarda o seu agregado, então o
+# refresh de 1 minuto do dashboard em tempo real, com o período deslizando, só varre os
+# blocos novos ou recortados nas bordas e combina os demais
+_aggregate_memo: "weakref.WeakKeyDictionary[InteractionBatch, Dict[int, KPIAggregate]]" = weakref.WeakKeyDictionary()
+
+def _combined_groups(batch: InteractionBatch, columns: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, List[Tuple]]:
+    """
+    Como _groups, para a combinação de várias colunas categóricas: chaves são tuplas
+    """
+    codes = np.zeros(len(batch), dtype=np.int64)
+    for name in columns:
+        column_codes, n_groups, _, _ = _groups(batch.categorical(name))
+        codes = codes * n_groups + column_codes
+    present, first_index = np.unique(codes, return_index=True)
+    by_appearance = np.argsort(first_index, kind="stable")
+    first_rows = first_index[by_appearance]
+    values = [batch.categorical(name).take(first_rows).decode().tolist() for name in columns]
+    return codes, present[by_appearance], list(zip(*values))
+
+def _present_categories(column: Categorical, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    codes = column.codes if mask is None else column.codes[mask]
+    return column.categories[np.unique(codes[codes >= 0])]
+
+def _customer_hashes(customers: Categorical) -> np.ndarray:
+    """
+    Hash dos clientes presentes; nos workers do pool (parallel) as categorias já chegam
+    como hash (uint64), calculado uma única vez no processo principal
+    """
+    present = _present_categories(customers)
+    return present if present.dtype == np.uint64 else hash_values(present)
+
+def _group_percentiles(codes: np.ndarray, n_groups: int, batch: InteractionBatch, answered: np.ndarray) -> List[Dict]:
+    """
+    Percentis de espera, conversação e atendimento das atendidas de cada grupo
+    """
+    wait_time = batch.column("wait_time")[answered]
+    talk_time = batch.column("talk_time")[answered]
+    sketches = {
+        name: DDSketch.grouped(codes[answered], values, n_groups)
+        for name, values in (("wait_time", wait_time), ("talk_time", talk_time), ("handle_time", wait_time + talk_time))
+    }
+    return [
+        {name: groups[code].quantiles() for name, groups in sketches.items()}
+        for code in range(n_groups)
+    ]
+
+def _min_max(values: np.ndarray) -> Tuple[Optional[float], Optional[float]]:
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return None, None
+    return float(values.min()), float(values.max())
+
+def _merge_min(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    return b if a is None else a if b is None else min(a, b)
+
+def _merge_max(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    return b if a is None else a if b is None else max(a, b)
+
+class KPIAggregate:
+    """
+    Agregado parcial dos KPIs da Tela Inicial que pode ser combinado: guarda contagens,
+    somas, atendidas dentro do alvo, o histograma de espera das atendidas, mínimos/máximos,
+    sketches de percentis (DDSketch), o top-K de motivos (Space-Saving), os clientes
+    distintos (HyperLogLog) e os agentes distintos, nunca as médias já calculadas.
+    Agregados de blocos (horas, dias, filas, canais) se combinam com `merge` em qualquer
+    ordem e agrupamento, e os KPIs finais saem de `to_overview`.
+    """
+    COUNTERS = (
+        "received", "answered", "abandoned", "within_target",
+        "auto_service", "callbacks", "duplicate_channel"
+    )
+    SUMS = ("wait_sum", "talk_sum")
+    EXTREMES = ("wait", "talk", "handle")
+
+    def __init__(self, target_seconds: int = 20):
+        self.target_seconds = target_seconds
+        self.received = 0
+        self.answered = 0
+        self.abandoned = 0
+        self.within_target = 0
+        self.auto_service = 0
+        self.callbacks = 0
+        self.duplicate_channel = 0
+        # Somas sobre as atendidas (tempo vazio soma zero, como nas médias)
+        self.wait_sum = 0.0
+        self.talk_sum = 0.0
+        # Mínimo/máximo das atendidas por tempo: {"wait": (min, max), ...}
+        self.extremes: Dict[str, Tuple[Optional[float], Optional[float]]] = {
+            name: (None, None) for name in self.EXTREMES
+        }
+        # Percentis das atendidas por tempo, com tamanho constante: {"wait": DDSketch, ...}
+        self.sketches: Dict[str, DDSketch] = {name: DDSketch() for name in self.EXTREMES}
+        # Nível de serviço de qualquer outro tempo alvo sai do histograma
+        self.wait_histogram = WaitHistogram()
+        self.reasons = SpaceSaving()
+        # Exato para poucos clientes, aproximado (memória fixa) para períodos longos
+        self.customers = HyperLogLog()
+        self.agents: Set[str] = set()  # agentes com interações atendidas
+
+    @classmethod
+    def from_batch(cls, interactions: Interactions, target_seconds: int = 20) -> "KPIAggregate":
+        """
+        Agregado de um conjunto de interações, calculado em uma única varredura vetorizada
+        """
+        batch = as_batch(interactions)
+        aggregate = cls(target_seconds)
+        answered = _answered(batch)
+        wait_time = batch.column("wait_time")[answered]
+        talk_time = batch.column("talk_time")[answered]
+
+        aggregate.received = len(batch)
+        aggregate.answered = int(np.count_nonzero(answered))
+        aggregate.abandoned = int(np.count_nonzero(batch.mask("status", "abandoned")))
+        # Tempo de espera vazio (NaN) nunca conta como dentro do alvo
+        aggregate.within_target = int(np.count_nonzero(wait_time <= target_seconds))
+        aggregate.auto_service = int(np.count_nonzero(batch.column("is_auto_service")))
+        aggregate.callbacks = int(np.count_nonzero(batch.column("is_callback")))
+        aggregate.duplicate_channel = int(np.count_nonzero(batch.column("is_duplicate_channel")))
+        aggregate.wait_sum = float(np.nansum(wait_time))
+        aggregate.talk_sum = float(np.nansum(talk_time))
+        aggregate.extremes = {
+            "wait": _min_max(wait_time),
+            "talk": _min_max(talk_time),
+            "handle": _min_max(wait_time + talk_time)
+        }
+        aggregate.sketches = {
+            "wait": DDSketch.from_values(wait_time),
+            "talk": DDSketch.from_values(talk_time),
+            "handle": DDSketch.from_values(wait_time + talk_time)
+        }
+        aggregate.wait_histogram = WaitHistogram.from_values(wait_time)
+
+        # Contagem por motivo na ordem de primeira aparição
+        reasons = batch.categorical("reason")
+        reason_counts = np.bincount(reasons.codes[reasons.codes >= 0], minlength=len(reasons.categories))
+        aggregate.reasons.add_counts({
+            reasons.categories[code]: int(reason_counts[code]) for code in np.flatnonzero(reason_counts)
+        })
+        # Hash só das categorias presentes: cada cliente distinto é processado uma vez
+        aggregate.customers.add_hashes(_customer_hashes(batch.categorical("customer_id")))
+        aggregate.agents = set(_present_categories(batch.categorical("agent_id"), answered).tolist())
+        return aggregate
+
+    @classmethod
+    def for_batch(cls, interactions: Interactions, target_seconds: int = 20) -> "KPIAggregate":
+        """
+        Como from_batch, memorizado por batch; o agregado devolvido é compartilhado e não
+        deve ser alterado (use merge). Um batch costurado (InteractionBatch.parts) combina
+        os agregados memorizados das partes, varrendo só as partes ainda não agregadas.
+        """
+        batch = as_batch(interactions)
+        memo = _aggregate_memo.setdefault(batch, {})
+        if target_seconds not in memo:
+            if batch.parts:
+                memo[target_seconds] = cls.merge_all(
+                    (cls.for_batch(part, target_seconds) for part in batch.parts), target_seconds
+                )
+            else:
+                memo[target_seconds] = cls.from_batch(batch, target_seconds)
+        return memo[target_seconds]
+
+    @staticmethod
+    def pending_rows(batch: InteractionBatch, target_seconds: int = 20) -> int:
+        """
+        Linhas que for_batch ainda teria de varrer (0 quando o agregado já está memorizado)
+        """
+        if target_seconds in _aggregate_memo.get(batch, ()):
+            return 0
+        if batch.parts:
+            return sum(KPIAggregate.pending_rows(part, target_seconds) for part in batch.parts)
+        return len(batch)
+
+    @staticmethod
+    def memoize(batch: InteractionBatch, aggregate: "KPIAggregate") -> "KPIAggregate":
+        """
+        Registra o agregado de um batch calculado fora de for_batch (ex.: no pool de processos)
+        """
+        _aggregate_memo.setdefault(batch, {})[aggregate.target_seconds] = aggregate
+        return aggregate
+
+
+    @classmethod
+    def group_by(
+        cls,
+        interactions: Interactions,
+        column: Union[str, Sequence[str]],
+        target_seconds: int = 20
+    ) -> Dict[Any, "KPIAggregate"]:
+        """
+        Um agregado por valor da coluna categórica (ex.: queue_id, agent_id, channel_type),
+        na ordem de primeira aparição; valor vazio vira a chave None. Com várias colunas
+        (ex.: ("queue_id", "channel_type")), as chaves são tuplas.
+        """
+        batch = as_batch(interactions)
+        if isinstance(column, str):
+            codes, _, order, keys = _groups(batch.categorical(column))
+        else:
+            codes, order, keys = _combined_groups(batch, column)
+        # Ordena uma vez pelos códigos e fatia cada grupo com busca binária
+        by_code = np.argsort(codes, kind="stable")
+        sorted_codes = codes[by_code]
+        starts = np.searchsorted(sorted_codes, order, side="left")
+        ends = np.searchsorted(sorted_codes, order, side="right")
+        return {
+            key: cls.from_batch(batch.take(by_code[start:end]), target_seconds)
+            for key, start, end in zip(keys, starts, ends)
+        }
+
+    def merge(self, other: "KPIAggregate") -> "KPIAggregate":
+        """
+        Combina dois agregados em um novo (operação associativa e comutativa)
+        """
+        return KPIAggregate.merge_all([self, other], self.target_seconds)
+
+    def update(self, other: "KPIAggregate") -> "KPIAggregate":
+        """
+        Acumula `other` neste agregado (in-place)
+        """
+        if other.target_seconds != self.target_seconds:
+            raise ValueError(
+                f"Agregados com tempos alvo diferentes ({self.target_seconds}s e {other.target_seconds}s) não podem ser combinados"
+            )
+        for name in self.COUNTERS + self.SUMS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name in self.EXTREMES:
+            low, high = self.extremes[name]
+            other_low, other_high = other.extremes[name]
+            self.extremes[name] = (_merge_min(low, other_low), _merge_max(high, other_high))
+            self.sketches[name].update(other.sketches[name])
+        self.wait_histogram.update(other.wait_histogram)
+        self.reasons.update(other.reasons)
+        self.customers.update(other.customers)
+        self.agents |= other.agents
+        return self
+
+    @classmethod
+    def merge_all(cls, aggregates: Iterable["KPIAggregate"], target_seconds: int = 20) -> "KPIAggregate":
+        result = cls(target_seconds)
+        for aggregate in aggregates:
+            result.update(aggregate)
+        return result
+
+    @property
+    def service_level(self) -> float:
+        return self.within_target / self.answered * 100 if self.answered else 0.0
+
+    def service_level_at(self, target_seconds: float) -> float:
+        """
+        Nível de serviço para um tempo alvo qualquer: exato no alvo do agregado,
+        a partir do histograma de espera nos demais
+        """
+        if target_seconds == self.target_seconds:
+            return self.service_level
+        return self.wait_histogram.count_at_most(target_seconds) / self.answered * 100 if self.answered else 0.0
+
+    def service_level_curve(self, targets: Iterable[float]) -> Dict[float, float]:
+        return {target: self.service_level_at(target) for target in targets}
+
+    @property
+    def average_handle_time(self) -> float:
+        return (self.talk_sum + self.wait_sum) / self.answered if self.answered else 0.0
+
+    @property
+    def average_wait_time(self) -> float:
+        return self.wait_sum / self.answered if self.answered else 0.0
+
+    @property
+    def average_talk_time(self) -> float:
+        return self.talk_sum / self.answered if self.answered else 0.0
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        """
+        p50/p90/p95/p99 de espera, conversação e atendimento (erro relativo <= DDSKETCH_RELATIVE_ACCURACY)
+        """
+        return {f"{name}_time": sketch.quantiles() for name, sketch in self.sketches.items()}
+
+    def top_reasons(self, top_n: int = 10) -> Dict[str, int]:
+        return dict(self.reasons.top(top_n))
+
+    def to_overview(self, top_n: int = 10, targets: Optional[Iterable[float]] = None) -> Dict:
+        """
+        KPIs da Tela Inicial (mesmas chaves de MetricsService.compute_overview); com
+        `targets`, inclui a curva de nível de serviço por tempo alvo
+        """
+        overview = {
+            "total_customers": self.customers.count(),
+            "total_received_calls": self.received,
+            "total_answered_calls": self.answered,
+            "service_level": self.service_level,
+            "average_handle_time": self.average_handle_time,
+            "average_wait_time": self.average_wait_time,
+            "average_talk_time": self.average_talk_time,
+            "logged_in_agents": len(self.agents),
+            "auto_service_interactions": self.auto_service,
+            "top_reasons": self.top_reasons(top_n),
+            "total_callbacks": self.callbacks,
+            "duplicate_channel_interactions": self.duplicate_channel,
+            "percentiles": self.percentiles()
+        }
+        if targets:
+            overview["service_level_curve"] = self.service_level_curve(targets)
+        return overview
+
+    def to_state(self) -> Dict:
+        """
+        Estado serializável em JSON, para gravar agregados pré-calculados
+        """
+        state = {"target_seconds": self.target_seconds}
+        for name in self.COUNTERS + self.SUMS:
+            state[name] = getattr(self, name)
+        state["extremes"] = {name: list(values) for name, values in self.extremes.items()}
+        state["sketches"] = {name: sketch.to_state() for name, sketch in self.sketches.items()}
+        state["wait_histogram"] = self.wait_histogram.to_state()
+        state["reasons"] = self.reasons.to_state()
+        state["customers"] = self.customers.to_state()
+        state["agents"] = sorted(self.agents)
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "KPIAggregate":
+        aggregate = cls(state["target_seconds"])
+        for name in cls.COUNTERS + cls.SUMS:
+            setattr(aggregate, name, state[name])
+        aggregate.extremes = {name: tuple(values) for name, values in state["extremes"].items()}
+        aggregate.sketches = {name: DDSketch.from_state(sketch) for name, sketch in state["sketches"].items()}
+        aggregate.wait_histogram = WaitHistogram.from_state(state["wait_histogram"])
+        aggregate.reasons = SpaceSaving.from_state(state["reasons"])
+        aggregate.customers = HyperLogLog.from_state(state["customers"])
+        aggregate.agents = set(state["agents"])
+        return aggregate
 
 class MetricsService:
     @staticmethod
-    def get_total_customers(interactions: List[Interaction]) -> int:
+    def compute_overview(
+        interactions: Interactions,
+        target_seconds: int = 20,
+        top_n: int = 10,
+        targets: Optional[List[float]] = None
+    ) -> Dict:
+        """
+        Calcula todos os KPIs da Tela Inicial de uma vez, a partir de um único agregado
+        (KPIAggregate): a máscara de atendidas e as somas de espera/conversação são
+        calculadas uma só vez e compartilhadas por SL, TMA, TME, TCM e atendidas.
+        Com `targets`, inclui o nível de serviço de cada tempo alvo (service_level_curve).
+        """
+        return KPIAggregate.for_batch(interactions, target_seconds).to_overview(top_n, targets)
+
+    @staticmethod
+    def get_total_customers(interactions: Interactions) -> int:
         """
         Calcula a quantidade de clientes únicos que nos acionaram (Contagem por CPF ou CNPJ)
         """
-        return len(set(i.customer_id for i in interactions if i.customer_id))
+        return MetricsService.compute_overview(interactions)["total_customers"]
 
     @staticmethod
-    def get_total_received_calls(interactions: List[Interaction]) -> int:
+    def get_total_received_calls(interactions: Interactions) -> int:
         """
         Calcula a quantidade de Chamadas recebidas (Voz e Texto)
         """
         return len(interactions)
 
     @staticmethod
-    def get_total_answered_calls(interactions: List[Interaction]) -> int:
+    def get_total_answered_calls(interactions: Interactions) -> int:
         """
         Calcula a quantidade de Chamadas Atendidas (Voz e Texto)
         """
-        return len([i for i in interactions if i.status == "answered"])
+        return MetricsService.compute_overview(interactions)["total_answered_calls"]
 
     @staticmethod
-    def calculate_service_level(interactions: List[Interaction], target_seconds: int = 20) -> float:
+    def calculate_service_level(interactions: Interactions, target_seconds: int = 20) -> float:
         """
         Calcula o nível de serviço (SL) para as interações
         SL = (Chamadas atendidas dentro do tempo alvo / Total de chamadas) * 100
         """
-        if not interactions:
-            return 0.0
-            
-        answered_calls = [i for i in interactions if i.status == "answered"]
-        if not answered_calls:
-            return 0.0
-            
-        calls_within_target = len([
-            i for i in answered_calls 
-            if i.wait_time is not None and i.wait_time <= target_seconds
-        ])
-        
-        return (calls_within_target / len(answered_calls)) * 100 if len(answered_calls) > 0 else 0.0
+        return MetricsService.compute_overview(interactions, target_seconds=target_seconds)["service_level"]
 
     @staticmethod
-    def calculate_aht(interactions: List[Interaction]) -> float:
+    def calculate_aht(interactions: Interactions) -> float:
         """
         Calcula o Tempo Médio de Atendimento (AHT)
         AHT = (Tempo total de conversação + Tempo total de espera) / Número de chamadas atendidas
         (Em segundos, converter para minutos na exibição)
         """
-        if not interactions:
-            return 0.0
-            
-        answered_calls = [i for i in interactions if i.status == "answered"]
-        if not answered_calls:
-            return 0.0
-            
-        total_talk_time = sum(i.talk_time if i.talk_time is not None else 0 for i in answered_calls)
-        total_wait_time = sum(i.wait_time if i.wait_time is not None else 0 for i in answered_calls)
-        
-        return (total_talk_time + total_wait_time) / len(answered_calls)
+        return MetricsService.compute_overview(interactions)["average_handle_time"]
 
     @staticmethod
-    def calculate_awt(interactions: List[Interaction]) -> float:
+    def calculate_awt(interactions: Interactions) -> float:
         """
         Calcula o Tempo Médio de Espera (TME)
         TME = Tempo total de espera / Número de chamadas atendidas
         (Em segundos, converter para minutos na exibição)
         """
-        if not interactions:
-            return 0.0
-            
-        answered_calls = [i for i in interactions if i.status == "answered"]
-        if not answered_calls:
-            return 0.0
-            
-        total_wait_time = sum(i.wait_time if i.wait_time is not None else 0 for i in answered_calls)
-        return total_wait_time / len(answered_calls)
+        return MetricsService.compute_overview(interactions)["average_wait_time"]
 
     @staticmethod
-    def calculate_att(interactions: List[Interaction]) -> float:
+    def calculate_att(interactions: Interactions) -> float:
         """
         Calcula o Tempo Médio de Conversação (TCM)
         TCM = Tempo total de conversação / Número de chamadas atendidas
         (Em segundos, converter para minutos na exibição)
         """
-        if not interactions:
-            return 0.0
-            
-        answered_calls = [i for i in interactions if i.status == "answered"]
-        if not answered_calls:
-            return 0.0
-            
-        total_talk_time = sum(i.talk_time if i.talk_time is not None else 0 for i in answered_calls)
-        return total_talk_time / len(answered_calls)
+        return MetricsService.compute_overview(interactions)["average_talk_time"]
 
     @staticmethod
-    def get_logged_in_agents(interactions: List[Interaction]) -> int:
+    def get_logged_in_agents(interactions: Interactions) -> int:
         """
         Calcula a quantidade de HCs (Agentes Logados no período)
         Considera agentes que participaram de interações atendidas.
         """
-        return len(set(i.agent_id for i in interactions if i.agent_id and i.status == "answered"))
+        return MetricsService.compute_overview(interactions)["logged_in_agents"]
 
     @staticmethod
-    def get_auto_service_interactions(interactions: List[Interaction]) -> int:
+    def get_auto_service_interactions(interactions: Interactions) -> int:
         """
         Calcula a quantidade de interações retidas no auto serviço
         """
-        return len([i for i in interactions if i.is_auto_service])
+        return MetricsService.compute_overview(interactions)["auto_service_interactions"]
 
     @staticmethod
-    def get_top_reasons(interactions: List[Interaction], top_n: int = 10) -> Dict[str, int]:
+    def get_top_reasons(interactions: Interactions, top_n: int = 10) -> Dict[str, int]:
         """
         Obtém os motivos selecionados pelo cliente no Bot ou URA (Top N)
         """
-        reason_counts = {}
-        for i in interactions:
-            if i.reason:
-                reason_counts[i.reason] = reason_counts.get(i.reason, 0) + 1
-        
-        sorted_reasons = sorted(reason_counts.items(), key=lambda item: item[1], reverse=True)
-        return dict(sorted_reasons[:top_n])
+        return MetricsService.compute_overview(interactions, top_n=top_n)["top_reasons"]
 
     @staticmethod
-    def get_total_callbacks(interactions: List[Interaction]) -> int:
+    def get_total_callbacks(interactions: Interactions) -> int:
         """
         Calcula a quantidade de Rechamadas (Total de clientes que nos acionam mais de 1x)
-        (Lógica simplificada: conta interações marcadas como is_callback)
+        (conta interações marcadas como is_callback pelo detector de recontatos na ingestão)
         """
-        return len([i for i in interactions if i.is_callback])
+        return MetricsService.compute_overview(interactions)["total_callbacks"]
 
     @staticmethod
-    def get_duplicate_channel_interactions(interactions: List[Interaction]) -> int:
+    def get_duplicate_channel_interactions(interactions: Interactions) -> int:
         """
         Calcula interações finalizadas por duplicidade de canal (Voz ou Texto)
         """
-        return len([i for i in interactions if i.is_duplicate_channel])
+        return MetricsService.compute_overview(interactions)["duplicate_channel_interactions"]
 
     @staticmethod
-    def get_interactions_volume_by_period(interactions: List[Interaction], period: str = "H") -> Dict:
-        """
-        Retorna o volume de clientes e chamadas por período (H=hora, D=dia).
-        """
-        if not interactions:
-            return {"timestamps": [], "total_customers": [], "total_received_calls": [], "total_answered_calls": []}
-        
-        df = pd.DataFrame([i.__dict__ for i in interactions])
-        df['start_time'] = pd.to_datetime(df['start_time'])
-        df = df.set_index('start_time')
-
-        # Agrupar por período
-        if period == "H":
-            resampled = df.resample('H')
-        elif period == "D":
-            resampled = df.resample('D')
-        else:
-            raise ValueError("Período inválido. Use 'H' para hora ou 'D' para dia.")
+    def compute_period_series(interactions: Interactions, period: str = "H", tz: Optional[str] = None) -> Dict:
+        """
+        Séries por período (15min, H=hora, D=dia, W=semana) em hora local de `tz`
+        (padrão: DASHBOARD_TIMEZONE): recebidas, atendidas, clientes distintos, TMA e TME.
+        Uma única passada atribui o bucket de cada linha e todas as séries saem de
+        reduções agrupadas (np.bincount) sobre esses ids.
+        """
+        batch = as_batch(interactions)
+        tz = tz or settings.DASHBOARD_TIMEZONE
+        memo = _series_memo.get(batch)
+        if memo is not None and (period, tz) in memo:
+            return memo[(period, tz)]
 
-        # Volume de chamadas recebidas
-        received_calls = resampled.size().fillna(0)
+        buckets = bucketize(batch.column("start_time"), period, tz)
+        ids = buckets.ids
+        n_buckets = len(buckets.starts)
+        valid = ids >= 0
+        answered = _answered(batch) & valid
+        answered_ids = ids[answered]
+        wait_time = batch.column("wait_time")[answered]
 
-        # Volume de chamadas atendidas
-        answered_calls = resampled.apply(lambda x: len([i for i in x.status if i == "answered"])).fillna(0)
-        
-        # Total de clientes (contagem única por período)
-        total_customers = resampled['customer_id'].apply(lambda x: len(x.unique())).fillna(0)
+        series = {
+            "timestamps": pd.DatetimeIndex(buckets.starts).strftime('%Y-%m-%d %H:%M:%S').tolist(),
+            "total_customers": bucket_distinct(ids, batch.categorical("customer_id").codes, n_buckets).tolist(),
+            "total_received_calls": np.bincount(ids[valid], minlength=n_buckets).tolist(),
+            "total_answered_calls": np.bincount(answered_ids, minlength=n_buckets).tolist(),
+            # TMA = conversação + espera; linhas sem um dos tempos ficam fora da média
+            "tma": bucket_mean(answered_ids, batch.column("talk_time")[answered] + wait_time, n_buckets).tolist(),
+            "tme": bucket_mean(answered_ids, wait_time, n_buckets).tolist()
+        }
+        if memo is None:
+            memo = _series_memo.setdefault(batch, {})
+        memo[(period, tz)] = series
+        return series
 
+    @staticmethod
+    def get_interactions_volume_by_period(interactions: Interactions, period: str = "H", tz: Optional[str] = None) -> Dict:
+        """
+        Retorna o volume de clientes e chamadas por período (15min, H=hora, D=dia, W=semana).
+        """
+        series = MetricsService.compute_period_series(interactions, period=period, tz=tz)
         return {
-            "timestamps": received_calls.index.strftime('%Y-%m-%d %H:%M:%S').tolist(),
-            "total_customers": total_customers.tolist(),
-            "total_received_calls": received_calls.tolist(),
-            "total_answered_calls": answered_calls.tolist()
+            "timestamps": series["timestamps"],
+            "total_customers": series["total_customers"],
+            "total_received_calls": series["total_received_calls"],
+            "total_answered_calls": series["total_answered_calls"]
         }
 
     @staticmethod
-    def get_tma_tme_by_period(interactions: List[Interaction], period: str = "H") -> Dict:
+    def get_tma_tme_by_period(interactions: Interactions, period: str = "H", tz: Optional[str] = None) -> Dict:
         """
-        Retorna TMA e TME por período (H=hora, D=dia).
+        Retorna TMA e TME por período (15min, H=hora, D=dia, W=semana).
         """
-        if not interactions:
+        series = MetricsService.compute_period_series(interactions, period=period, tz=tz)
+        if not any(series["total_answered_calls"]):
             return {"timestamps": [], "tma": [], "tme": []}
+        return {
+            "timestamps": series["timestamps"],
+            "tma": series["tma"],
+            "tme": series["tme"]
+        }
 
-        df = pd.DataFrame([i.__dict__ for i in interactions])
-        df['start_time'] = pd.to_datetime(df['start_time'])
-        df = df.set_index('start_time')
-        df_answered = df[df['status'] == 'answered'].copy() # Criar cópia para evitar SettingWithCopyWarning
-        
-        if df_answered.empty:
-             return {"timestamps": [], "tma": [], "tme": []}
-
-        df_answered['tma_calc'] = (df_answered['talk_time'] + df_answered['wait_time']) # Soma para AHT
-        df_answered['tme_calc'] = df_answered['wait_time'] # Para TME
-
-        if period == "H":
-            resampled = df_answered.resample('H')
-        elif period == "D":
-            resampled = df_answered.resample('D')
-        else:
-            raise ValueError("Período inválido. Use 'H' para hora ou 'D' para dia.")
-
-        tma_series = resampled['tma_calc'].mean().fillna(0) # Média do TMA
-        tme_series = resampled['tme_calc'].mean().fillna(0) # Média do TME
-
+    @staticmethod
+    def get_concurrency_by_period(
+        interactions: Interactions,
+        column: str = "agent_id",
+        period: str = "H",
+        tz: Optional[str] = None
+    ) -> Dict:
+        """
+        Concorrência por agente (`agent_id`, só interações atendidas) ou por fila (`queue_id`,
+        inclui a espera) a partir de start_time/end_time: por período, o pico de interações
+        simultâneas, a concorrência média e a ocupação (fração do período com pelo menos uma
+        interação aberta); no resumo, o pico do intervalo, a concorrência média enquanto
+        ocupado e a ocupação nos períodos com atividade.
+        """
+        curves = concurrency_curves(as_batch(interactions), column, period, tz, answered_only=column == "agent_id")
+        summary = concurrency_summary(curves)
         return {
-            "timestamps": tma_series.index.strftime('%Y-%m-%d %H:%M:%S').tolist(),
-            "tma": tma_series.tolist(),
-            "tme": tme_series.tolist()
+            "timestamps": curves.timestamps,
+            "items": [
+                {
+                    column: key,
+                    **summary[key],
+                    "peak_by_period": curves.peak[index].tolist(),
+                    "average_by_period": curves.average[index].tolist(),
+                    "occupancy_by_period": curves.occupancy[index].tolist()
+                }
+                for index, key in enumerate(curves.keys)
+            ]
         }
 
     @staticmethod
@@ -264,9 +616,32 @@ class MetricsService:
             "read_rate": (total_read / total_delivered) * 100 if total_delivered > 0 else 0.0
         }
 
+    @staticmethod
+    def average_csat_by_agent(csat_scores: Union[List[CSAT], CSATIndex], start_date: datetime, end_date: datetime) -> Dict[str, float]:
+        """
+        Nota CSAT média de cada agente no período, pelo índice ordenado por agente/data
+        """
+        if isinstance(csat_scores, CSATIndex):
+            return csat_scores.agent_averages(start_date, end_date)
+        return CSATIndex(csat_scores).agent_averages(start_date, end_date)
+
+    @staticmethod
+    def calculate_csat_breakdown(interactions: Interactions, csat_scores: List[CSAT]) -> Dict:
+        """
+        Nota CSAT média por fila e por canal: cada pesquisa é cruzada com a conversa avaliada
+        (interaction_id = conversationId) e atribuída à última perna atendida; pesquisas de
+        conversas fora do lote ficam de fora
+        """
+        batch = as_batch(interactions)
+        index = csat_scores if isinstance(csat_scores, CSATIndex) else CSATIndex(csat_scores)
+        return {
+            "by_queue": index.breakdown(batch, "queue_id"),
+            "by_channel": index.breakdown(batch, "channel_type")
+        }
+
     @staticmethod
     def calculate_agent_metrics(
-        interactions: List[Interaction],
+        interactions: Interactions,
         csat_scores: List[CSAT],
         start_date: datetime,
         end_date: datetime
@@ -274,71 +649,156 @@ class MetricsService:
         """
         Calcula métricas por agente
         """
+        batch = as_batch(interactions)
+        if not len(batch):
+            return []
+
+        # Agrupar interações por agente: somas por grupo com bincount sobre os códigos
+        codes, n_groups, order, agent_ids = _groups(batch.categorical("agent_id"))
+        answered = _answered(batch)
+        answered_codes = codes[answered]
+        wait_time = batch.column("wait_time")
+        total = np.bincount(codes, minlength=n_groups)
+        answered_count = np.bincount(answered_codes, minlength=n_groups)
+        talk_sum = np.bincount(answered_codes, weights=np.nan_to_num(batch.column("talk_time")[answered]), minlength=n_groups)
+        wait_sum = np.bincount(answered_codes, weights=np.nan_to_num(wait_time[answered]), minlength=n_groups)
+        within_target = np.bincount(codes[answered & (wait_time <= 20)], minlength=n_groups)
+        percentiles = _group_percentiles(codes, n_groups, batch, answered)
+
+        agent_csat = MetricsService.average_csat_by_agent(csat_scores, start_date, end_date)
+
         agent_metrics = []
-        
-        # Agrupar interações por agente
-        agent_interactions = {}
-        for interaction in interactions:
-            if interaction.agent_id not in agent_interactions:
-                agent_interactions[interaction.agent_id] = []
-            agent_interactions[interaction.agent_id].append(interaction)
-            
-        # Calcular métricas para cada agente
-        for agent_id, agent_interactions_list in agent_interactions.items():
-            answered_interactions = [i for i in agent_interactions_list if i.status == "answered"]
-            
+        for code, agent_id in zip(order, agent_ids):
+            answered_calls = answered_count[code]
             metrics = AgentMetrics(
                 agent_id=agent_id,
                 date=start_date.date(), # Apenas a data para métricas diárias
-                total_interactions=len(agent_interactions_list),
-                answered_interactions=len(answered_interactions),
-                average_handle_time=MetricsService.calculate_aht(answered_interactions),
-                average_wait_time=MetricsService.calculate_awt(answered_interactions),
-                average_talk_time=MetricsService.calculate_att(answered_interactions),
-                service_level=MetricsService.calculate_service_level(answered_interactions),
-                csat_score=np.mean([
-                    s.score for s in csat_scores 
-                    if s.agent_id == agent_id and start_date <= s.created_at <= end_date and s.score is not None
-                ]) if csat_scores else 0.0
+                total_interactions=int(total[code]),
+                answered_interactions=int(answered_calls),
+                average_handle_time=float((talk_sum[code] + wait_sum[code]) / answered_calls) if answered_calls else 0.0,
+                average_wait_time=float(wait_sum[code] / answered_calls) if answered_calls else 0.0,
+                average_talk_time=float(talk_sum[code] / answered_calls) if answered_calls else 0.0,
+                service_level=float(within_target[code] / answered_calls * 100) if answered_calls else 0.0,
+                csat_score=agent_csat.get(agent_id, 0.0),
+                percentiles=percentiles[code]
             )
-            
+
             agent_metrics.append(metrics)
-            
+
         return agent_metrics
 
     @staticmethod
     def calculate_queue_metrics(
-        interactions: List[Interaction],
+        interactions: Interactions,
         start_date: datetime,
-        end_date: datetime
+        end_date: datetime,
+        target_seconds: int = 20,
+        targets: Optional[List[float]] = None
     ) -> List[QueueMetrics]:
         """
-        Calcula métricas por fila
+        Calcula métricas por fila, com o histograma de espera de cada fila (e, com `targets`,
+        a curva de nível de serviço) para filas com SLAs diferentes (voz x WhatsApp)
         """
+        batch = as_batch(interactions)
+        if not len(batch):
+            return []
+
+        # Agrupar interações por fila: somas por grupo com bincount sobre os códigos
+        codes, n_groups, order, queue_ids = _groups(batch.categorical("queue_id"))
+        answered = _answered(batch)
+        wait_time = batch.column("wait_time")
+        total = np.bincount(codes, minlength=n_groups)
+        answered_count = np.bincount(codes[answered], minlength=n_groups)
+        abandoned_count = np.bincount(codes[batch.mask("status", "abandoned")], minlength=n_groups)
+        wait_sum = np.bincount(codes[answered], weights=np.nan_to_num(wait_time[answered]), minlength=n_groups)
+        within_target = np.bincount(codes[answered & (wait_time <= target_seconds)], minlength=n_groups)
+        # Histogramas de espera de todas as filas em um único bincount sobre (fila, bin)
+        n_bins = len(WaitHistogram.EDGES) + 1
+        measured = answered & ~np.isnan(wait_time)
+        histograms = np.bincount(
+            codes[measured] * n_bins + WaitHistogram.bin_index(wait_time[measured]),
+            minlength=n_groups * n_bins
+        ).reshape(n_groups, n_bins)
+        percentiles = _group_percentiles(codes, n_groups, batch, answered)
+
         queue_metrics = []
-        
-        # Agrupar interações por fila
-        queue_interactions = {}
-        for interaction in interactions:
-            if interaction.queue_id not in queue_interactions:
-                queue_interactions[interaction.queue_id] = []
-            queue_interactions[interaction.queue_id].append(interaction)
-            
-        # Calcular métricas para cada fila
-        for queue_id, queue_interactions_list in queue_interactions.items():
-            answered_interactions = [i for i in queue_interactions_list if i.status == "answered"]
-            abandoned_interactions = [i for i in queue_interactions_list if i.status == "abandoned"]
-            
+        for code, queue_id in zip(order, queue_ids):
+            answered_calls = answered_count[code]
+            histogram = WaitHistogram(histograms[code])
+            curve = None
+            if targets:
+                curve = {
+                    target: float(histogram.count_at_most(target) / answered_calls * 100) if answered_calls else 0.0
+                    for target in targets
+                }
             metrics = QueueMetrics(
                 queue_id=queue_id,
                 date=start_date.date(), # Apenas a data para métricas diárias
-                total_interactions=len(queue_interactions_list),
-                answered_interactions=len(answered_interactions),
-                abandoned_interactions=len(abandoned_interactions),
-                average_wait_time=MetricsService.calculate_awt(queue_interactions_list),
-                service_level=MetricsService.calculate_service_level(queue_interactions_list)
+                total_interactions=int(total[code]),
+                answered_interactions=int(answered_calls),
+                abandoned_interactions=int(abandoned_count[code]),
+                average_wait_time=float(wait_sum[code] / answered_calls) if answered_calls else 0.0,
+                service_level=float(within_target[code] / answered_calls * 100) if answered_calls else 0.0,
+                target_seconds=target_seconds,
+                wait_histogram=histogram.to_state(),
+                service_level_curve=curve,
+                percentiles=percentiles[code]
             )
-            
+
             queue_metrics.append(metrics)
-            
-        return queue_metrics 
\ No newline at end of file
+
+        return queue_metrics
+
+    @staticmethod
+    def build_agent_metrics(
+        agent_id: Optional[str],
+        aggregate: KPIAggregate,
+        date: datetime,
+        csat_score: Optional[float] = 0.0,
+        **columns
+    ) -> AgentMetrics:
+        """
+        Linha de AgentMetrics a partir de um agregado (rollup materializado ou combinação
+        de rollups); `columns` completa campos como granularity e aggregate_state
+        """
+        return AgentMetrics(
+            agent_id=agent_id,
+            date=date,
+            total_interactions=aggregate.received,
+            answered_interactions=aggregate.answered,
+            average_handle_time=aggregate.average_handle_time,
+            average_wait_time=aggregate.average_wait_time,
+            average_talk_time=aggregate.average_talk_time,
+            service_level=aggregate.service_level,
+            csat_score=csat_score,
+            percentiles=aggregate.percentiles(),
+            **columns
+        )
+
+    @staticmethod
+    def build_queue_metrics(
+        queue_id: Optional[str],
+        aggregate: KPIAggregate,
+        date: datetime,
+        target_seconds: int = 20,
+        targets: Optional[List[float]] = None,
+        **columns
+    ) -> QueueMetrics:
+        """
+        Linha de QueueMetrics a partir de um agregado (rollup materializado ou combinação
+        de rollups); `columns` completa campos como granularity e aggregate_state
+        """
+        return QueueMetrics(
+            queue_id=queue_id,
+            date=date,
+            total_interactions=aggregate.received,
+            answered_interactions=aggregate.answered,
+            abandoned_interactions=aggregate.abandoned,
+            average_wait_time=aggregate.average_wait_time,
+            service_level=aggregate.service_level_at(target_seconds),
+            target_seconds=target_seconds,
+            wait_histogram=aggregate.wait_histogram.to_state(),
+            service_level_curve=aggregate.service_level_curve(targets) if targets else None,
+            percentiles=aggregate.percentiles(),
+            **columns
+        )
@@ -0,0 +1,207 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import asyncio
+import multiprocessing
+import threading
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.services.analytics.batch import CATEGORY_COLUMNS, COLUMNS, STRING_COLUMNS, Categorical, InteractionBatch, as_batch
+from app.services.analytics.metrics import Interactions, KPIAggregate
+from app.services.analytics.sketches import hash_values
+
+# Alinhamento de cada coluna dentro do bloco de memória compartilhada
+ALIGNMENT = 64
+# Colunas categóricas lidas pelo KPIAggregate cujos dicionários (pequenos) vão em cada tarefa
+SHARED_CATEGORIES = ("agent_id", "queue_id", "channel_type", "status", "reason")
+# Clientes vão como hash por linha no bloco (o dicionário de clientes nunca é serializado)
+HASHED_COLUMN = "customer_id"
+NO_CUSTOMER = np.uint64(0)
+
+class ColumnLayout(NamedTuple):
+    name: str
+    dtype: str
+    offset: int
+    categories: Optional[np.ndarray]  # None para colunas numéricas/tempo/flags e hashes de clientes
+
+class SharedLayout(NamedTuple):
+    """
+    Descrição (serializável) de um batch copiado para memória compartilhada: os workers
+    recebem só o nome do bloco, os offsets e os dicionários das categorias pequenas
+    (SHARED_CATEGORIES); o tamanho não depende da quantidade de clientes
+    """
+    block: str
+    rows: int
+    columns: Tuple[ColumnLayout, ...]
+
+def _share(batch: InteractionBatch, order: np.ndarray) -> Tuple[shared_memory.SharedMemory, SharedLayout]:
+    """
+    Copia as colunas do batch, já na ordem `order`, para um único bloco compartilhado.
+    Colunas de texto livre (id, conversation_id) e categóricas que os agregados não leem
+    ficam de fora. O hash dos clientes é calculado aqui, uma vez por cliente distinto, e o
+    bloco leva o hash de cada linha.
+    """
+    customers = batch.categorical(HASHED_COLUMN)
+    # Última posição: cliente vazio (código -1)
+    hashes = np.concatenate((hash_values(customers.categories), [NO_CUSTOMER]))
+    arrays: Dict[str, Any] = {HASHED_COLUMN: hashes[customers.codes]}
+    for name in COLUMNS:
+        if name in SHARED_CATEGORIES:
+            arrays[name] = batch.categorical(name)
+        elif name not in CATEGORY_COLUMNS and name not in STRING_COLUMNS:
+            arrays[name] = batch.column(name)
+    offsets, size = {}, 0
+    for name, column in arrays.items():
+        values = column.codes if isinstance(column, Categorical) else column
+        offsets[name] = size
+        size += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+    layout = []
+    for name, column in arrays.items():
+        values = column.codes if isinstance(column, Categorical) else column
+        target = np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf, offset=offsets[name])
+        np.take(values, order, out=target)
+        del target
+        categories = column.categories if isinstance(column, Categorical) else None
+        layout.append(ColumnLayout(name, values.dtype.str, offsets[name], categories))
+    return block, SharedLayout(block.name, len(order), tuple(layout))
+
+def _attach(layout: SharedLayout, buffer, start: int, end: int) -> InteractionBatch:
+    columns: Dict[str, Any] = {}
+    for column in layout.columns:
+        dtype = np.dtype(column.dtype)
+        values = np.ndarray((end - start,), dtype=dtype, buffer=buffer, offset=column.offset + start * dtype.itemsize)
+        if column.name == HASHED_COLUMN:
+            # Recodifica no worker: as categorias de clientes passam a ser os próprios hashes
+            codes, categories = pd.factorize(values)
+            columns[column.name] = Categorical(np.where(values == NO_CUSTOMER, -1, codes).astype(np.int32), categories)
+        else:
+            columns[column.name] = values if column.categories is None else Categorical(values, column.categories)
+    # Os ids não entram nos agregados; só definem o tamanho do batch
+    for name in STRING_COLUMNS:
+        columns[name] = np.broadcast_to(np.array(None, dtype=object), (end - start,))
+    return InteractionBatch(columns)
+
+def _aggregate_partition(layout: SharedLayout, start: int, end: int, target_seconds: int, column: Optional[str]):
+    """
+    Executado no worker: agregado parcial das linhas [start, end) do bloco compartilhado,
+    devolvido como estado serializável (to_state), nunca como arrays
+    """
+    # O bloco é criado e removido pelo processo principal; o worker só o abre e fecha
+    block = shared_memory.SharedMemory(name=layout.block)
+    try:
+        return _partition_state(_attach(layout, block.buf, start, end), target_seconds, column)
+    finally:
+        block.close()
+
+def _partition_state(batch: InteractionBatch, target_seconds: int, column: Optional[str]):
+    # As views do bloco só vivem nesta chamada (precisam ser liberadas antes do close)
+    if column is None:
+        return KPIAggregate.from_batch(batch, target_seconds).to_state()
+    return [
+        (key, aggregate.to_state())
+        for key, aggregate in KPIAggregate.group_by(batch, column, target_seconds).items()
+    ]
+
+def _partition_bounds(keys: np.ndarray, parts: int) -> List[Tuple[int, int]]:
+    """
+    Cortes de um array de chaves ordenado em até `parts` faixas de tamanho parecido,
+    sempre na troca de chave (um dia ou uma fila nunca fica dividido entre faixas)
+    """
+    changes = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    targets = (np.arange(1, parts) * len(keys)) // parts
+    candidates = np.concatenate(([0], changes, [len(keys)]))
+    cuts = candidates[np.clip(np.searchsorted(candidates, targets), 0, len(candidates) - 1)]
+    edges = np.unique(np.concatenate(([0], cuts, [len(keys)])))
+    return [(int(edges[i]), int(edges[i + 1])) for i in range(len(edges) - 1)]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: fork de um processo com event loop e threads pode travar os workers
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def shutdown_pool():
+    """
+    Encerra o pool de processos (shutdown da aplicação)
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+class ParallelAggregator:
+    """
+    Camada de execução das métricas agregáveis (KPIAggregate) fora do event loop.
+    Lotes grandes são particionados por dia (agregado total) ou pelo valor agrupado (ex.:
+    queue_id), copiados uma vez para memória compartilhada e agregados em um pool de
+    processos; os estados parciais voltam pequenos e são combinados com `update`.
+    Lotes pequenos, em que o custo do pool domina, são agregados em uma thread.
+    """
+    def __init__(self, workers: int = settings.PARALLEL_WORKERS, min_rows: int = settings.PARALLEL_MIN_ROWS):
+        self.workers = workers
+        self.min_rows = min_rows
+
+    def use_pool(self, batch: InteractionBatch, rows: Optional[int] = None) -> bool:
+        return self.workers > 1 and (len(batch) if rows is None else rows) >= self.min_rows
+
+    async def aggregate(self, interactions: Interactions, target_seconds: int = 20) -> KPIAggregate:
+        """
+        KPIAggregate de todas as interações (ex.: Tela Inicial). Usa o mesmo memo de
+        KPIAggregate.for_batch (compute_overview): um batch já agregado, ou costurado de
+        blocos já agregados, não é varrido de novo; o pool só entra pelas linhas pendentes.
+        """
+        batch = as_batch(interactions)
+        if not self.use_pool(batch, KPIAggregate.pending_rows(batch, target_seconds)):
+            return await asyncio.to_thread(KPIAggregate.for_batch, batch, target_seconds)
+
+        start_times = batch.column("start_time").astype("datetime64[D]").astype(np.int64)
+        states = await self._run(batch, start_times, target_seconds, None)
+        merged = KPIAggregate.merge_all((KPIAggregate.from_state(state) for state in states), target_seconds)
+        return KPIAggregate.memoize(batch, merged)
+
+    async def group_by(self, interactions: Interactions, column: str, target_seconds: int = 20) -> Dict[Any, KPIAggregate]:
+        """
+        Um KPIAggregate por valor da coluna (mesmo resultado de KPIAggregate.group_by)
+        """
+        batch = as_batch(interactions)
+        if not self.use_pool(batch) or column not in SHARED_CATEGORIES:
+            return await asyncio.to_thread(KPIAggregate.group_by, batch, column, target_seconds)
+
+        # Cada grupo fica inteiro em uma partição: basta unir os dicionários
+        categorical = batch.categorical(column)
+        codes = categorical.codes.astype(np.int64)
+        aggregates: Dict[Any, KPIAggregate] = {}
+        for partial in await self._run(batch, codes, target_seconds, column):
+            for key, state in partial:
+                aggregates[key] = KPIAggregate.from_state(state)
+        # Mesma ordem de KPIAggregate.group_by (primeira aparição)
+        present, first_index = np.unique(codes, return_index=True)
+        ordered = present[np.argsort(first_index, kind="stable")]
+        return {
+            key: aggregates[key]
+            for key in (None if code < 0 else categorical.categories[code] for code in ordered)
+        }
+
+    async def _run(self, batch: InteractionBatch, keys: np.ndarray, target_seconds: int, column: Optional[str]) -> List:
+        order = np.argsort(keys, kind="stable")
+        bounds = _partition_bounds(keys[order], self.workers)
+        block, layout = await asyncio.to_thread(_share, batch, order)
+        try:
+            pool = _get_pool(self.workers)
+            futures = [
+                asyncio.wrap_future(pool.submit(_aggregate_partition, layout, start, end, target_seconds, column))
+                for start, end in bounds
+            ]
+            return await asyncio.gather(*futures)
+        finally:
+            block.close()
+            block.unlink()
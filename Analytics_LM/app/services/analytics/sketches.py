@@ -0,0 +1,492 @@
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+from itertools import chain
+import base64
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+
+def hash_values(values: Sequence) -> np.ndarray:
+    """
+    Hash de 64 bits estável entre processos e reinícios (diferente do hash() do Python),
+    necessário para combinar sketches calculados em momentos e workers diferentes
+    """
+    return pd.util.hash_array(np.asarray(values, dtype=object)).astype(np.uint64)
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    # frexp é exato até 2**53: separa os 64 bits em duas metades de 32
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+def _sigma(x: float) -> float:
+    if x == 1:
+        return float("inf")
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous, z = z, z + x * y
+        y += y
+        if z == previous:
+            return z
+
+def _tau(x: float) -> float:
+    if x == 0 or x == 1:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = np.sqrt(x)
+        y *= 0.5
+        previous, z = z, z - (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+def _encode(array: np.ndarray) -> str:
+    return base64.b64encode(array.tobytes()).decode("ascii")
+
+def _decode(data: str, dtype) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=dtype).copy()
+
+def _log_edges(linear_until: int = 32, sub_bins: int = 16, max_exponent: int = 17) -> np.ndarray:
+    # Bins de 1 s até `linear_until` e, acima, `sub_bins` bins por oitava (largura
+    # proporcional ao valor) até 2**max_exponent segundos
+    edges = [float(second) for second in range(linear_until + 1)]
+    exponent = int(np.log2(linear_until))
+    while exponent < max_exponent:
+        base = 2.0 ** exponent
+        edges.extend(base + base * k / sub_bins for k in range(1, sub_bins + 1))
+        exponent += 1
+    return np.array(edges)
+
+class WaitHistogram:
+    """
+    Histograma de tempos de espera com bins fixos em escala logarítmica: bin 0 = espera
+    <= 0 s, bin i = (EDGES[i - 1], EDGES[i]] e o último bin acumula o que passa de
+    EDGES[-1] (~36 h). Por terem os mesmos bins, histogramas de buckets, filas e canais
+    se somam, e o nível de serviço de qualquer tempo alvo sai da soma acumulada: exato
+    quando o alvo é um limite de bin (todo segundo inteiro até 32 s, depois múltiplos de
+    2, 4, 8... s) e interpolado dentro do bin nos demais casos (erro relativo <= 1/16).
+    """
+    EDGES = _log_edges()
+
+    def __init__(self, counts: Optional[np.ndarray] = None):
+        self.counts = np.zeros(len(self.EDGES) + 1, dtype=np.int64) if counts is None else counts
+
+    @classmethod
+    def bin_index(cls, values: np.ndarray) -> np.ndarray:
+        """
+        Bin de cada valor (os valores não podem ser NaN)
+        """
+        return np.searchsorted(cls.EDGES, values, side="left")
+
+    @classmethod
+    def from_values(cls, values: np.ndarray) -> "WaitHistogram":
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        return cls(np.bincount(cls.bin_index(values), minlength=len(cls.EDGES) + 1).astype(np.int64))
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def update(self, other: "WaitHistogram") -> "WaitHistogram":
+        self.counts += other.counts
+        return self
+
+    def merge(self, other: "WaitHistogram") -> "WaitHistogram":
+        return WaitHistogram(self.counts + other.counts)
+
+    def count_at_most(self, seconds: float) -> float:
+        """
+        Quantidade de esperas <= `seconds`
+        """
+        last = int(np.searchsorted(self.EDGES, seconds, side="right")) - 1
+        if last < 0:
+            return 0.0
+        count = float(self.counts[:last + 1].sum())
+        if last + 1 < len(self.EDGES) and seconds > self.EDGES[last]:
+            low, high = self.EDGES[last], self.EDGES[last + 1]
+            count += float(self.counts[last + 1]) * (seconds - low) / (high - low)
+        return count
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """
+        Curva completa: (limite do bin em segundos, esperas <= limite) até o último bin com dados
+        """
+        cumulative = np.cumsum(self.counts[:len(self.EDGES)])
+        filled = np.flatnonzero(self.counts[:len(self.EDGES)])
+        end = int(filled[-1]) + 1 if filled.size else 0
+        return list(zip(self.EDGES[:end].tolist(), cumulative[:end].tolist()))
+
+    def to_state(self) -> Dict:
+        # Esparso: só os bins com contagem
+        bins = np.flatnonzero(self.counts)
+        return {"bins": bins.tolist(), "counts": self.counts[bins].tolist()}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "WaitHistogram":
+        histogram = cls()
+        histogram.counts[np.asarray(state["bins"], dtype=np.intp)] = state["counts"]
+        return histogram
+
+# Percentis expostos pelos dashboards
+PERCENTILES = {"p50": 0.5, "p90": 0.9, "p95": 0.95, "p99": 0.99}
+
+class DDSketch:
+    """
+    Sketch de quantis com erro relativo garantido (DDSketch): cada valor positivo cai no
+    bin ceil(log_gamma(x)), com gamma = (1 + alpha) / (1 - alpha), e qualquer quantil sai
+    com erro relativo <= alpha. O tamanho depende só da faixa de valores (~600 bins de 1 s
+    a 36 h com alpha = 1%), e sketches com o mesmo alpha se combinam somando os bins.
+    """
+    MIN_VALUE = 1e-3  # valores positivos menores que 1 ms caem no primeiro bin
+
+    def __init__(self, alpha: float = settings.DDSKETCH_RELATIVE_ACCURACY):
+        if not 0 < alpha < 1:
+            raise ValueError("A precisão relativa do DDSketch deve estar entre 0 e 1")
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.zero_count = 0  # valores <= 0 (ex.: atendimento sem espera)
+        self.offset = 0  # chave do primeiro bin de `counts`
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + int(self.counts.sum())
+
+    def _keys(self, values: np.ndarray) -> np.ndarray:
+        return np.ceil(np.log(np.maximum(values, self.MIN_VALUE)) / np.log(self.gamma)).astype(np.int64)
+
+    def _add_bins(self, offset: int, counts: np.ndarray):
+        counts = counts.astype(np.int64)
+        if not counts.size:
+            return
+        if not self.counts.size:
+            self.offset, self.counts = offset, counts
+            return
+        low = min(self.offset, offset)
+        high = max(self.offset + len(self.counts), offset + len(counts))
+        merged = np.zeros(high - low, dtype=np.int64)
+        merged[self.offset - low:self.offset - low + len(self.counts)] += self.counts
+        merged[offset - low:offset - low + len(counts)] += counts
+        self.offset, self.counts = low, merged
+
+    def add_values(self, values: np.ndarray) -> "DDSketch":
+        """
+        Acrescenta valores (NaN é ignorado)
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        positive = values > 0
+        self.zero_count += int(np.count_nonzero(~positive))
+        keys = self._keys(values[positive])
+        if keys.size:
+            low = int(keys.min())
+            self._add_bins(low, np.bincount(keys - low))
+        return self
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, alpha: float = settings.DDSKETCH_RELATIVE_ACCURACY) -> "DDSketch":
+        return cls(alpha).add_values(values)
+
+    @classmethod
+    def grouped(
+        cls,
+        codes: np.ndarray,
+        values: np.ndarray,
+        n_groups: int,
+        alpha: float = settings.DDSKETCH_RELATIVE_ACCURACY
+    ) -> List["DDSketch"]:
+        """
+        Um sketch por código de grupo (0 .. n_groups - 1), com um único np.unique sobre os
+        pares (grupo, bin) em vez de uma passada por grupo
+        """
+        sketches = [cls(alpha) for _ in range(n_groups)]
+        present = ~np.isnan(values)
+        codes, values = codes[present], values[present]
+        positive = values > 0
+        for code, zeros in enumerate(np.bincount(codes[~positive], minlength=n_groups).tolist()):
+            sketches[code].zero_count = zeros
+        if not positive.any():
+            return sketches
+
+        keys = sketches[0]._keys(values[positive])
+        low = int(keys.min())
+        width = int(keys.max()) - low + 1
+        pairs, pair_counts = np.unique(codes[positive].astype(np.int64) * width + (keys - low), return_counts=True)
+        pair_codes = pairs // width
+        pair_keys = pairs % width
+        edges = np.searchsorted(pair_codes, np.arange(n_groups + 1), side="left")
+        for code in np.flatnonzero(np.diff(edges)):
+            group = slice(edges[code], edges[code + 1])
+            first = int(pair_keys[group][0])
+            sketches[code]._add_bins(low + first, np.bincount(pair_keys[group] - first, weights=pair_counts[group]))
+        return sketches
+
+    def update(self, other: "DDSketch") -> "DDSketch":
+        if other.alpha != self.alpha:
+            raise ValueError(
+                f"DDSketches com precisões diferentes ({self.alpha} e {other.alpha}) não podem ser combinados"
+            )
+        self.zero_count += other.zero_count
+        self._add_bins(other.offset, other.counts)
+        return self
+
+    def merge(self, other: "DDSketch") -> "DDSketch":
+        return self.copy().update(other)
+
+    def copy(self) -> "DDSketch":
+        result = DDSketch(self.alpha)
+        result.zero_count = self.zero_count
+        result.offset = self.offset
+        result.counts = self.counts.copy()
+        return result
+
+    def quantile(self, q: float) -> float:
+        """
+        Quantil `q` (0 a 1); sketch vazio vale 0, como as médias
+        """
+        total = self.count
+        if not total:
+            return 0.0
+        rank = q * (total - 1)
+        if rank < self.zero_count:
+            return 0.0
+        index = int(np.searchsorted(self.zero_count + np.cumsum(self.counts), rank, side="right"))
+        return float(2 * self.gamma ** (self.offset + index) / (self.gamma + 1))
+
+    def quantiles(self) -> Dict[str, float]:
+        return {label: self.quantile(q) for label, q in PERCENTILES.items()}
+
+    def to_state(self) -> Dict:
+        return {
+            "alpha": self.alpha,
+            "zero_count": self.zero_count,
+            "offset": self.offset,
+            "counts": self.counts.tolist()
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "DDSketch":
+        sketch = cls(state["alpha"])
+        sketch.zero_count = state["zero_count"]
+        sketch.offset = state["offset"]
+        sketch.counts = np.asarray(state["counts"], dtype=np.int64)
+        return sketch
+
+class HyperLogLog:
+    """
+    Contador de valores distintos combinável. Enquanto houver até `exact_limit` valores
+    guarda os hashes (contagem exata); acima disso passa para o HyperLogLog com
+    2**precision registradores de 8 bits (memória fixa, erro padrão ~1.04/sqrt(2**precision)).
+    Contadores com a mesma precisão se combinam pela união, em qualquer ordem.
+    """
+    def __init__(
+        self,
+        precision: int = settings.HLL_PRECISION,
+        exact_limit: int = settings.HLL_EXACT_LIMIT
+    ):
+        if not 4 <= precision <= 18:
+            raise ValueError("A precisão do HyperLogLog deve estar entre 4 e 18")
+        self.precision = precision
+        self.exact_limit = exact_limit
+        self._hashes: Optional[np.ndarray] = np.empty(0, dtype=np.uint64)
+        self._registers: Optional[np.ndarray] = None
+
+    @property
+    def is_exact(self) -> bool:
+        return self._registers is None
+
+    @property
+    def nbytes(self) -> int:
+        return self._hashes.nbytes if self.is_exact else self._registers.nbytes
+
+    def _to_registers(self):
+        hashes, self._hashes = self._hashes, None
+        self._registers = np.zeros(1 << self.precision, dtype=np.uint8)
+        self._add_to_registers(hashes)
+
+    def _add_to_registers(self, hashes: np.ndarray):
+        # Primeiros `precision` bits escolhem o registrador; o restante dá a posição do primeiro 1
+        suffix_bits = 64 - self.precision
+        index = (hashes >> np.uint64(suffix_bits)).astype(np.intp)
+        suffix = hashes & np.uint64((1 << suffix_bits) - 1)
+        rank = (suffix_bits - _bit_length(suffix) + 1).astype(np.uint8)
+        np.maximum.at(self._registers, index, rank)
+
+    def add_hashes(self, hashes: np.ndarray) -> "HyperLogLog":
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if self.is_exact:
+            self._hashes = np.union1d(self._hashes, hashes)
+            if len(self._hashes) > self.exact_limit:
+                self._to_registers()
+        else:
+            self._add_to_registers(hashes)
+        return self
+
+    def add(self, values: Sequence) -> "HyperLogLog":
+        return self.add_hashes(hash_values(values))
+
+    def count(self) -> int:
+        if self.is_exact:
+            return len(self._hashes)
+
+        # Estimador de Ertl (2017): sem viés nas faixas baixa e intermediária, sem tabelas empíricas
+        m = len(self._registers)
+        q = 64 - self.precision
+        histogram = np.bincount(self._registers, minlength=q + 2)
+        z = m * _tau(1 - histogram[q + 1] / m)
+        for k in range(q, 0, -1):
+            z = 0.5 * (z + histogram[k])
+        z += m * _sigma(histogram[0] / m)
+        return int(round(m * m / (2 * np.log(2) * z)))
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def copy(self) -> "HyperLogLog":
+        result = HyperLogLog(self.precision, self.exact_limit)
+        result._hashes = None if self._hashes is None else self._hashes.copy()
+        result._registers = None if self._registers is None else self._registers.copy()
+        return result
+
+    def update(self, other: "HyperLogLog") -> "HyperLogLog":
+        """
+        União com `other` (in-place)
+        """
+        if other.precision != self.precision:
+            raise ValueError(
+                f"HyperLogLogs com precisões diferentes ({self.precision} e {other.precision}) não podem ser combinados"
+            )
+        if other.is_exact:
+            return self.add_hashes(other._hashes)
+        if self.is_exact:
+            self._to_registers()
+        np.maximum(self._registers, other._registers, out=self._registers)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        return self.copy().update(other)
+
+    def to_state(self) -> Dict:
+        state = {"precision": self.precision, "exact_limit": self.exact_limit}
+        if self.is_exact:
+            state["hashes"] = _encode(self._hashes)
+        else:
+            state["registers"] = _encode(self._registers)
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "HyperLogLog":
+        sketch = cls(state["precision"], state["exact_limit"])
+        if "registers" in state:
+            sketch._hashes = None
+            sketch._registers = _decode(state["registers"], np.uint8)
+        else:
+            sketch._hashes = _decode(state["hashes"], np.uint64)
+        return sketch
+
+class SpaceSaving:
+    """
+    Top-K aproximado (Space-Saving) com no máximo `capacity` contadores. Enquanto houver
+    até `capacity` itens distintos as contagens são exatas; acima disso o item menos
+    frequente cede o contador ao novo item e cada contagem passa a ser um limite superior,
+    com superestimação de no máximo `errors[item]` (<= total / capacity). Pode ser
+    atualizado item a item e combinado entre filas e períodos.
+    """
+    def __init__(self, capacity: int = settings.TOP_REASONS_CAPACITY):
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        self.overflowed = False  # algum item já foi descartado (contagens aproximadas)
+
+    @property
+    def is_exact(self) -> bool:
+        return not self.overflowed
+
+    def _untracked_bound(self) -> int:
+        # Limite superior da contagem de qualquer item fora do resumo
+        return min(self.counts.values()) if self.overflowed and self.counts else 0
+
+    @classmethod
+    def from_counts(cls, counts: Dict[Hashable, int], capacity: int = settings.TOP_REASONS_CAPACITY) -> "SpaceSaving":
+        """
+        Resumo de contagens exatas; com mais de `capacity` itens guarda só os mais frequentes
+        """
+        sketch = cls(capacity)
+        items = list(counts.items())
+        if len(items) > capacity:
+            items = sorted(items, key=lambda item: item[1], reverse=True)[:capacity]
+            sketch.overflowed = True
+        sketch.counts = dict(items)
+        sketch.errors = dict.fromkeys(sketch.counts, 0)
+        return sketch
+
+    def add(self, item: Hashable, count: int = 1) -> "SpaceSaving":
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            victim = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(victim)
+            del self.errors[victim]
+            self.counts[item] = floor + count
+            self.errors[item] = floor
+            self.overflowed = True
+        return self
+
+    def add_counts(self, counts: Dict[Hashable, int]) -> "SpaceSaving":
+        return self.update(SpaceSaving.from_counts(counts, self.capacity))
+
+    def update(self, other: "SpaceSaving") -> "SpaceSaving":
+        """
+        Combina `other` neste resumo (in-place): itens ausentes de um dos lados recebem o
+        limite superior daquele lado, como nos resumos combináveis de Space-Saving
+        """
+        own_bound, other_bound = self._untracked_bound(), other._untracked_bound()
+        counts: Dict[Hashable, int] = {}
+        errors: Dict[Hashable, int] = {}
+        for item in chain(self.counts, other.counts):
+            if item in counts:
+                continue
+            counts[item] = self.counts.get(item, own_bound) + other.counts.get(item, other_bound)
+            errors[item] = self.errors.get(item, own_bound) + other.errors.get(item, other_bound)
+
+        self.overflowed = self.overflowed or other.overflowed
+        if len(counts) > self.capacity:
+            kept = sorted(counts, key=counts.get, reverse=True)[:self.capacity]
+            counts = {item: counts[item] for item in kept}
+            errors = {item: errors[item] for item in kept}
+            self.overflowed = True
+        self.counts, self.errors = counts, errors
+        return self
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        return self.copy().update(other)
+
+    def copy(self) -> "SpaceSaving":
+        result = SpaceSaving(self.capacity)
+        result.counts = dict(self.counts)
+        result.errors = dict(self.errors)
+        result.overflowed = self.overflowed
+        return result
+
+    def top(self, n: int = 10) -> List[Tuple[Hashable, int]]:
+        # sorted é estável: empates mantêm a ordem de primeira aparição
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def to_state(self) -> Dict:
+        return {
+            "capacity": self.capacity,
+            "overflowed": self.overflowed,
+            "items": [[item, count, self.errors[item]] for item, count in self.counts.items()]
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "SpaceSaving":
+        sketch = cls(state["capacity"])
+        sketch.overflowed = state["overflowed"]
+        sketch.counts = {item: count for item, count, _ in state["items"]}
+        sketch.errors = {item: error for item, _, error in state["items"]}
+        return sketch
@@ -0,0 +1,136 @@
+from typing import Any, AsyncIterable, Dict, List, Optional
+import asyncio
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.buckets import PERIODS, bucketize
+from app.services.analytics.metrics import KPIAggregate
+from app.services.analytics.sketches import hash_values
+
+# Buckets que terminam mais de um dia antes do bloco atual não recebem mais linhas (mesmo
+# com a hora local repetida na saída do horário de verão) e têm os clientes fechados
+CLOSE_AFTER = np.timedelta64(1, "D").astype("timedelta64[ns]").astype(np.int64)
+
+class PeriodAccumulator:
+    """
+    Séries por período (mesmas chaves de MetricsService.compute_period_series) acumuladas
+    bloco a bloco, com os blocos em ordem de start_time: por bucket guarda só contagens e
+    somas. Os clientes distintos são exatos: hashes dos clientes ficam em memória apenas
+    enquanto o bucket ainda pode receber linhas, depois viram uma contagem.
+    """
+    def __init__(self, period: str = "H", tz: Optional[str] = None):
+        if period not in PERIODS:
+            raise ValueError("Período inválido. Use '15min', 'H', 'D' ou 'W'.")
+        self.period = period
+        self.tz = tz or settings.DASHBOARD_TIMEZONE
+        self.width = int(PERIODS[period].astype("timedelta64[ns]").astype(np.int64))
+        # Início do bucket em hora local (ns) -> [recebidas, atendidas, soma TMA, qtd TMA, soma TME, qtd TME]
+        self.totals: Dict[int, np.ndarray] = {}
+        self.customers: Dict[int, int] = {}
+        self._open_customers: Dict[int, np.ndarray] = {}  # hashes ordenados por bucket aberto
+
+    def add(self, batch: InteractionBatch):
+        buckets = bucketize(batch.column("start_time"), self.period, self.tz)
+        ids, n_buckets = buckets.ids, len(buckets.starts)
+        if not n_buckets:
+            return
+        valid = ids >= 0
+        answered = batch.mask("status", "answered") & valid
+        answered_ids = ids[answered]
+        wait_time = batch.column("wait_time")[answered]
+        handle_time = batch.column("talk_time")[answered] + wait_time
+        has_wait, has_handle = ~np.isnan(wait_time), ~np.isnan(handle_time)
+
+        totals = np.stack([
+            np.bincount(ids[valid], minlength=n_buckets),
+            np.bincount(answered_ids, minlength=n_buckets),
+            np.bincount(answered_ids[has_handle], weights=handle_time[has_handle], minlength=n_buckets),
+            np.bincount(answered_ids[has_handle], minlength=n_buckets),
+            np.bincount(answered_ids[has_wait], weights=wait_time[has_wait], minlength=n_buckets),
+            np.bincount(answered_ids[has_wait], minlength=n_buckets)
+        ], axis=1).astype(np.float64)
+
+        # Pares (bucket, cliente) distintos do bloco; cada cliente é hasheado uma vez
+        customers = batch.categorical("customer_id")
+        present = valid & (customers.codes >= 0)
+        stride = len(customers.categories) or 1
+        pairs = np.unique(ids[present] * stride + customers.codes[present])
+        hashes = hash_values(customers.categories)
+        pair_buckets, pair_codes = pairs // stride, pairs % stride
+        bounds = np.searchsorted(pair_buckets, np.arange(n_buckets + 1))
+
+        starts = buckets.starts.astype(np.int64)
+        for bucket in np.flatnonzero(totals[:, 0]):
+            start = int(starts[bucket])
+            bucket_hashes = np.unique(hashes[pair_codes[bounds[bucket]:bounds[bucket + 1]]])
+            if start in self.totals:
+                self.totals[start] += totals[bucket]
+                self._open_customers[start] = np.union1d(self._open_customers[start], bucket_hashes)
+            else:
+                self.totals[start] = totals[bucket].copy()
+                self._open_customers[start] = bucket_hashes
+
+        horizon = int(starts[0]) - CLOSE_AFTER
+        for start in [start for start in self._open_customers if start + self.width <= horizon]:
+            self.customers[start] = len(self._open_customers.pop(start))
+
+    def customer_count(self, start: int) -> int:
+        if start in self._open_customers:
+            return len(self._open_customers[start])
+        return self.customers.get(start, 0)
+
+    def series(self) -> Dict[str, List]:
+        if not self.totals:
+            return {name: [] for name in (
+                "timestamps", "total_customers", "total_received_calls", "total_answered_calls", "tma", "tme"
+            )}
+        # Buckets contíguos do primeiro ao último com dados (vazios no meio valem 0)
+        starts = np.arange(min(self.totals), max(self.totals) + self.width, self.width, dtype=np.int64)
+        empty = np.zeros(6)
+        totals = np.array([self.totals.get(int(start), empty) for start in starts])
+        return {
+            "timestamps": pd.DatetimeIndex(starts.astype("datetime64[ns]")).strftime('%Y-%m-%d %H:%M:%S').tolist(),
+            "total_customers": [self.customer_count(int(start)) for start in starts],
+            "total_received_calls": totals[:, 0].astype(np.int64).tolist(),
+            "total_answered_calls": totals[:, 1].astype(np.int64).tolist(),
+            "tma": np.divide(totals[:, 2], totals[:, 3], out=np.zeros(len(starts)), where=totals[:, 3] > 0).tolist(),
+            "tme": np.divide(totals[:, 4], totals[:, 5], out=np.zeros(len(starts)), where=totals[:, 5] > 0).tolist()
+        }
+
+class StreamingAggregator:
+    """
+    Agregação em blocos para períodos longos: cada bloco de interações alimenta o agregado
+    da Tela Inicial, as séries por período e os agregados por fila e por agente, e é
+    descartado em seguida. A memória fica proporcional ao bloco (mais um agregado de
+    tamanho limitado por fila/agente/bucket), não ao período.
+    """
+    def __init__(self, target_seconds: int = 20, period: str = "H", tz: Optional[str] = None):
+        self.target_seconds = target_seconds
+        self.overview = KPIAggregate(target_seconds)
+        self.periods = PeriodAccumulator(period, tz)
+        self.queues: Dict[Any, KPIAggregate] = {}
+        self.agents: Dict[Any, KPIAggregate] = {}
+        self.rows = 0
+
+    def add(self, batch: InteractionBatch):
+        if not len(batch):
+            return
+        self.rows += len(batch)
+        self.overview.update(KPIAggregate.from_batch(batch, self.target_seconds))
+        self.periods.add(batch)
+        for column, aggregates in (("queue_id", self.queues), ("agent_id", self.agents)):
+            for key, aggregate in KPIAggregate.group_by(batch, column, self.target_seconds).items():
+                if key in aggregates:
+                    aggregates[key].update(aggregate)
+                else:
+                    aggregates[key] = aggregate
+
+    async def consume(self, chunks: AsyncIterable[InteractionBatch]) -> "StreamingAggregator":
+        """
+        Consome um fluxo de blocos (ex.: InteractionRepository.stream_interactions),
+        agregando cada bloco fora do event loop
+        """
+        async for chunk in chunks:
+            await asyncio.to_thread(self.add, chunk)
+        return self
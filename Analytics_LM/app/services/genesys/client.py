@@ -1,9 +1,27 @@
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 import os
-from datetime import datetime, timedelta
-from dateutil.tz import tzutc
-import purecloudplatformclientv2 as gc_client
-from app.models.interaction import Interaction # Importando o modelo Interaction
+import math
+import asyncio
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.core.resilience import CircuitBreaker
+from app.core.singleflight import SingleFlight, normalize_filter
+from app.services.analytics.batch import InteractionBatch
+from app.services.genesys.parser import parse_conversation
+from app.services.genesys.ratelimit import Priority
+from app.services.genesys.sharding import ShardPlanner
+from app.services.genesys.transport import GenesysAPIError, get_shared_transport
+
+CONVERSATION_DETAILS_PATH = "/api/v2/analytics/conversations/details/query"
+
+# Compartilhado entre as instâncias: buscas idênticas simultâneas viram uma só
+_interactions_flight = SingleFlight()
+# Após falhas seguidas, para de chamar a Genesys por um tempo em vez de insistir
+genesys_breaker = CircuitBreaker(
+    "genesys",
+    failure_threshold=settings.GENESYS_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.GENESYS_BREAKER_RESET_SECONDS
+)
 
 class GenesysService:
     def __init__(self):
@@ -14,12 +32,163 @@ class GenesysService:
         if not all([self.client_id, self.client_secret, self.environment]):
             raise ValueError("As variáveis de ambiente GENESYS_CLIENT_ID, GENESYS_CLIENT_SECRET e GENESYS_ENVIRONMENT devem ser configuradas.")
 
-        # Configura as credenciais da Genesys Cloud para autenticação
-        gc_client.Configuration.set_default_client_id_and_secret(self.client_id, self.client_secret)
-        gc_client.Configuration.set_default_host(f"https://api.{self.environment}.mypurecloud.com")
+        # Hosts podem ser sobrescritos (ex.: servidor local que simula a Genesys nos testes)
+        self.api_host = settings.GENESYS_API_HOST or f"https://api.{self.environment}.mypurecloud.com"
+        self.login_host = settings.GENESYS_LOGIN_HOST or f"https://login.{self.environment}.mypurecloud.com"
+
+        # Transporte assíncrono com pool de conexões compartilhado entre as instâncias
+        self.transport = get_shared_transport(
+            self.client_id,
+            self.client_secret,
+            self.api_host,
+            self.login_host
+        )
+        self.shard_planner = ShardPlanner()
+
+    @staticmethod
+    def _format_interval(start_date: datetime, end_date: datetime) -> str:
+        """
+        Formata o intervalo ISO-8601 em UTC exigido pela API de analytics
+        """
+        def to_utc(value: datetime) -> str:
+            if value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            return f"{value.isoformat(timespec='milliseconds')}Z"
+
+        return f"{to_utc(start_date)}/{to_utc(end_date)}"
+
+    @staticmethod
+    def _build_details_query(
+        start_date: datetime,
+        end_date: datetime,
+        queue_ids: Optional[List[str]] = None,
+        channel_types: Optional[List[str]] = None,
+        agent_ids: Optional[List[str]] = None
+    ) -> Dict:
+        """
+        Monta o corpo da query de detalhes de conversas
+        """
+        query_body = {
+            "interval": GenesysService._format_interval(start_date, end_date),
+            "order": "asc",
+            "orderBy": "conversationStart"
+        }
+
+        segment_filters = []
+        if queue_ids:
+            segment_filters.append({
+                "type": "or",
+                "predicates": [
+                    {"type": "dimension", "dimension": "queueId", "operator": "matches", "value": queue_id}
+                    for queue_id in queue_ids
+                ]
+            })
+
+        if channel_types:
+            segment_filters.append({
+                "type": "or",
+                "predicates": [
+                    # A API REST usa tipos de mídia em minúsculas (voice, message, ...)
+                    {"type": "dimension", "dimension": "mediaType", "operator": "matches", "value": channel_type.lower()}
+                    for channel_type in channel_types
+                ]
+            })
+
+        if agent_ids:
+            segment_filters.append({
+                "type": "or",
+                "predicates": [
+                    {"type": "dimension", "dimension": "userId", "operator": "matches", "value": agent_id}
+                    for agent_id in agent_ids
+                ]
+            })
+
+        if segment_filters:
+            query_body["segmentFilters"] = segment_filters
+
+        return query_body
+
+    async def iter_conversation_pages(
+        self,
+        query_body: Dict,
+        page_size: int = settings.GENESYS_PAGE_SIZE,
+        max_fanout: int = settings.GENESYS_PAGE_FANOUT,
+        priority: Priority = Priority.INTERACTIVE
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Percorre todas as páginas da query de detalhes de conversas.
+        A primeira página informa o total (totalHits); as demais são buscadas em paralelo,
+        com no máximo `max_fanout` páginas em voo, e entregues na ordem em que chegam.
+        """
+        async def fetch_page(page_number: int) -> List[Dict]:
+            body = dict(query_body, paging={"pageSize": page_size, "pageNumber": page_number})
+            response = await self.transport.post(CONVERSATION_DETAILS_PATH, body, priority=priority)
+            return response.get("conversations") or []
+
+        body = dict(query_body, paging={"pageSize": page_size, "pageNumber": 1})
+        first_page = await self.transport.post(CONVERSATION_DETAILS_PATH, body, priority=priority)
+        yield first_page.get("conversations") or []
+
+        total_pages = math.ceil((first_page.get("totalHits") or 0) / page_size)
+        next_page = 2
+        in_flight = set()
+        try:
+            while next_page <= total_pages or in_flight:
+                # Janela deslizante: mantém até max_fanout páginas sendo buscadas
+                while next_page <= total_pages and len(in_flight) < max_fanout:
+                    in_flight.add(asyncio.ensure_future(fetch_page(next_page)))
+                    next_page += 1
 
-        self.conversations_api = gc_client.ConversationsApi()
-        self.routing_api = gc_client.RoutingApi()
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    async def _fetch_interval(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        queue_ids: Optional[List[str]] = None,
+        channel_types: Optional[List[str]] = None,
+        agent_ids: Optional[List[str]] = None,
+        priority: Priority = Priority.INTERACTIVE
+    ) -> Dict[str, List[Dict]]:
+        """
+        Busca todas as páginas de um intervalo e devolve as linhas de interação agrupadas por conversa
+        """
+        query_body = self._build_details_query(start_date, end_date, queue_ids, channel_types, agent_ids)
+
+        by_conversation = {}
+        async for conversations in self.iter_conversation_pages(query_body, priority=priority):
+            for conv in conversations:
+                # Conversas podem mudar de página entre as requisições; evita duplicá-las
+                conversation_id = conv.get("conversationId")
+                if conversation_id not in by_conversation:
+                    rows = []
+                    parse_conversation(conv, rows, row_factory=dict)
+                    by_conversation[conversation_id] = rows
+        return by_conversation
+
+    @staticmethod
+    def _merge_shards(shard_results: List[Dict[str, List[Dict]]]) -> InteractionBatch:
+        """
+        Junta os resultados dos shards de forma determinística: uma conversa que aparece
+        em mais de um shard (atravessa a fronteira) é mantida uma única vez
+        """
+        merged = {}
+        for result in shard_results:
+            for conversation_id, rows in result.items():
+                if rows and conversation_id not in merged:
+                    merged[conversation_id] = rows
+
+        epoch = datetime.min
+        ordered = sorted(
+            merged.items(),
+            key=lambda item: (item[1][0]["start_time"] or epoch, item[0] or "")
+        )
+        return InteractionBatch.from_records([row for _, rows in ordered for row in rows])
 
     async def get_interactions(
         self,
@@ -27,108 +196,60 @@ class GenesysService:
         end_date: datetime,
         queue_ids: Optional[List[str]] = None,
         team_ids: Optional[List[str]] = None,
-        channel_types: Optional[List[str]] = None
-    ) -> List[Interaction]: # Retorna lista de objetos Interaction
+        channel_types: Optional[List[str]] = None,
+        agent_ids: Optional[List[str]] = None,
+        priority: Priority = Priority.INTERACTIVE
+    ) -> InteractionBatch:
+        """
+        Obtém interações da Genesys Cloud com filtros, em formato colunar (InteractionBatch).
+        Chamadas simultâneas com o mesmo intervalo e filtros compartilham uma única busca
+        (o resultado é compartilhado e não deve ser alterado pelos chamadores).
+        Com o circuito aberto a chamada falha imediatamente com CircuitOpenError.
+        `priority` define a classe no limitador da organização (dashboards antes de cargas em lote).
+        """
+        key = (
+            self.api_host,
+            start_date,
+            end_date,
+            normalize_filter(queue_ids),
+            normalize_filter(channel_types),
+            normalize_filter(team_ids),
+            normalize_filter(agent_ids)
+        )
+        return await _interactions_flight.do(
+            key,
+            lambda: genesys_breaker.call(
+                lambda: self._fetch_interactions(start_date, end_date, queue_ids, channel_types, agent_ids, priority)
+            )
+        )
+
+    async def _fetch_interactions(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        queue_ids: Optional[List[str]] = None,
+        channel_types: Optional[List[str]] = None,
+        agent_ids: Optional[List[str]] = None,
+        priority: Priority = Priority.INTERACTIVE
+    ) -> InteractionBatch:
         """
-        Obtém interações da Genesys Cloud com filtros (Dados Reais ou Simulados)
+        Busca efetiva na Genesys: intervalos longos são divididos em shards buscados em paralelo
         """
         try:
-            # A autenticação já está configurada no __init__
-
-            # Construção da query de analytics de conversas
-            # Para a Tela Inicial, vamos buscar um conjunto amplo de dados
-            query_body = gc_client.ConversationQuery({
-                'interval': f"{start_date.isoformat()}Z/{end_date.isoformat()}Z",
-                'metrics': ['tWait', 'tTalk', 'tHandle', 'nConnected', 'nOffered', 'nAbandon', 'nConsult', 'nOutbound', 'nTransferred'],
-                'groupBy': ['queueId', 'mediaType', 'agentId', 'direction', 'wrapUpCode'] # Adicionado wrapUpCode para motivo
-            })
+            shards = self.shard_planner.plan(start_date, end_date)
+            semaphore = asyncio.Semaphore(settings.GENESYS_SHARD_FANOUT)
+
+            async def fetch_shard(shard_start: datetime, shard_end: datetime):
+                async with semaphore:
+                    return await self._fetch_interval(shard_start, shard_end, queue_ids, channel_types, agent_ids, priority)
 
-            predicates = []
-            if queue_ids:
-                predicates.append(gc_client.ConversationPredicate({
-                    'type': 'DIMENSION',
-                    'dimension': 'queueId',
-                    'operator': 'IN',
-                    'value': queue_id
-                }) for queue_id in queue_ids)
-
-            if channel_types:
-                predicates.append(gc_client.ConversationPredicate({
-                    'type': 'DIMENSION',
-                    'dimension': 'mediaType',
-                    'operator': 'IN',
-                    'value': channel_type.upper() # Genesys usa maiúsculas para tipos de mídia
-                }) for channel_type in channel_types)
-            
-            if predicates:
-                query_body.filter = gc_client.ConversationFilter({
-                    'type': 'AND',
-                    'predicates': list(predicates)
-                })
-
-            # Executa a query
-            response = self.conversations_api.post_analytics_conversations_details_query(query_body)
-            
-            interactions_data = []
-            if response.conversations:
-                for conv in response.conversations:
-                    customer_id = next((p.participant_id for p in conv.participants if p.purpose == "customer"), None)
-
-                    for participant in conv.participants:
-                        if participant.purpose == "agent" and participant.sessions:
-                            for session in participant.sessions:
-                                for segment in session.segments:
-                                    if segment.segment_type == "interact" and segment.queue_id:
-                                        # Extrair motivo/assunto (exemplo simplificado, pode variar na Genesys)
-                                        reason = next((w.code for w in participant.wrapup if w.code) for p in conv.participants if p.wrapup and p.purpose == "agent" ) if participant.wrapup else None
-                                        if not reason: # Tenta pegar de outros participantes se o agente não tiver wrapup
-                                             reason = next((w.code for w in p.wrapup if w.code) for p in conv.participants if p.wrapup and p.purpose != "agent" and p.purpose != "external")
-                                        
-                                        # Preenchimento de outros campos com lógica simulada/simplificada para começar
-                                        is_auto_service = False
-                                        auto_service_type = None
-                                        #TODO: Implementar lógica de auto serviço baseado em fluxo real da URA/Bot
-
-                                        is_callback = False
-                                        callback_reason = None
-                                        #TODO: Implementar lógica de rechamada
-
-                                        is_duplicate_channel = False
-                                        #TODO: Implementar lógica de canal duplicado
-
-                                        # Convertendo as datas para datetime objects
-                                        start_time = datetime.fromisoformat(conv.conversation_start_time.replace('Z', '+00:00')) if conv.conversation_start_time else None
-                                        end_time = datetime.fromisoformat(conv.conversation_end_time.replace('Z', '+00:00')) if conv.conversation_end_time else None
-
-                                        duration = (end_time - start_time).total_seconds() if start_time and end_time else 0
-                                        wait_time = next((m.value for m in session.metrics if m.metric == "tWait"), 0) if session.metrics else 0
-                                        talk_time = next((m.value for m in session.metrics if m.metric == "tTalk"), 0) if session.metrics else 0
-                                        status = "answered" if next((m.value for m in session.metrics if m.metric == "nConnected"), 0) > 0 else "abandoned"
-
-                                        interaction = Interaction(
-                                            id=conv.conversation_id,
-                                            customer_id=customer_id,
-                                            agent_id=participant.participant_id,
-                                            queue_id=segment.queue_id,
-                                            channel_type=session.media_type,
-                                            start_time=start_time,
-                                            end_time=end_time,
-                                            duration=duration,
-                                            wait_time=wait_time,
-                                            talk_time=talk_time,
-                                            status=status,
-                                            reason=reason,
-                                            is_auto_service=is_auto_service,
-                                            auto_service_type=auto_service_type,
-                                            is_callback=is_callback,
-                                            callback_reason=callback_reason,
-                                            is_duplicate_channel=is_duplicate_channel
-                                        )
-                                        interactions_data.append(interaction)
-
-            return interactions_data
+            shard_results = await asyncio.gather(*[fetch_shard(s, e) for s, e in shards])
+            return self._merge_shards(shard_results)
+        except GenesysAPIError as e:
+            # Mantém o tipo e o status HTTP: quem chama distingue 4xx de indisponibilidade
+            raise GenesysAPIError(f"Erro ao buscar interações da Genesys Cloud: {str(e)}", status_code=e.status_code) from e
         except Exception as e:
-            raise Exception(f"Erro ao buscar interações da Genesys Cloud: {str(e)}")
+            raise Exception(f"Erro ao buscar interações da Genesys Cloud: {str(e)}") from e
 
     async def get_agent_metrics(
         self,
@@ -0,0 +1,116 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from datetime import datetime, timezone
+from app.models.interaction import Interaction
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """
+    Converte a data ISO da API em datetime UTC sem fuso (mesma convenção do intervalo das queries)
+    """
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
+
+def _first_wrapup_code(participant: Dict) -> Optional[str]:
+    for session in participant.get("sessions") or ():
+        for segment in session.get("segments") or ():
+            code = segment.get("wrapUpCode")
+            if code:
+                return code
+    return None
+
+def _session_metrics(session: Dict) -> Dict[str, float]:
+    # Índice das métricas por nome; vale a primeira ocorrência de cada métrica
+    metrics = {}
+    for metric in session.get("metrics") or ():
+        name = metric.get("name")
+        if name not in metrics:
+            metrics[name] = metric.get("value") or 0
+    return metrics
+
+def parse_conversation(conv: Dict, out: List[Any], row_factory: Callable[..., Any] = Interaction):
+    """
+    Converte uma conversa em linhas (uma por segmento de atendimento do agente),
+    criadas com `row_factory` (por padrão, Interaction). A conversa é indexada uma
+    única vez (cliente, códigos de wrap-up e participantes de atendimento), então o
+    custo é linear no tamanho da conversa mesmo com muitas transferências.
+    """
+    participants = conv.get("participants") or ()
+
+    customer_id = None
+    fallback_reason = None
+    agents = []
+    for participant in participants:
+        purpose = participant.get("purpose")
+        if purpose == "agent":
+            if participant.get("sessions"):
+                agents.append(participant)
+            continue
+        if purpose == "customer" and customer_id is None:
+            customer_id = participant.get("participantId")
+        # Motivo de reserva: wrap-up de outros participantes (exceto externos)
+        if purpose != "external" and fallback_reason is None:
+            fallback_reason = _first_wrapup_code(participant)
+
+    if not agents:
+        return
+
+    conversation_id = conv.get("conversationId")
+    start_time = parse_datetime(conv.get("conversationStart"))
+    end_time = parse_datetime(conv.get("conversationEnd"))
+    duration = (end_time - start_time).total_seconds() if start_time and end_time else 0
+
+    for participant in agents:
+        reason = _first_wrapup_code(participant) or fallback_reason
+        agent_id = participant.get("userId") or participant.get("participantId")
+
+        for session in participant["sessions"]:
+            metrics = None
+            for segment_index, segment in enumerate(session.get("segments") or ()):
+                queue_id = segment.get("queueId")
+                if segment.get("segmentType") != "interact" or not queue_id:
+                    continue
+
+                if metrics is None:
+                    # As métricas de sessão da API REST vêm em milissegundos
+                    metrics = _session_metrics(session)
+                    session_id = session.get("sessionId") or participant.get("participantId")
+                    wait_time = metrics.get("tWait", 0) / 1000
+                    talk_time = metrics.get("tTalk", 0) / 1000
+                    status = "answered" if metrics.get("nConnected", 0) > 0 else "abandoned"
+
+                # Uma conversa gera várias linhas (transferências), então o id combina conversa, sessão e segmento
+                out.append(row_factory(
+                    id=f"{conversation_id}:{session_id}:{segment_index}",
+                    conversation_id=conversation_id,
+                    customer_id=customer_id,
+                    agent_id=agent_id,
+                    queue_id=queue_id,
+                    channel_type=session.get("mediaType"),
+                    start_time=start_time,
+                    end_time=end_time,
+                    duration=duration,
+                    wait_time=wait_time,
+                    talk_time=talk_time,
+                    status=status,
+                    reason=reason,
+                    #TODO: Implementar lógica de auto serviço baseado em fluxo real da URA/Bot
+                    is_auto_service=False,
+                    auto_service_type=None,
+                    # Rechamada e canal duplicado são preenchidos na ingestão (ContactFlagger),
+                    # com o histórico do cliente
+                    is_callback=False,
+                    callback_reason=None,
+                    is_duplicate_channel=False
+                ))
+
+def parse_conversations(
+    conversations: Iterable[Dict],
+    row_factory: Callable[..., Any] = Interaction
+) -> List[Any]:
+    """
+    Converte as conversas retornadas pela API em linhas (Interaction) em uma única passada
+    """
+    interactions = []
+    for conv in conversations:
+        parse_conversation(conv, interactions, row_factory)
+    return interactions
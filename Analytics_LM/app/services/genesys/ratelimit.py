@@ -0,0 +1,149 @@
+from typing import List, Optional, Tuple
+from contextlib import asynccontextmanager
+from enum import IntEnum
+import asyncio
+import heapq
+import itertools
+import time
+from app.core.config import settings
+
+class Priority(IntEnum):
+    """
+    Classes de prioridade das chamadas à Genesys (menor valor = atendido primeiro)
+    """
+    INTERACTIVE = 0  # requisições disparadas por usuários (dashboards)
+    SYNC = 1         # sincronização incremental periódica
+    BULK = 2         # backfill, exportações e cargas do Power BI
+
+class _Slot:
+    """
+    Permissão de uma requisição; informa ao limitador o resultado da chamada
+    """
+    def __init__(self, limiter: "AdaptiveRateLimiter"):
+        self.limiter = limiter
+        self.outcome = "success"
+        self.retry_after: Optional[float] = None
+
+    def throttled(self, retry_after: Optional[float] = None):
+        self.outcome = "throttled"
+        self.retry_after = retry_after
+
+    def failed(self):
+        self.outcome = "failed"
+
+class AdaptiveRateLimiter:
+    """
+    Agenda as chamadas à API combinando:
+    - token bucket (taxa média e rajada máxima de requisições por segundo);
+    - concorrência adaptativa AIMD: o limite sobe 1 a cada janela sem 429 e cai pela
+      metade a cada 429, respeitando o Retry-After antes de liberar novas chamadas;
+    - fila por prioridade: chamadas interativas passam na frente de sync e cargas em lote.
+    """
+    def __init__(
+        self,
+        rate_per_second: float = settings.GENESYS_RATE_LIMIT_PER_SECOND,
+        burst: int = settings.GENESYS_RATE_LIMIT_BURST,
+        min_concurrency: int = settings.GENESYS_MIN_CONCURRENCY,
+        initial_concurrency: int = settings.GENESYS_INITIAL_CONCURRENCY,
+        max_concurrency: int = settings.GENESYS_MAX_CONCURRENCY
+    ):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = max(min_concurrency, min(initial_concurrency, max_concurrency))
+
+        self.tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self.in_flight = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._refilled_at) * self.rate_per_second)
+        self._refilled_at = now
+
+    def _schedule(self, delay: float):
+        loop = asyncio.get_running_loop()
+        if self._timer is not None:
+            if self._timer_loop is loop:
+                return
+            # Timer de um event loop que já terminou (ex.: asyncio.run anterior) nunca dispara
+            self._timer.cancel()
+
+        def wake():
+            self._timer = None
+            self._dispatch()
+
+        self._timer = loop.call_later(max(delay, 0.001), wake)
+        self._timer_loop = loop
+
+    def _dispatch(self):
+        now = time.monotonic()
+        if now < self._paused_until:
+            self._schedule(self._paused_until - now)
+            return
+
+        self._refill(now)
+        while self._waiters and self.in_flight < self.limit:
+            priority, sequence, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.tokens < 1:
+                self._schedule((1 - self.tokens) / self.rate_per_second)
+                return
+            heapq.heappop(self._waiters)
+            self.tokens -= 1
+            self.in_flight += 1
+            future.set_result(None)
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Cancelado depois de receber a permissão: devolve a vaga
+            if future.done() and not future.cancelled():
+                self.in_flight -= 1
+                self._dispatch()
+            raise
+
+    def release(self, slot: _Slot):
+        self.in_flight -= 1
+        if slot.outcome == "throttled":
+            self.on_throttled(slot.retry_after)
+        elif slot.outcome == "success":
+            self._successes += 1
+            # Aumento aditivo: uma janela inteira sem 429 libera mais uma chamada simultânea
+            if self._successes >= self.limit:
+                self._successes = 0
+                self.limit = min(self.max_concurrency, self.limit + 1)
+        self._dispatch()
+
+    def on_throttled(self, retry_after: Optional[float] = None):
+        # Redução multiplicativa e pausa até o Retry-After informado pela API
+        self._successes = 0
+        self.limit = max(self.min_concurrency, self.limit // 2)
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        self.tokens = min(self.tokens, 0.0)
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE):
+        await self.acquire(priority)
+        slot = _Slot(self)
+        try:
+            yield slot
+        except BaseException:
+            if slot.outcome == "success":
+                slot.failed()
+            raise
+        finally:
+            self.release(slot)
@@ -0,0 +1,66 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from app.core.config import settings
+
+class ShardPlanner:
+    """
+    Divide um intervalo longo em sub-intervalos (shards) alinhados à hora cheia,
+    dimensionados pelo volume esperado de conversas, para que cada query de
+    detalhes fique dentro dos limites da API e possa rodar em paralelo.
+    """
+    def __init__(
+        self,
+        expected_per_hour: int = settings.GENESYS_EXPECTED_CONVERSATIONS_PER_HOUR,
+        max_per_shard: int = settings.GENESYS_MAX_CONVERSATIONS_PER_SHARD,
+        hourly_profile: Optional[Dict[int, int]] = None,
+        max_shard_hours: int = 24
+    ):
+        if expected_per_hour <= 0 or max_per_shard <= 0:
+            raise ValueError("O volume esperado e o máximo por shard devem ser positivos.")
+
+        self.expected_per_hour = expected_per_hour
+        self.max_per_shard = max_per_shard
+        # Volume esperado por hora do dia (0-23); horas ausentes usam expected_per_hour
+        self.hourly_profile = hourly_profile or {}
+        self.max_shard_hours = max_shard_hours
+
+    def expected_volume(self, hour_start: datetime) -> int:
+        return self.hourly_profile.get(hour_start.hour, self.expected_per_hour)
+
+    def plan(self, start_date: datetime, end_date: datetime) -> List[Tuple[datetime, datetime]]:
+        """
+        Agrupa horas consecutivas enquanto o volume esperado couber em um shard.
+        Horas de pico viram shards de 1h; madrugadas são agrupadas em shards maiores.
+        Os shards nunca atravessam a meia-noite.
+        """
+        if end_date <= start_date:
+            return []
+
+        shards = []
+        shard_start = start_date
+        shard_volume = 0
+        shard_hours = 0
+        cursor = start_date.replace(minute=0, second=0, microsecond=0)
+
+        while cursor < end_date:
+            hour_end = cursor + timedelta(hours=1)
+            volume = self.expected_volume(cursor)
+
+            # Fecha o shard atual se a próxima hora estourar o limite ou mudar o dia
+            crosses_day = shard_hours > 0 and cursor.hour == 0
+            if shard_hours > 0 and (
+                shard_volume + volume > self.max_per_shard
+                or shard_hours >= self.max_shard_hours
+                or crosses_day
+            ):
+                shards.append((shard_start, cursor))
+                shard_start = cursor
+                shard_volume = 0
+                shard_hours = 0
+
+            shard_volume += volume
+            shard_hours += 1
+            cursor = hour_end
+
+        shards.append((shard_start, end_date))
+        return shards
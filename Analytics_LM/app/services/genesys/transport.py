@@ -0,0 +1,197 @@
+from typing import Dict, Optional, Tuple
+import asyncio
+import random
+import time
+import httpx
+from app.core.config import settings
+from app.services.genesys.ratelimit import AdaptiveRateLimiter, Priority
+
+# Respostas transitórias que valem nova tentativa
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+class GenesysAPIError(Exception):
+    """
+    Erro retornado pela API da Genesys Cloud (mantém o status HTTP para tratamento)
+    """
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class GenesysTransport:
+    """
+    Transporte HTTP assíncrono para a API da Genesys Cloud.
+    Mantém um pool de conexões (keep-alive) compartilhado e agenda as requisições pelo
+    limitador adaptativo (taxa, concorrência e prioridade), sem bloquear o event loop do uvicorn.
+    """
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        api_host: str,
+        login_host: str,
+        max_connections: int = settings.GENESYS_MAX_CONNECTIONS,
+        max_keepalive_connections: int = settings.GENESYS_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = settings.GENESYS_KEEPALIVE_EXPIRY,
+        max_concurrency: int = settings.GENESYS_MAX_CONCURRENCY,
+        timeout: float = settings.GENESYS_TIMEOUT,
+        max_retries: int = settings.GENESYS_MAX_RETRIES,
+        limiter: Optional[AdaptiveRateLimiter] = None
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_host = api_host.rstrip("/")
+        self.login_host = login_host.rstrip("/")
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(timeout)
+        self.max_retries = max_retries
+        self.limiter = limiter or AdaptiveRateLimiter(max_concurrency=max_concurrency)
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # O cliente é criado sob demanda para ficar associado ao event loop em execução
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return self._client
+
+    async def _get_token(self) -> str:
+        """
+        Obtém (ou reaproveita) o token OAuth client credentials
+        """
+        async with self._token_lock:
+            # Renova com 60s de folga para não usar um token prestes a expirar
+            if self._token and time.monotonic() < self._token_expires_at - 60:
+                return self._token
+
+            response = await self._get_client().post(
+                f"{self.login_host}/oauth/token",
+                data={"grant_type": "client_credentials"},
+                auth=(self.client_id, self.client_secret)
+            )
+            if response.status_code != 200:
+                raise GenesysAPIError(
+                    f"Falha na autenticação com a Genesys Cloud: {response.status_code} {response.text}",
+                    status_code=response.status_code
+                )
+
+            payload = response.json()
+            self._token = payload["access_token"]
+            self._token_expires_at = time.monotonic() + payload.get("expires_in", 3600)
+            return self._token
+
+    def _invalidate_token(self):
+        self._token = None
+        self._token_expires_at = 0.0
+
+    @staticmethod
+    def _retry_delay(response: Optional[httpx.Response], attempt: int) -> float:
+        """
+        Usa o Retry-After da API quando presente; senão, backoff exponencial com jitter
+        """
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return max(float(retry_after), 0.0)
+                except ValueError:
+                    pass
+        return min(2 ** attempt, 30) * (0.5 + random.random() / 2)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        priority: Priority = Priority.INTERACTIVE
+    ) -> Dict:
+        """
+        Executa uma requisição autenticada, respeitando o limite da organização,
+        com novas tentativas em 429/5xx transitórios e falhas de conexão
+        """
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                async with self.limiter.slot(priority) as slot:
+                    for token_attempt in range(2):
+                        token = await self._get_token()
+                        response = await self._get_client().request(
+                            method,
+                            f"{self.api_host}{path}",
+                            json=json,
+                            params=params,
+                            headers={"Authorization": f"Bearer {token}"}
+                        )
+                        # Token revogado/expirado: renova uma única vez
+                        if response.status_code == 401 and token_attempt == 0:
+                            self._invalidate_token()
+                            continue
+                        break
+
+                    if response.status_code == 429:
+                        slot.throttled(self._retry_delay(response, attempt))
+                    elif response.status_code >= 500:
+                        slot.failed()
+            except (httpx.TimeoutException, httpx.NetworkError) as e:
+                if attempt >= self.max_retries:
+                    raise GenesysAPIError(f"Falha de conexão em {method} {path}: {str(e)}")
+                await asyncio.sleep(self._retry_delay(None, attempt))
+                continue
+
+            if response.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                await asyncio.sleep(self._retry_delay(response, attempt))
+                continue
+            break
+
+        if response.status_code >= 400:
+            raise GenesysAPIError(
+                f"Erro {response.status_code} em {method} {path}: {response.text}",
+                status_code=response.status_code
+            )
+        return response.json() if response.content else {}
+
+    async def post(self, path: str, json: Dict, priority: Priority = Priority.INTERACTIVE) -> Dict:
+        return await self.request("POST", path, json=json, priority=priority)
+
+    async def get(self, path: str, params: Optional[Dict] = None, priority: Priority = Priority.INTERACTIVE) -> Dict:
+        return await self.request("GET", path, params=params, priority=priority)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+# Transportes compartilhados entre todas as instâncias de GenesysService
+_transports: Dict[Tuple[str, str], GenesysTransport] = {}
+
+def get_shared_transport(
+    client_id: str,
+    client_secret: str,
+    api_host: str,
+    login_host: str
+) -> GenesysTransport:
+    """
+    Retorna o transporte compartilhado para as credenciais/host informados,
+    de forma que todos os endpoints usem o mesmo pool de conexões
+    """
+    key = (client_id, api_host)
+    transport = _transports.get(key)
+    if transport is None:
+        transport = GenesysTransport(client_id, client_secret, api_host, login_host)
+        _transports[key] = transport
+    return transport
+
+async def close_shared_transports():
+    """
+    Fecha os pools de conexão (usar no shutdown da aplicação)
+    """
+    for transport in _transports.values():
+        await transport.close()
+    _transports.clear()
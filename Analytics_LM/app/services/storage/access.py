@@ -0,0 +1,188 @@
+from typing import Dict, List, NamedTuple, Optional, Sequence, Union
+import asyncio
+from datetime import datetime
+from app.core.config import settings
+from app.core.resilience import StaleWhileRevalidate
+from app.core.singleflight import normalize_filter
+from app.models.interaction import AgentMetrics, QueueMetrics
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.metrics import KPIAggregate
+from app.services.analytics.parallel import ParallelAggregator
+from app.services.genesys.client import genesys_breaker
+from app.services.storage.repository import InteractionRepository, to_utc_naive
+from app.services.storage.rollups import AGENT_GRANULARITIES, QUEUE_GRANULARITIES, ROLLUPS_SOURCE, plan_ranges
+from app.services.storage.sync import INTERACTIONS_SOURCE
+
+class DataResult(NamedTuple):
+    interactions: InteractionBatch
+    as_of: Optional[datetime]  # última sincronização com a Genesys refletida nos dados (UTC)
+    stale: bool
+
+class AggregateResult(NamedTuple):
+    aggregates: Dict[Optional[str], KPIAggregate]  # por fila ou agente
+    as_of: Optional[datetime]
+    stale: bool
+
+# Compartilhado entre os endpoints: um resultado por período/filtros
+_swr = StaleWhileRevalidate(
+    fresh_ttl=settings.SWR_FRESH_TTL,
+    max_stale=settings.SWR_MAX_STALE
+)
+
+class DataAccessService:
+    """
+    Camada de acesso a dados dos dashboards: responde com o último resultado bom
+    imediatamente (stale-while-revalidate) e informa quão atualizados estão os dados
+    em relação à Genesys, sem depender da saúde do upstream no caminho da requisição.
+    """
+    def __init__(self, repository: Optional[InteractionRepository] = None):
+        self.repository = repository or InteractionRepository()
+        self.aggregator = ParallelAggregator()
+
+    async def get_interactions(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        queue_ids: Optional[List[str]] = None,
+        team_ids: Optional[List[str]] = None,
+        channel_types: Optional[List[str]] = None,
+        agent_ids: Optional[List[str]] = None
+    ) -> DataResult:
+        async def load():
+            interactions, watermark = await asyncio.gather(
+                self.repository.get_interactions(
+                    start_date=start_date,
+                    end_date=end_date,
+                    queue_ids=queue_ids,
+                    team_ids=team_ids,
+                    channel_types=channel_types,
+                    agent_ids=agent_ids
+                ),
+                asyncio.to_thread(self.repository.get_watermark, INTERACTIONS_SOURCE)
+            )
+            return interactions, watermark.last_synced_at if watermark else None
+
+        key = (
+            to_utc_naive(start_date),
+            to_utc_naive(end_date),
+            normalize_filter(queue_ids),
+            normalize_filter(team_ids),
+            normalize_filter(channel_types),
+            normalize_filter(agent_ids)
+        )
+        result = await _swr.get(key, load)
+        interactions, as_of = result.value
+        return DataResult(interactions, as_of, result.stale or self.is_lagging(as_of))
+
+    def _load_rollups(
+        self,
+        model,
+        key_column: str,
+        ranges: List,
+        keys: Optional[List[str]],
+        channel_types: Optional[List[str]]
+    ) -> Dict[Optional[str], KPIAggregate]:
+        aggregates: Dict[Optional[str], KPIAggregate] = {}
+        for granularity, start, end in ranges:
+            for key, state in self.repository.get_rollup_states(
+                model, key_column, granularity, start, end, keys, channel_types
+            ):
+                aggregate = KPIAggregate.from_state(state)
+                if key in aggregates:
+                    aggregates[key].update(aggregate)
+                else:
+                    aggregates[key] = aggregate
+        return aggregates
+
+    async def _get_aggregates(
+        self,
+        model,
+        key_column: str,
+        granularities: Sequence[str],
+        start_date: datetime,
+        end_date: datetime,
+        keys: Optional[List[str]],
+        channel_types: Optional[List[str]]
+    ) -> AggregateResult:
+        start_date, end_date = to_utc_naive(start_date), to_utc_naive(end_date)
+        rollups_watermark, sync_watermark = await asyncio.gather(
+            asyncio.to_thread(self.repository.get_watermark, ROLLUPS_SOURCE),
+            asyncio.to_thread(self.repository.get_watermark, INTERACTIONS_SOURCE)
+        )
+        coverage_end = rollups_watermark.last_conversation_end if rollups_watermark else None
+        rollup_ranges, raw_ranges = plan_ranges(start_date, end_date, coverage_end, granularities)
+
+        # Estados dos rollups são lidos e combinados fora do event loop
+        aggregates = await asyncio.to_thread(
+            self._load_rollups, model, key_column, rollup_ranges, keys, channel_types
+        )
+
+        as_of = sync_watermark.last_synced_at if sync_watermark else None
+        stale = self.is_lagging(as_of)
+        key_filter = {"queue_ids": keys} if key_column == "queue_id" else {"agent_ids": keys}
+        for start, end in raw_ranges:
+            result = await self.get_interactions(start, end, channel_types=channel_types, **key_filter)
+            stale = stale or result.stale
+            partials = await self.aggregator.group_by(result.interactions, key_column)
+            for key, aggregate in partials.items():
+                if key in aggregates:
+                    aggregates[key].update(aggregate)
+                else:
+                    aggregates[key] = aggregate
+        return AggregateResult(aggregates, as_of, stale)
+
+    async def get_queue_aggregates(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        queue_ids: Optional[List[str]] = None,
+        channel_types: Optional[List[str]] = None
+    ) -> AggregateResult:
+        """
+        Agregados por fila no período a partir dos rollups diários e horários; só as bordas
+        que não fecham uma hora e o trecho ainda não materializado vêm das interações
+        """
+        return await self._get_aggregates(
+            QueueMetrics, "queue_id", QUEUE_GRANULARITIES, start_date, end_date, queue_ids, channel_types
+        )
+
+    async def get_agent_aggregates(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        agent_ids: Optional[List[str]] = None,
+        channel_types: Optional[List[str]] = None
+    ) -> AggregateResult:
+        """
+        Agregados por agente no período a partir dos rollups diários; só as bordas que
+        não fecham um dia e o trecho ainda não materializado vêm das interações
+        """
+        return await self._get_aggregates(
+            AgentMetrics, "agent_id", AGENT_GRANULARITIES, start_date, end_date, agent_ids, channel_types
+        )
+
+    @staticmethod
+    def is_lagging(as_of: Optional[datetime]) -> bool:
+        """
+        Os dados estão atrasados se a sincronização não roda há mais de dois ciclos
+        ou se o circuito da Genesys está aberto
+        """
+        if genesys_breaker.state != genesys_breaker.CLOSED:
+            return True
+        if as_of is None:
+            return True
+        return (datetime.utcnow() - as_of).total_seconds() > 2 * settings.UPDATE_INTERVAL
+
+    @staticmethod
+    def freshness_headers(result: Union[DataResult, AggregateResult]) -> Dict[str, str]:
+        """
+        Cabeçalhos de resposta que descrevem a atualidade dos dados servidos
+        """
+        headers = {
+            "X-Data-Stale": "true" if result.stale else "false",
+            "X-Upstream-Circuit": genesys_breaker.state
+        }
+        if result.as_of is not None:
+            headers["X-Data-As-Of"] = f"{result.as_of.isoformat()}Z"
+            headers["X-Data-Staleness-Seconds"] = str(int((datetime.utcnow() - result.as_of).total_seconds()))
+        return headers
@@ -0,0 +1,159 @@
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import asyncio
+import time
+from app.core.config import settings
+from app.services.analytics.batch import InteractionBatch
+
+EPOCH = datetime(1970, 1, 1)
+
+BYTES_PER_BLOCK = 200
+
+class _Block:
+    __slots__ = ("interactions", "expires_at", "size")
+
+    def __init__(self, interactions: InteractionBatch, expires_at: Optional[float]):
+        self.interactions = interactions
+        self.expires_at = expires_at
+        self.size = BYTES_PER_BLOCK + interactions.nbytes
+
+class InteractionBlockCache:
+    """
+    Cache de interações por bloco fixo de tempo (ex.: 1 hora) e conjunto de filtros.
+    Uma consulta de período é montada a partir dos blocos já em cache e só os blocos
+    faltantes são buscados (agrupados em faixas contíguas). Blocos fechados não expiram
+    (saem por LRU ou invalidação após gravações); o bloco em aberto tem TTL curto.
+    """
+    def __init__(
+        self,
+        block_size: timedelta = timedelta(minutes=settings.CACHE_BLOCK_MINUTES),
+        max_bytes: int = settings.CACHE_MAX_MB * 1024 * 1024,
+        open_block_ttl: float = settings.CACHE_OPEN_BLOCK_TTL
+    ):
+        self.block_size = block_size
+        self.max_bytes = max_bytes
+        self.open_block_ttl = open_block_ttl
+        self._blocks: "OrderedDict[Tuple[Hashable, datetime], _Block]" = OrderedDict()
+        self._bytes = 0
+        # Incrementado a cada invalidação; cargas iniciadas antes dela não são gravadas
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def block_start(self, value: datetime) -> datetime:
+        return EPOCH + ((value - EPOCH) // self.block_size) * self.block_size
+
+    def block_starts(self, start_date: datetime, end_date: datetime) -> List[datetime]:
+        blocks = []
+        cursor = self.block_start(start_date)
+        while cursor < end_date:
+            blocks.append(cursor)
+            cursor += self.block_size
+        return blocks
+
+    def _get(self, key: Tuple[Hashable, datetime]) -> Optional[_Block]:
+        block = self._blocks.get(key)
+        if block is None:
+            return None
+        if block.expires_at is not None and block.expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._blocks.move_to_end(key)
+        return block
+
+    def _remove(self, key: Tuple[Hashable, datetime]):
+        block = self._blocks.pop(key, None)
+        if block is not None:
+            self._bytes -= block.size
+
+    def _put(self, key: Tuple[Hashable, datetime], interactions: InteractionBatch, now: datetime):
+        block_end = key[1] + self.block_size
+        # O bloco que ainda está acontecendo recebe dados novos: TTL curto
+        expires_at = time.monotonic() + self.open_block_ttl if block_end > now else None
+        block = _Block(interactions, expires_at)
+        if block.size > self.max_bytes:
+            return
+
+        self._remove(key)
+        self._blocks[key] = block
+        self._bytes += block.size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._blocks.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def _contiguous_runs(self, blocks: List[datetime]) -> List[Tuple[datetime, datetime]]:
+        runs = []
+        for block in blocks:
+            if runs and runs[-1][1] == block:
+                runs[-1] = (runs[-1][0], block + self.block_size)
+            else:
+                runs.append((block, block + self.block_size))
+        return runs
+
+    async def get_range(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        filters_key: Hashable,
+        loader: Callable[[datetime, datetime], Awaitable[InteractionBatch]]
+    ) -> InteractionBatch:
+        """
+        Retorna as interações de [start_date, end_date) combinando blocos em cache
+        com a carga (via `loader`) apenas dos blocos faltantes
+        """
+        blocks = self.block_starts(start_date, end_date)
+        cached: Dict[datetime, InteractionBatch] = {}
+        missing = []
+        for block in blocks:
+            entry = self._get((filters_key, block))
+            if entry is None:
+                missing.append(block)
+            else:
+                cached[block] = entry.interactions
+        self.hits += len(cached)
+        self.misses += len(missing)
+
+        if missing:
+            generation = self._generation
+            runs = self._contiguous_runs(missing)
+            loaded = await asyncio.gather(*[loader(run_start, run_end) for run_start, run_end in runs])
+
+            now = datetime.utcnow()
+            store = generation == self._generation
+            for (run_start, run_end), batch in zip(runs, loaded):
+                # Cada faixa carregada é fatiada por bloco com busca binária em start_time
+                run_blocks = self.block_starts(run_start, run_end)
+                parts = batch.sorted_by_time().split_by_time(run_blocks + [run_end])
+                for block, rows in zip(run_blocks, parts):
+                    cached[block] = rows
+                    if store:
+                        self._put((filters_key, block), rows, now)
+
+        # Costura os blocos em ordem e recorta as bordas do período pedido
+        parts = []
+        for block in blocks:
+            rows = cached[block]
+            if block < start_date or block + self.block_size > end_date:
+                rows = rows.between(start_date, end_date)
+            parts.append(rows)
+        parts = [rows for rows in parts if len(rows)]
+        stitched = InteractionBatch.concat(parts)
+        if len(parts) > 1:
+            # As métricas agregam por bloco e reaproveitam os blocos que continuam em cache
+            stitched.parts = tuple(parts)
+        return stitched
+
+    def invalidate(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None):
+        """
+        Remove os blocos (de todos os filtros) que intersectam o período; sem período, limpa tudo
+        """
+        self._generation += 1
+        if start_date is None or end_date is None:
+            self._blocks.clear()
+            self._bytes = 0
+            return
+
+        first_block = self.block_start(start_date)
+        for key in [k for k in self._blocks if first_block <= k[1] <= end_date]:
+            self._remove(key)
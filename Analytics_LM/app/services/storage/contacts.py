@@ -0,0 +1,86 @@
+from typing import Optional, Sequence
+import asyncio
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.contacts import detect_duplicate_channels, detect_repeat_contacts
+from app.services.storage.repository import InteractionRepository, to_utc_naive
+
+# Colunas preenchidas pelo ContactFlagger
+FLAG_COLUMNS = ("is_callback", "callback_reason", "is_duplicate_channel")
+
+def _changed(before: InteractionBatch, after: InteractionBatch) -> np.ndarray:
+    changed = np.zeros(len(before), dtype=bool)
+    for name in FLAG_COLUMNS:
+        changed |= before.column(name) != after.column(name)
+    return changed
+
+class ContactFlagger:
+    """
+    Marca rechamadas e duplicidade de canal de forma incremental na ingestão. As flags de
+    uma interação só dependem dos contatos do mesmo cliente até a janela antes dela
+    (contatos mais longos que a janela de rechamada, inclusive os ainda abertos, ficam
+    fora); para um lote novo com inícios em [a, b] basta ler do armazenamento local
+    [a - janela, b + janela]: as linhas novas recebem as flags e as já gravadas em
+    [a, b + janela] cujas flags mudaram (ex.: contato anterior que chegou atrasado) são
+    devolvidas junto para serem regravadas.
+    """
+    def __init__(
+        self,
+        repository: Optional[InteractionRepository] = None,
+        window: timedelta = timedelta(hours=settings.CALLBACK_WINDOW_HOURS),
+        same_queue: bool = settings.CALLBACK_SAME_QUEUE,
+        duplicate_gap: timedelta = timedelta(minutes=settings.DUPLICATE_CHANNEL_GAP_MINUTES),
+        duplicate_channels: Sequence[str] = tuple(settings.DUPLICATE_CHANNELS)
+    ):
+        self.repository = repository or InteractionRepository()
+        self.window = window
+        self.same_queue = same_queue
+        self.duplicate_gap = duplicate_gap
+        self.duplicate_channels = duplicate_channels
+
+    def flag(self, interactions: InteractionBatch) -> InteractionBatch:
+        repeat = detect_repeat_contacts(interactions, self.window, self.same_queue)
+        return interactions.with_columns(
+            is_callback=repeat.is_callback,
+            callback_reason=repeat.callback_reason,
+            is_duplicate_channel=detect_duplicate_channels(interactions, self.duplicate_gap, self.duplicate_channels)
+        )
+
+    async def annotate(self, interactions: InteractionBatch) -> InteractionBatch:
+        """
+        Lote novo com as flags preenchidas, mais as linhas já gravadas que precisam ser atualizadas
+        """
+        time_range = interactions.time_range("start_time")
+        if not time_range:
+            return interactions
+        first_start, last_start = time_range
+        stored = await self.repository.get_interactions(
+            start_date=first_start - self.window,
+            end_date=last_start + self.window + timedelta(seconds=1)
+        )
+        # A versão nova de cada interação substitui a gravada
+        stored = stored.take(pd.Index(interactions.column("id")).get_indexer(stored.column("id")) < 0)
+
+        flagged = await asyncio.to_thread(self.flag, InteractionBatch.concat([stored, interactions]))
+        if not len(stored):
+            return flagged
+        restated = flagged.take(slice(0, len(stored)))
+        changed = _changed(stored, restated) & (stored.column("start_time") >= np.datetime64(first_start))
+        return InteractionBatch.concat([flagged.take(slice(len(stored), None)), restated.take(changed)])
+
+    async def refresh(self, start_date: datetime, end_date: datetime) -> int:
+        """
+        Recalcula as flags das interações já gravadas em [start_date, end_date) (ex.: histórico
+        anterior ao detector ou mudança da janela) e regrava só as linhas alteradas
+        """
+        start_date, end_date = to_utc_naive(start_date), to_utc_naive(end_date)
+        # Direto do banco: a varredura do histórico não passa pelo cache dos dashboards
+        stored = await asyncio.to_thread(self.repository.query_interactions, start_date - self.window, end_date)
+        flagged = await asyncio.to_thread(self.flag, stored)
+        changed = _changed(stored, flagged) & (stored.column("start_time") >= np.datetime64(start_date))
+        if not changed.any():
+            return 0
+        return await self.repository.save_interactions(flagged.take(changed))
@@ -0,0 +1,383 @@
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+from datetime import datetime, timezone
+from sqlalchemy import delete, select, func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.singleflight import SingleFlight, normalize_filter
+from app.models.interaction import Interaction, CSAT, HSM, SpeechAnalytics, SyncWatermark
+from app.services.analytics.batch import COLUMNS as INTERACTION_COLUMNS, InteractionBatch
+from app.services.storage.cache import InteractionBlockCache
+
+UPSERT_CHUNK_SIZE = 500
+
+# Os gráficos da Tela Inicial consultam o mesmo período/filtros ao mesmo tempo
+_interactions_flight = SingleFlight()
+# Blocos de interações já lidos, compartilhados entre as instâncias do repositório
+_block_cache = InteractionBlockCache()
+
+def to_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Datas são gravadas em UTC sem fuso; datas sem fuso já são consideradas UTC
+    """
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+class InteractionRepository:
+    """
+    Acesso ao armazenamento local de interações (tabelas de app/models/interaction.py).
+    As consultas síncronas do SQLAlchemy rodam em threadpool para não bloquear o event loop;
+    os métodos assíncronos têm a mesma assinatura do GenesysService.
+    """
+    def __init__(self, session_factory=SessionLocal, cache: Optional[InteractionBlockCache] = None):
+        self.session_factory = session_factory
+        self.cache = cache or _block_cache
+
+    # ------------------------------------------------------------------ escrita
+
+    @staticmethod
+    def _to_row(model, item: Union[Dict, Any], now: datetime) -> Dict:
+        columns = model.__table__.columns
+        if isinstance(item, dict):
+            row = {c.name: item.get(c.name) for c in columns}
+        else:
+            row = {c.name: getattr(item, c.name, None) for c in columns}
+
+        for name, value in row.items():
+            if isinstance(value, datetime):
+                row[name] = to_utc_naive(value)
+        if "created_at" in row:
+            row["created_at"] = row["created_at"] or now
+        if "updated_at" in row:
+            row["updated_at"] = now
+        return row
+
+    def bulk_upsert(self, model, items: Iterable[Union[Dict, Any]]) -> int:
+        """
+        Insere ou atualiza (pela chave primária) em lotes, com um único comando por lote.
+        Em bancos sem ON CONFLICT cai para session.merge.
+        """
+        now = datetime.utcnow()
+        rows = [self._to_row(model, item, now) for item in items]
+        if not rows:
+            return 0
+
+        primary_keys = [c.name for c in model.__table__.primary_key.columns]
+        # created_at preserva a data da primeira ingestão
+        update_columns = [c.name for c in model.__table__.columns if c.name not in primary_keys and c.name != "created_at"]
+
+        with self.session_factory() as session:
+            dialect = session.get_bind().dialect.name
+            for offset in range(0, len(rows), UPSERT_CHUNK_SIZE):
+                chunk = rows[offset:offset + UPSERT_CHUNK_SIZE]
+                if dialect in ("sqlite", "postgresql"):
+                    insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+                    stmt = insert(model).values(chunk)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=primary_keys,
+                        set_={name: stmt.excluded[name] for name in update_columns}
+                    )
+                    session.execute(stmt)
+                else:
+                    for row in chunk:
+                        session.merge(model(**row))
+            session.commit()
+        return len(rows)
+
+    def upsert_interactions(self, interactions: Union[InteractionBatch, Iterable[Union[Interaction, Dict]]]) -> int:
+        if isinstance(interactions, InteractionBatch):
+            interactions = interactions.to_records()
+        return self.bulk_upsert(Interaction, interactions)
+
+    async def save_interactions(self, interactions: InteractionBatch) -> int:
+        """
+        Grava as interações (upsert) e invalida os blocos de cache afetados
+        """
+        upserted = await asyncio.to_thread(self.upsert_interactions, interactions)
+        time_range = interactions.time_range("start_time")
+        if time_range:
+            self.cache.invalidate(*time_range)
+        return upserted
+
+    # ------------------------------------------------------------------ sincronização
+
+    def get_watermark(self, source: str) -> Optional[SyncWatermark]:
+        with self.session_factory() as session:
+            watermark = session.get(SyncWatermark, source)
+            if watermark is not None:
+                session.expunge(watermark)
+        return watermark
+
+    def save_watermark(
+        self,
+        source: str,
+        last_conversation_end: Optional[datetime],
+        last_synced_at: datetime
+    ) -> SyncWatermark:
+        with self.session_factory() as session:
+            watermark = session.get(SyncWatermark, source) or SyncWatermark(source=source)
+            watermark.last_conversation_end = to_utc_naive(last_conversation_end)
+            watermark.last_synced_at = to_utc_naive(last_synced_at)
+            session.add(watermark)
+            session.commit()
+            session.expunge(watermark)
+        return watermark
+
+    def get_oldest_open_start(self, since: datetime) -> Optional[datetime]:
+        """
+        Início da conversa mais antiga ainda em aberto (sem fim) desde `since`,
+        para que a próxima sincronização volte a buscá-la
+        """
+        stmt = select(func.min(Interaction.start_time)).where(
+            Interaction.end_time.is_(None),
+            Interaction.start_time >= to_utc_naive(since)
+        )
+        with self.session_factory() as session:
+            return session.scalar(stmt)
+
+    # ------------------------------------------------------------------ rollups
+
+    def get_start_range(self, updated_since: Optional[datetime] = None) -> Optional[Tuple[datetime, datetime]]:
+        """
+        Menor e maior start_time das interações gravadas ou atualizadas desde `updated_since`
+        (sem data, de todas): indica quais dias precisam ter os rollups refeitos
+        """
+        stmt = select(func.min(Interaction.start_time), func.max(Interaction.start_time))
+        if updated_since is not None:
+            stmt = stmt.where(Interaction.updated_at >= to_utc_naive(updated_since))
+        with self.session_factory() as session:
+            low, high = session.execute(stmt).one()
+        return (low, high) if low is not None else None
+
+    def replace_rollups(self, model, start_date: datetime, end_date: datetime, rows: List) -> int:
+        """
+        Substitui em uma única transação os rollups de `model` (QueueMetrics ou AgentMetrics)
+        com date em [start_date, end_date)
+        """
+        with self.session_factory() as session:
+            session.execute(delete(model).where(
+                model.granularity.is_not(None),
+                model.date >= to_utc_naive(start_date),
+                model.date < to_utc_naive(end_date)
+            ))
+            session.add_all(rows)
+            session.commit()
+        return len(rows)
+
+    def get_rollup_states(
+        self,
+        model,
+        key_column: str,
+        granularity: str,
+        start_date: datetime,
+        end_date: datetime,
+        keys: Optional[List[str]] = None,
+        channel_types: Optional[List[str]] = None
+    ) -> List[Tuple[Optional[str], Dict]]:
+        """
+        (chave, estado do agregado) dos rollups de `granularity` com date em [start_date, end_date)
+        """
+        key = model.__table__.c[key_column]
+        stmt = select(key, model.aggregate_state).where(
+            model.granularity == granularity,
+            model.date >= to_utc_naive(start_date),
+            model.date < to_utc_naive(end_date)
+        )
+        if keys:
+            stmt = stmt.where(key.in_(keys))
+        if channel_types:
+            stmt = stmt.where(func.lower(model.channel_type).in_([c.lower() for c in channel_types]))
+
+        with self.session_factory() as session:
+            return [(row[0], row[1]) for row in session.execute(stmt).all()]
+
+    # ------------------------------------------------------------------ leitura
+
+    @staticmethod
+    def _interactions_statement(
+        start_date: datetime,
+        end_date: datetime,
+        queue_ids: Optional[List[str]] = None,
+        channel_types: Optional[List[str]] = None,
+        agent_ids: Optional[List[str]] = None
+    ):
+        # Seleciona só as colunas: as linhas vão direto para o batch, sem instanciar objetos ORM
+        stmt = select(*[Interaction.__table__.c[name] for name in INTERACTION_COLUMNS]).where(
+            Interaction.start_time >= to_utc_naive(start_date),
+            Interaction.start_time < to_utc_naive(end_date)
+        )
+        if queue_ids:
+            stmt = stmt.where(Interaction.queue_id.in_(queue_ids))
+        if channel_types:
+            stmt = stmt.where(func.lower(Interaction.channel_type).in_([c.lower() for c in channel_types]))
+        if agent_ids:
+            stmt = stmt.where(Interaction.agent_id.in_(agent_ids))
+        return stmt.order_by(Interaction.start_time, Interaction.id)
+
+    def query_interactions(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        queue_ids: Optional[List[str]] = None,
+        channel_types: Optional[List[str]] = None,
+        agent_ids: Optional[List[str]] = None
+    ) -> InteractionBatch:
+        """
+        Leitura direta do banco (síncrona), sem o cache de blocos: para tarefas em segundo
+        plano que varrem dias inteiros (rollups, flags de contato) sem ocupar o LRU dos dashboards
+        """
+        stmt = self._interactions_statement(start_date, end_date, queue_ids, channel_types, agent_ids)
+        with self.session_factory() as session:
+            rows = session.execute(stmt).all()
+        return InteractionBatch.from_rows(rows)
+
+    def iter_interactions(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        queue_ids: Optional[List[str]] = None,
+        channel_types: Optional[List[str]] = None,
+        agent_ids: Optional[List[str]] = None,
+        chunk_rows: int = settings.STREAM_CHUNK_ROWS
+    ) -> Iterator[InteractionBatch]:
+        """
+        Varre as interações do período em blocos de até `chunk_rows` linhas, em ordem de
+        start_time, com cursor no servidor (yield_per): só um bloco fica em memória por vez
+        """
+        stmt = self._interactions_statement(start_date, end_date, queue_ids, channel_types, agent_ids)
+        with self.session_factory() as session:
+            result = session.execute(stmt.execution_options(yield_per=chunk_rows))
+            for rows in result.partitions():
+                yield InteractionBatch.from_rows(rows)
+
+    def _query_by_created_at(self, model, start_date: datetime, end_date: datetime, *criteria) -> List:
+        stmt = select(model).where(
+            model.created_at >= to_utc_naive(start_date),
+            model.created_at < to_utc_naive(end_date),
+            *criteria
+        ).order_by(model.created_at)
+
+        with self.session_factory() as session:
+            rows = session.scalars(stmt).all()
+            session.expunge_all()
+        return list(rows)
+
+    async def get_interactions(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        queue_ids: Optional[List[str]] = None,
+        team_ids: Optional[List[str]] = None,
+        channel_types: Optional[List[str]] = None,
+        agent_ids: Optional[List[str]] = None
+    ) -> InteractionBatch:
+        """
+        Obtém interações do armazenamento local com filtros, em formato colunar
+        (team_ids é aceito por compatibilidade; o modelo ainda não guarda a equipe).
+        Consultas idênticas simultâneas compartilham uma única leitura do banco, e períodos
+        sobrepostos reaproveitam os blocos de tempo já carregados.
+        """
+        start_date, end_date = to_utc_naive(start_date), to_utc_naive(end_date)
+        filters_key = (
+            id(self.session_factory),
+            normalize_filter(queue_ids),
+            normalize_filter(channel_types),
+            normalize_filter(agent_ids)
+        )
+
+        def load(block_start: datetime, block_end: datetime):
+            return asyncio.to_thread(
+                self.query_interactions, block_start, block_end, queue_ids, channel_types, agent_ids
+            )
+
+        try:
+            # Lê apenas os blocos de tempo que ainda não estão em cache
+            return await _interactions_flight.do(
+                (filters_key, start_date, end_date),
+                lambda: self.cache.get_range(start_date, end_date, filters_key, load)
+            )
+        except Exception as e:
+            raise Exception(f"Erro ao buscar interações no armazenamento local: {str(e)}")
+
+    async def stream_interactions(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        queue_ids: Optional[List[str]] = None,
+        team_ids: Optional[List[str]] = None,
+        channel_types: Optional[List[str]] = None,
+        agent_ids: Optional[List[str]] = None,
+        chunk_rows: int = settings.STREAM_CHUNK_ROWS
+    ) -> AsyncIterator[InteractionBatch]:
+        """
+        Versão em blocos de get_interactions para períodos longos: não passa pelo cache e
+        nunca materializa o período inteiro. O próximo bloco é lido enquanto o consumidor
+        processa o atual (no máximo dois blocos em memória).
+        """
+        start_date, end_date = to_utc_naive(start_date), to_utc_naive(end_date)
+        chunks = self.iter_interactions(start_date, end_date, queue_ids, channel_types, agent_ids, chunk_rows)
+        # O cursor é sempre usado na mesma thread
+        executor = ThreadPoolExecutor(max_workers=1)
+        loop = asyncio.get_running_loop()
+        try:
+            pending = loop.run_in_executor(executor, next, chunks, None)
+            while True:
+                try:
+                    chunk = await pending
+                except Exception as e:
+                    raise Exception(f"Erro ao buscar interações no armazenamento local: {str(e)}")
+                if chunk is None:
+                    break
+                pending = loop.run_in_executor(executor, next, chunks, None)
+                yield chunk
+        finally:
+            # Executa depois da leitura pendente (mesma thread) e libera a conexão
+            await loop.run_in_executor(executor, chunks.close)
+            executor.shutdown(wait=False)
+
+    async def get_csat_scores(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        agent_id: Optional[str] = None
+    ) -> List[CSAT]:
+        """
+        Obtém scores de CSAT do armazenamento local
+        """
+        try:
+            criteria = [CSAT.agent_id == agent_id] if agent_id else []
+            return await asyncio.to_thread(self._query_by_created_at, CSAT, start_date, end_date, *criteria)
+        except Exception as e:
+            raise Exception(f"Erro ao buscar scores CSAT no armazenamento local: {str(e)}")
+
+    async def get_hsm_messages(
+        self,
+        start_date: datetime,
+        end_date: datetime
+    ) -> List[HSM]:
+        """
+        Obtém mensagens HSM do armazenamento local
+        """
+        try:
+            return await asyncio.to_thread(self._query_by_created_at, HSM, start_date, end_date)
+        except Exception as e:
+            raise Exception(f"Erro ao buscar mensagens HSM no armazenamento local: {str(e)}")
+
+    async def get_speech_analytics(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        topic: Optional[str] = None
+    ) -> List[SpeechAnalytics]:
+        """
+        Obtém dados de Speech Analytics do armazenamento local
+        """
+        try:
+            criteria = [SpeechAnalytics.topic == topic] if topic else []
+            return await asyncio.to_thread(self._query_by_created_at, SpeechAnalytics, start_date, end_date, *criteria)
+        except Exception as e:
+            raise Exception(f"Erro ao buscar Speech Analytics no armazenamento local: {str(e)}")
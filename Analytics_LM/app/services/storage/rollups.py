@@ -0,0 +1,176 @@
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.models.interaction import AgentMetrics, QueueMetrics
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.metrics import KPIAggregate, MetricsService
+from app.services.storage.repository import InteractionRepository
+
+logger = logging.getLogger(__name__)
+
+# Watermark dos rollups: last_conversation_end guarda o fim da cobertura (todas as horas
+# anteriores estão materializadas) e last_synced_at o início da última execução
+ROLLUPS_SOURCE = "rollups"
+
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+# Filas: rollups por hora e por dia; agentes: só por dia (por hora, as linhas de agente
+# seriam dezenas de vezes mais numerosas que as de fila)
+QUEUE_GRANULARITIES = ("day", "hour")
+AGENT_GRANULARITIES = ("day",)
+
+# Execuções do materializador não se sobrepõem (startup, laço periódico, chamadas manuais)
+_materialize_lock = asyncio.Lock()
+
+def floor_time(value: datetime, granularity: str) -> datetime:
+    value = value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0) if granularity == "day" else value
+
+def ceil_time(value: datetime, granularity: str) -> datetime:
+    floor = floor_time(value, granularity)
+    return floor if floor == value else floor + GRANULARITIES[granularity]
+
+def plan_ranges(
+    start_date: datetime,
+    end_date: datetime,
+    coverage_end: Optional[datetime],
+    granularities: Sequence[str]
+) -> Tuple[List[Tuple[str, datetime, datetime]], List[Tuple[datetime, datetime]]]:
+    """
+    Divide [start_date, end_date) em faixas atendidas por rollups, da maior granularidade
+    para a menor, e faixas que precisam das interações: bordas que não fecham a menor
+    granularidade e o trecho após o fim da cobertura dos rollups
+    """
+    rollups: List[Tuple[str, datetime, datetime]] = []
+    raw: List[Tuple[datetime, datetime]] = []
+
+    def split(start: datetime, end: datetime, levels: Sequence[str]):
+        if start >= end:
+            return
+        if not levels:
+            # Faixas brutas vizinhas viram uma só consulta
+            if raw and raw[-1][1] == start:
+                raw[-1] = (raw[-1][0], end)
+            else:
+                raw.append((start, end))
+            return
+        inner_start, inner_end = ceil_time(start, levels[0]), floor_time(end, levels[0])
+        if inner_start >= inner_end:
+            split(start, end, levels[1:])
+            return
+        split(start, inner_start, levels[1:])
+        rollups.append((levels[0], inner_start, inner_end))
+        split(inner_end, end, levels[1:])
+
+    covered_end = max(start_date, min(end_date, coverage_end)) if coverage_end else start_date
+    split(start_date, covered_end, granularities)
+    split(covered_end, end_date, ())
+    return rollups, raw
+
+def _days(start_date: datetime, end_date: datetime) -> Set[datetime]:
+    # Dias (UTC) de start_date até end_date, inclusive
+    day, last = floor_time(start_date, "day"), floor_time(end_date, "day")
+    days = set()
+    while day <= last:
+        days.add(day)
+        day += GRANULARITIES["day"]
+    return days
+
+class RollupMaterializer:
+    """
+    Materializa rollups por fila/canal (hora e dia) e por agente/canal (dia) nas tabelas
+    queue_metrics e agent_metrics, com o estado combinável do KPIAggregate em cada linha.
+    Roda em segundo plano: a cada ciclo refaz os dias que receberam interações novas ou
+    atualizadas desde o ciclo anterior (updated_at) e estende a cobertura até a hora atual.
+    """
+    def __init__(self, repository: Optional[InteractionRepository] = None):
+        self.repository = repository or InteractionRepository()
+        # Upserts que começaram pouco antes do ciclo anterior ainda são considerados
+        self.overlap = timedelta(minutes=settings.SYNC_OVERLAP_MINUTES)
+
+    @staticmethod
+    def build_rollups(day: datetime, interactions: InteractionBatch) -> Tuple[List[QueueMetrics], List[AgentMetrics]]:
+        """
+        Rollups de um dia (UTC): por fila/canal em cada hora e no dia, por agente/canal no dia
+        """
+        hours = [day + GRANULARITIES["hour"] * hour for hour in range(25)]
+        queue_rows = []
+        daily: Dict[Tuple[Optional[str], Optional[str]], KPIAggregate] = {}
+        for hour, part in zip(hours, interactions.sorted_by_time().split_by_time(hours)):
+            for key, aggregate in KPIAggregate.group_by(part, ("queue_id", "channel_type")).items():
+                queue_rows.append(MetricsService.build_queue_metrics(
+                    key[0], aggregate, hour,
+                    granularity="hour", channel_type=key[1], aggregate_state=aggregate.to_state()
+                ))
+                daily.setdefault(key, KPIAggregate()).update(aggregate)
+        # O rollup diário da fila é a combinação dos horários, sem nova varredura
+        for key, aggregate in daily.items():
+            queue_rows.append(MetricsService.build_queue_metrics(
+                key[0], aggregate, day,
+                granularity="day", channel_type=key[1], aggregate_state=aggregate.to_state()
+            ))
+
+        agent_rows = [
+            MetricsService.build_agent_metrics(
+                key[0], aggregate, day, csat_score=None,
+                granularity="day", channel_type=key[1], aggregate_state=aggregate.to_state()
+            )
+            for key, aggregate in KPIAggregate.group_by(interactions, ("agent_id", "channel_type")).items()
+        ]
+        return queue_rows, agent_rows
+
+    async def materialize_day(self, day: datetime) -> int:
+        """
+        Recalcula e substitui os rollups de um dia (UTC)
+        """
+        day_end = day + GRANULARITIES["day"]
+        # Direto do banco: o backfill de dias inteiros não passa pelo cache dos dashboards
+        interactions = await asyncio.to_thread(self.repository.query_interactions, day, day_end)
+        queue_rows, agent_rows = await asyncio.to_thread(self.build_rollups, day, interactions)
+        await asyncio.to_thread(self.repository.replace_rollups, QueueMetrics, day, day_end, queue_rows)
+        await asyncio.to_thread(self.repository.replace_rollups, AgentMetrics, day, day_end, agent_rows)
+        return len(queue_rows) + len(agent_rows)
+
+    async def run_once(self, now: Optional[datetime] = None) -> Dict:
+        """
+        Refaz os dias alterados desde a última execução e avança a cobertura até a hora atual
+        """
+        async with _materialize_lock:
+            now = now or datetime.utcnow()
+            coverage_target = floor_time(now, "hour")
+            watermark = await asyncio.to_thread(self.repository.get_watermark, ROLLUPS_SOURCE)
+            coverage_end = watermark.last_conversation_end if watermark else None
+            updated_since = None
+            if watermark is not None and watermark.last_synced_at is not None:
+                updated_since = watermark.last_synced_at - self.overlap
+
+            # Primeira execução: sem updated_since, considera todas as interações gravadas
+            days: Set[datetime] = set()
+            changed = await asyncio.to_thread(self.repository.get_start_range, updated_since)
+            if changed:
+                days |= _days(*changed)
+            if coverage_end is not None and coverage_end < coverage_target:
+                days |= _days(coverage_end, coverage_target)
+
+            rows = 0
+            for day in sorted(days):
+                rows += await self.materialize_day(day)
+
+            await asyncio.to_thread(self.repository.save_watermark, ROLLUPS_SOURCE, coverage_target, now)
+            return {"days": len(days), "rows": rows, "coverage_end": coverage_target}
+
+    async def run_forever(self, interval: int = settings.ROLLUP_INTERVAL):
+        """
+        Laço do materializador de rollups (iniciado no startup da aplicação)
+        """
+        while True:
+            try:
+                result = await self.run_once()
+                logger.info("Rollups materializados: %s dias, %s linhas, cobertura até %s",
+                            result["days"], result["rows"], result["coverage_end"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao materializar rollups: {str(e)}")
+            await asyncio.sleep(interval)
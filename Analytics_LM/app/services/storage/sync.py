@@ -0,0 +1,99 @@
+from typing import Dict, Optional
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.services.genesys.client import GenesysService
+from app.services.genesys.ratelimit import Priority
+from app.services.storage.contacts import ContactFlagger
+from app.services.storage.repository import InteractionRepository
+
+logger = logging.getLogger(__name__)
+
+INTERACTIONS_SOURCE = "genesys_interactions"
+
+# Execuções da sincronização não se sobrepõem entre instâncias (laço do startup e POST /ingestion/sync):
+# a leitura-máximo-gravação do watermark não pode intercalar
+_sync_lock = asyncio.Lock()
+
+class SyncService:
+    """
+    Sincronização incremental Genesys -> armazenamento local guiada por watermark.
+    Cada execução busca apenas a janela a partir do último fim de conversa gravado
+    (com uma pequena sobreposição) e volta até a conversa mais antiga que ainda
+    estava em aberto, para receber as atualizações que chegaram depois.
+    """
+    def __init__(
+        self,
+        genesys_service: Optional[GenesysService] = None,
+        repository: Optional[InteractionRepository] = None,
+        source: str = INTERACTIONS_SOURCE
+    ):
+        self.genesys_service = genesys_service or GenesysService()
+        self.repository = repository or InteractionRepository()
+        self.source = source
+        self.contacts = ContactFlagger(self.repository)
+        self.initial_lookback = timedelta(hours=settings.SYNC_INITIAL_LOOKBACK_HOURS)
+        self.overlap = timedelta(minutes=settings.SYNC_OVERLAP_MINUTES)
+        self.open_lookback = timedelta(hours=settings.SYNC_OPEN_LOOKBACK_HOURS)
+
+    async def _window_start(self, now: datetime) -> datetime:
+        watermark = await asyncio.to_thread(self.repository.get_watermark, self.source)
+        if watermark is None or watermark.last_conversation_end is None:
+            window_start = now - self.initial_lookback
+        else:
+            window_start = watermark.last_conversation_end - self.overlap
+
+        # Conversas abertas na última sincronização precisam ser buscadas de novo
+        oldest_open = await asyncio.to_thread(self.repository.get_oldest_open_start, now - self.open_lookback)
+        if oldest_open is not None and oldest_open < window_start:
+            window_start = oldest_open
+        # Protege contra relógios adiantados: a janela nunca começa depois de agora
+        return min(window_start, now - self.overlap)
+
+    async def sync_once(self, now: Optional[datetime] = None) -> Dict:
+        """
+        Executa uma sincronização incremental e avança o watermark
+        """
+        async with _sync_lock:
+            now = now or datetime.utcnow()
+            window_start = await self._window_start(now)
+
+            interactions = await self.genesys_service.get_interactions(
+                start_date=window_start,
+                end_date=now,
+                priority=Priority.SYNC
+            )
+            # Rechamadas marcadas antes de gravar (inclui linhas já gravadas cujas flags mudaram);
+            # o upsert atualiza as linhas existentes (e o updated_at) em vez de duplicá-las
+            upserted = await self.repository.save_interactions(await self.contacts.annotate(interactions))
+
+            watermark = await asyncio.to_thread(self.repository.get_watermark, self.source)
+            last_conversation_end = watermark.last_conversation_end if watermark else None
+            end_range = interactions.time_range("end_time")
+            if end_range and (last_conversation_end is None or end_range[1] > last_conversation_end):
+                last_conversation_end = end_range[1]
+
+            await asyncio.to_thread(self.repository.save_watermark, self.source, last_conversation_end, now)
+
+            return {
+                "window_start": window_start,
+                "window_end": now,
+                "interactions": upserted,
+                "last_conversation_end": last_conversation_end
+            }
+
+    async def run_forever(self, interval: int = settings.UPDATE_INTERVAL):
+        """
+        Laço da sincronização periódica (iniciado no startup da aplicação)
+        """
+        while True:
+            try:
+                result = await self.sync_once()
+                logger.info("Sincronização concluída: %s interações de %s a %s",
+                            result["interactions"], result["window_start"], result["window_end"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro na sincronização incremental: {str(e)}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,113 @@
+"""
+Benchmark do InteractionBatch (colunar) contra listas de objetos ORM Interaction.
+
+Mede a memória por interação (tracemalloc) e o tempo de algumas métricas da Tela
+Inicial calculadas do jeito anterior (compreensões sobre objetos ORM) e com o batch.
+
+Uso (a partir de Analytics_LM/):
+    python -m benchmarks.bench_batch [quantidade_de_interacoes]
+"""
+from typing import Dict, List
+from datetime import datetime, timedelta
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from app.models.interaction import Interaction
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.metrics import MetricsService
+
+def make_records(n_rows: int, rng: random.Random) -> List[Dict]:
+    # Um mês de interações: 13 filas, 800 agentes, ~40% de clientes recorrentes
+    month_start = datetime(2024, 3, 1)
+    records = []
+    for index in range(n_rows):
+        start_time = month_start + timedelta(seconds=rng.randint(0, 30 * 86400))
+        answered = rng.random() < 0.85
+        records.append({
+            "id": f"conv-{index}:sess-{index}:1",
+            "conversation_id": f"conv-{index}",
+            "customer_id": f"cust-{rng.randint(1, int(n_rows * 0.6) + 1)}",
+            "agent_id": f"user-{rng.randint(1, 800)}",
+            "queue_id": f"queue-{rng.randint(1, 13)}",
+            "channel_type": rng.choice(("voice", "message")),
+            "start_time": start_time,
+            "end_time": start_time + timedelta(minutes=rng.randint(1, 30)),
+            "duration": float(rng.randint(60, 1800)),
+            "wait_time": rng.uniform(0, 120),
+            "talk_time": rng.uniform(30, 900),
+            "status": "answered" if answered else "abandoned",
+            "reason": f"code-{rng.randint(1, 40)}",
+            "is_auto_service": rng.random() < 0.1,
+            "auto_service_type": None,
+            "is_callback": rng.random() < 0.15,
+            "callback_reason": None,
+            "is_duplicate_channel": rng.random() < 0.02
+        })
+    return records
+
+def measure_memory(build):
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, current
+
+def best_of(fn, repeat: int = 3) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+# Implementações anteriores (sobre objetos ORM), mantidas apenas como referência
+def legacy_service_level(interactions, target_seconds=20):
+    answered_calls = [i for i in interactions if i.status == "answered"]
+    within = len([i for i in answered_calls if i.wait_time is not None and i.wait_time <= target_seconds])
+    return within / len(answered_calls) * 100 if answered_calls else 0.0
+
+def legacy_aht(interactions):
+    answered_calls = [i for i in interactions if i.status == "answered"]
+    total_talk_time = sum(i.talk_time if i.talk_time is not None else 0 for i in answered_calls)
+    total_wait_time = sum(i.wait_time if i.wait_time is not None else 0 for i in answered_calls)
+    return (total_talk_time + total_wait_time) / len(answered_calls) if answered_calls else 0.0
+
+def legacy_total_customers(interactions):
+    return len(set(i.customer_id for i in interactions if i.customer_id))
+
+def legacy_top_reasons(interactions, top_n=10):
+    reason_counts = {}
+    for i in interactions:
+        if i.reason:
+            reason_counts[i.reason] = reason_counts.get(i.reason, 0) + 1
+    return dict(sorted(reason_counts.items(), key=lambda item: item[1], reverse=True)[:top_n])
+
+METRICS = (
+    ("nível de serviço", legacy_service_level, MetricsService.calculate_service_level),
+    ("TMA", legacy_aht, MetricsService.calculate_aht),
+    ("clientes únicos", legacy_total_customers, MetricsService.get_total_customers),
+    ("top motivos", legacy_top_reasons, MetricsService.get_top_reasons),
+)
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    records = make_records(n_rows, random.Random(42))
+
+    orm_rows, orm_bytes = measure_memory(lambda: [Interaction(**r) for r in records])
+    batch, batch_bytes = measure_memory(lambda: InteractionBatch.from_records(records))
+    print(f"interações: {n_rows:,}")
+    print(f"memória ORM:   {orm_bytes / n_rows:8.0f} bytes/interação  ({orm_bytes / 2**20:,.1f} MiB)")
+    print(f"memória batch: {batch_bytes / n_rows:8.0f} bytes/interação  ({batch_bytes / 2**20:,.1f} MiB)")
+    print(f"redução: {orm_bytes / batch_bytes:.1f}x")
+
+    for label, legacy, current in METRICS:
+        legacy_time = best_of(lambda: legacy(orm_rows))
+        current_time = best_of(lambda: current(batch))
+        print(f"{label:18s} ORM: {legacy_time * 1000:8.1f} ms  batch: {current_time * 1000:7.1f} ms  ganho: {legacy_time / current_time:6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark dos detectores de rechamada e de duplicidade de canal em um mês sintético.
+
+Gera um mês de conversas (voz e WhatsApp) no volume de produção e mede:
+- o tempo de cada detector sobre o mês inteiro (varreduras ordenadas, O(n log n));
+- a validação contra uma comparação par a par em uma amostra de clientes;
+- a validação incremental: cada dia é marcado só com o contexto que o ContactFlagger lê
+  (um dia mais a janela para trás e para frente) e comparado ao resultado do mês inteiro.
+
+Uso (a partir de Analytics_LM/):
+    python -m benchmarks.bench_contacts [quantidade_de_conversas]
+"""
+from datetime import datetime, timedelta
+import sys
+import time
+import numpy as np
+from app.core.config import settings
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.contacts import detect_duplicate_channels, detect_repeat_contacts
+from app.services.analytics.sketches import hash_values
+
+MONTH_START = datetime(2024, 3, 1)
+WINDOW = timedelta(hours=settings.CALLBACK_WINDOW_HOURS)
+GAP = timedelta(minutes=settings.DUPLICATE_CHANNEL_GAP_MINUTES)
+CHANNELS = ("voice", "message")
+
+def make_month(n_conversations: int, rng: np.random.Generator) -> InteractionBatch:
+    # ~40% de clientes recorrentes, 15% de conversas transferidas (duas linhas)
+    customers = rng.integers(1, int(n_conversations * 0.6) + 1, n_conversations)
+    channels = np.where(rng.random(n_conversations) < 0.55, "voice", "message")
+    start = np.datetime64(MONTH_START, "s") + rng.integers(0, 30 * 86400, n_conversations).astype("timedelta64[s]")
+    duration = np.where(channels == "voice", rng.integers(60, 1800, n_conversations), rng.integers(300, 4 * 3600, n_conversations))
+    end = start + duration.astype("timedelta64[s]")
+    segments = np.where(rng.random(n_conversations) < 0.15, 2, 1)
+
+    row_conversation = np.repeat(np.arange(n_conversations), segments)
+    segment = np.arange(len(row_conversation)) - np.repeat(np.cumsum(segments) - segments, segments)
+    n_rows = len(row_conversation)
+    conversation_ids = np.array([f"conv-{index}" for index in row_conversation], dtype=object)
+    return InteractionBatch.from_columns({
+        "id": [f"{conversation}:s:{seg}" for conversation, seg in zip(conversation_ids, segment)],
+        "conversation_id": conversation_ids,
+        "customer_id": [f"cust-{customer}" for customer in customers[row_conversation]],
+        "agent_id": [f"user-{agent}" for agent in rng.integers(1, 800, n_rows)],
+        "queue_id": [f"queue-{queue}" for queue in rng.integers(1, 13, n_rows)],
+        "channel_type": channels[row_conversation],
+        "start_time": start[row_conversation],
+        "end_time": end[row_conversation],
+        "duration": duration[row_conversation].astype(np.float64),
+        "wait_time": rng.uniform(0, 120, n_rows),
+        "talk_time": rng.uniform(30, 900, n_rows),
+        "status": np.full(n_rows, "answered", dtype=object),
+        "reason": [f"code-{code}" for code in rng.integers(1, 40, n_conversations)[row_conversation]],
+        "is_auto_service": np.zeros(n_rows, dtype=bool),
+        "auto_service_type": np.full(n_rows, None, dtype=object),
+        "is_callback": np.zeros(n_rows, dtype=bool),
+        "callback_reason": np.full(n_rows, None, dtype=object),
+        "is_duplicate_channel": np.zeros(n_rows, dtype=bool)
+    })
+
+def pairwise(batch: InteractionBatch):
+    """
+    Referência O(n²) por cliente: mesma ordem dos detectores (início, hash da conversa)
+    """
+    rows = list(batch)
+    key = dict(zip(batch.column("conversation_id"), hash_values(batch.column("conversation_id")).tolist()))
+    contacts, ends = {}, {}
+    for row in rows:
+        contacts.setdefault(row.conversation_id, row)
+        # Fim do contato: maior fim entre as pernas; perna sem fim deixa o contato aberto
+        end = datetime.max if row.end_time is None else row.end_time
+        ends[row.conversation_id] = max(ends.get(row.conversation_id, end), end)
+    callback, duplicate = [], []
+    for row in rows:
+        position = (row.start_time, key[row.conversation_id])
+        earlier = [
+            other for other in contacts.values()
+            if other.customer_id == row.customer_id and (other.start_time, key[other.conversation_id]) < position
+        ]
+        last = max(earlier, key=lambda other: (other.start_time, key[other.conversation_id]), default=None)
+        callback.append(last is not None and row.start_time - last.start_time <= WINDOW)
+        duplicate.append(any(
+            other.channel_type != row.channel_type and ends[other.conversation_id] >= row.start_time - GAP for other in earlier
+        ))
+    return np.array(callback), np.array(duplicate)
+
+def timed(fn):
+    started = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - started
+
+def main():
+    n_conversations = int(sys.argv[1]) if len(sys.argv) > 1 else 1_500_000
+    rng = np.random.default_rng(42)
+    batch, build_time = timed(lambda: make_month(n_conversations, rng))
+    print(f"conversas: {n_conversations:,}  linhas: {len(batch):,}  (geração: {build_time:.1f} s)")
+
+    repeat, repeat_time = timed(lambda: detect_repeat_contacts(batch, WINDOW))
+    duplicate, duplicate_time = timed(lambda: detect_duplicate_channels(batch, GAP, CHANNELS))
+    print(f"rechamadas:        {repeat_time:6.2f} s  marcadas: {int(repeat.is_callback.sum()):,}")
+    print(f"canal duplicado:   {duplicate_time:6.2f} s  marcadas: {int(duplicate.sum()):,}")
+
+    # Amostra de clientes: os detectores são independentes por cliente
+    customers = batch.column("customer_id")
+    sample = np.isin(customers, rng.choice(np.unique(customers), 300, replace=False))
+    expected_callback, expected_duplicate = pairwise(batch.take(sample))
+    assert (repeat.is_callback[sample] == expected_callback).all(), "rechamadas diferem da comparação par a par"
+    assert (duplicate[sample] == expected_duplicate).all(), "duplicidades diferem da comparação par a par"
+    print(f"par a par: ok ({int(sample.sum()):,} linhas de 300 clientes)")
+
+    # Incremental: cada dia marcado só com o contexto [dia - janela, dia + 1 dia + janela]
+    start_times = batch.column("start_time")
+    day_times = []
+    for day in range(30):
+        day_start = np.datetime64(MONTH_START + timedelta(days=day))
+        day_end = day_start + np.timedelta64(1, "D")
+        context = (start_times >= day_start - np.timedelta64(WINDOW)) & (start_times < day_end + np.timedelta64(WINDOW))
+        part = batch.take(context)
+        (part_repeat, part_duplicate), elapsed = timed(lambda: (
+            detect_repeat_contacts(part, WINDOW), detect_duplicate_channels(part, GAP, CHANNELS)
+        ))
+        day_times.append(elapsed)
+        in_day = (part.column("start_time") >= day_start) & (part.column("start_time") < day_end)
+        rows = np.flatnonzero(context)[in_day]
+        assert (part_repeat.is_callback[in_day] == repeat.is_callback[rows]).all(), f"rechamadas do dia {day} diferem"
+        assert (part_duplicate[in_day] == duplicate[rows]).all(), f"duplicidades do dia {day} diferem"
+    print(f"incremental por dia: ok  (média {np.mean(day_times):.2f} s por dia com contexto)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark da agregação em paralelo (ParallelAggregator) contra a agregação em linha.
+
+Gera interações sintéticas, calcula o KPIAggregate total (partições por dia) e por fila
+(partições por fila) em linha e no pool de processos, confere que os KPIs coincidem e
+mostra os tempos. Com poucas linhas o pool não compensa: por isso o fallback em linha.
+
+Uso (a partir de Analytics_LM/):
+    python -m benchmarks.bench_parallel [quantidade_de_interacoes] [workers]
+"""
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.parallel import ParallelAggregator, shutdown_pool
+from benchmarks.bench_batch import make_records
+
+def same_kpis(a, b) -> bool:
+    """
+    Igualdade dos KPIs; somas em partições mudam a ordem das parcelas (diferença no último bit)
+    """
+    if isinstance(a, dict):
+        return isinstance(b, dict) and list(a) == list(b) and all(same_kpis(a[key], b[key]) for key in a)
+    if isinstance(a, float) or isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-12)
+    return a == b
+
+async def timed(coroutine):
+    started = time.perf_counter()
+    value = await coroutine
+    return value, time.perf_counter() - started
+
+async def run(batch: InteractionBatch, workers: int):
+    inline = ParallelAggregator(workers=1)
+    pooled = ParallelAggregator(workers=workers, min_rows=0)
+    # Primeira chamada sobe os workers (spawn): fica fora da medição
+    await pooled.aggregate(batch.take(slice(0, 1000)))
+
+    expected, inline_time = await timed(inline.aggregate(batch))
+    result, pool_time = await timed(pooled.aggregate(batch))
+    assert same_kpis(result.to_overview(), expected.to_overview()), "KPIs do pool diferem da agregação em linha"
+    print(f"agregado total  em linha: {inline_time * 1000:8.1f} ms  pool: {pool_time * 1000:8.1f} ms  ganho: {inline_time / pool_time:5.1f}x")
+
+    expected, inline_time = await timed(inline.group_by(batch, "queue_id"))
+    result, pool_time = await timed(pooled.group_by(batch, "queue_id"))
+    assert list(result) == list(expected), "filas fora de ordem"
+    assert all(same_kpis(result[key].to_overview(), expected[key].to_overview()) for key in expected)
+    print(f"agregado/fila   em linha: {inline_time * 1000:8.1f} ms  pool: {pool_time * 1000:8.1f} ms  ganho: {inline_time / pool_time:5.1f}x")
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else max(os.cpu_count() or 1, 2)
+    batch = InteractionBatch.from_records(make_records(n_rows, random.Random(42)))
+    print(f"interações: {n_rows:,}  workers: {workers}  CPUs: {os.cpu_count()}")
+    try:
+        asyncio.run(run(batch, workers))
+    finally:
+        shutdown_pool()
+
+if __name__ == "__main__":
+    main()
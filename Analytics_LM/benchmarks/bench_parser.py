@@ -0,0 +1,152 @@
+"""
+Micro-benchmark do parser de conversas da Genesys.
+
+Compara o parser linear (app/services/genesys/parser.py) com a implementação anterior,
+que reprocurava os wrap-ups em todos os participantes e varria as métricas da sessão
+três vezes para cada segmento. Usa conversas sintéticas com transferências
+(6 a 10 participantes), o caso comum do WhatsApp.
+
+São medidos dois cenários: só a travessia (linhas como dict) e o fluxo completo,
+em que o custo de instanciar os objetos ORM Interaction também entra na conta.
+
+Uso (a partir de Analytics_LM/):
+    python -m benchmarks.bench_parser [quantidade_de_conversas]
+"""
+from typing import Any, Callable, Dict, List
+import random
+import sys
+import time
+from app.models.interaction import Interaction
+from app.services.genesys.parser import parse_conversations, parse_datetime
+
+def make_conversation(index: int, rng: random.Random) -> Dict:
+    n_agents = rng.randint(5, 9)  # + cliente = 6 a 10 participantes
+    participants = [{
+        "participantId": f"cust-{index}",
+        "purpose": "customer",
+        "sessions": [{"mediaType": "message", "segments": [{"segmentType": "interact"}]}]
+    }]
+    for a in range(n_agents):
+        segments = [{"segmentType": "alert"}]
+        # Atendimentos longos são quebrados em vários segmentos (espera, retomada, ...)
+        for _ in range(rng.randint(1, 3)):
+            segments.append({"segmentType": "interact", "queueId": f"queue-{rng.randint(1, 13)}"})
+            segments.append({"segmentType": "hold"})
+        segments.append({"segmentType": "wrapup", "wrapUpCode": f"code-{rng.randint(1, 40)}"})
+        participants.append({
+            "participantId": f"part-{index}-{a}",
+            "userId": f"user-{rng.randint(1, 800)}",
+            "purpose": "agent",
+            "sessions": [{
+                "sessionId": f"sess-{index}-{a}",
+                "mediaType": "message",
+                "metrics": [
+                    {"name": "nOffered", "value": 1},
+                    {"name": "tAlert", "value": rng.randint(1000, 20000)},
+                    {"name": "tWait", "value": rng.randint(0, 120000)},
+                    {"name": "tTalk", "value": rng.randint(30000, 900000)},
+                    {"name": "tHandle", "value": rng.randint(30000, 900000)},
+                    {"name": "nConnected", "value": 1},
+                ],
+                "segments": segments
+            }]
+        })
+    return {
+        "conversationId": f"conv-{index}",
+        "conversationStart": "2024-03-01T12:00:00.000Z",
+        "conversationEnd": "2024-03-01T12:30:00.000Z",
+        "participants": participants
+    }
+
+def legacy_parse(conversations: List[Dict], row_factory: Callable[..., Any] = Interaction) -> List[Any]:
+    """
+    Implementação anterior (mantida aqui apenas como referência de desempenho)
+    """
+    interactions_data = []
+    for conv in conversations:
+        participants = conv.get("participants") or []
+        customer_id = next((p.get("participantId") for p in participants if p.get("purpose") == "customer"), None)
+
+        for participant in participants:
+            if participant.get("purpose") == "agent" and participant.get("sessions"):
+                for session in participant["sessions"]:
+                    for segment_index, segment in enumerate(session.get("segments") or []):
+                        if segment.get("segmentType") == "interact" and segment.get("queueId"):
+                            reason = next((
+                                s.get("wrapUpCode")
+                                for sess in participant.get("sessions") or []
+                                for s in sess.get("segments") or [] if s.get("wrapUpCode")
+                            ), None)
+                            if not reason:
+                                reason = next((
+                                    s.get("wrapUpCode")
+                                    for p in participants if p.get("purpose") not in ("agent", "external")
+                                    for sess in p.get("sessions") or []
+                                    for s in sess.get("segments") or [] if s.get("wrapUpCode")
+                                ), None)
+
+                            start_time = parse_datetime(conv.get("conversationStart"))
+                            end_time = parse_datetime(conv.get("conversationEnd"))
+
+                            session_metrics = session.get("metrics") or []
+                            duration = (end_time - start_time).total_seconds() if start_time and end_time else 0
+                            wait_time = next((m["value"] for m in session_metrics if m.get("name") == "tWait"), 0) / 1000
+                            talk_time = next((m["value"] for m in session_metrics if m.get("name") == "tTalk"), 0) / 1000
+                            status = "answered" if next((m["value"] for m in session_metrics if m.get("name") == "nConnected"), 0) > 0 else "abandoned"
+
+                            conversation_id = conv.get("conversationId")
+                            session_id = session.get("sessionId") or participant.get("participantId")
+                            interactions_data.append(row_factory(
+                                id=f"{conversation_id}:{session_id}:{segment_index}",
+                                conversation_id=conversation_id,
+                                customer_id=customer_id,
+                                agent_id=participant.get("userId") or participant.get("participantId"),
+                                queue_id=segment["queueId"],
+                                channel_type=session.get("mediaType"),
+                                start_time=start_time,
+                                end_time=end_time,
+                                duration=duration,
+                                wait_time=wait_time,
+                                talk_time=talk_time,
+                                status=status,
+                                reason=reason,
+                                is_auto_service=False,
+                                auto_service_type=None,
+                                is_callback=False,
+                                callback_reason=None,
+                                is_duplicate_channel=False
+                            ))
+    return interactions_data
+
+def run(parse, conversations: List[Dict], row_factory: Callable[..., Any], repeat: int = 3):
+    best = None
+    rows = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = parse(conversations, row_factory)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, rows
+
+def report(label: str, n_conversations: int, legacy_time: float, new_time: float):
+    print(f"[{label}]")
+    print(f"  parser anterior: {legacy_time:.3f}s  ({n_conversations / legacy_time:,.0f} conversas/s)")
+    print(f"  parser linear:   {new_time:.3f}s  ({n_conversations / new_time:,.0f} conversas/s)")
+    print(f"  ganho: {legacy_time / new_time:.2f}x")
+
+def main():
+    n_conversations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(42)
+    conversations = [make_conversation(i, rng) for i in range(n_conversations)]
+
+    legacy_time, legacy_rows = run(legacy_parse, conversations, dict)
+    new_time, new_rows = run(parse_conversations, conversations, dict)
+    print(f"conversas: {n_conversations}  linhas: {len(new_rows)}  resultados idênticos: {legacy_rows == new_rows}")
+    report("travessia (linhas como dict)", n_conversations, legacy_time, new_time)
+
+    legacy_time, _ = run(legacy_parse, conversations, Interaction)
+    new_time, _ = run(parse_conversations, conversations, Interaction)
+    report("fluxo completo (objetos Interaction)", n_conversations, legacy_time, new_time)
+
+if __name__ == "__main__":
+    main()
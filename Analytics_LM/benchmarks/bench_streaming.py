@@ -0,0 +1,96 @@
+"""
+Benchmark da agregação em blocos (StreamingAggregator) contra a leitura do período inteiro.
+
+Grava interações sintéticas em um SQLite temporário e calcula o relatório (KPIs da Tela
+Inicial, séries por dia, agregados por fila e por agente) das duas formas, medindo o pico
+de memória com tracemalloc. No modo em blocos o pico acompanha STREAM_CHUNK_ROWS; na
+leitura completa, a quantidade de interações do período.
+
+Uso (a partir de Analytics_LM/):
+    python -m benchmarks.bench_streaming [quantidade_de_interacoes] [linhas_por_bloco]
+"""
+from datetime import datetime
+import asyncio
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models.interaction import Base
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.metrics import KPIAggregate, MetricsService
+from app.services.analytics.streaming import StreamingAggregator
+from app.services.storage.repository import InteractionRepository
+from benchmarks.bench_batch import make_records
+
+START, END = datetime(2024, 3, 1), datetime(2024, 4, 1)
+
+def materialized_report(repository: InteractionRepository):
+    batch = repository.query_interactions(START, END)
+    return (
+        KPIAggregate.from_batch(batch).to_overview(),
+        MetricsService.compute_period_series(batch, period="D"),
+        KPIAggregate.group_by(batch, "queue_id"),
+        KPIAggregate.group_by(batch, "agent_id")
+    )
+
+async def streaming_report(repository: InteractionRepository, chunk_rows: int):
+    report = await StreamingAggregator(period="D").consume(
+        repository.stream_interactions(START, END, chunk_rows=chunk_rows)
+    )
+    return report.overview.to_overview(), report.periods.series(), report.queues, report.agents
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, peak, elapsed
+
+def comparable(overview: dict) -> dict:
+    # Motivos empatados no top podem sair em outra ordem quando os blocos são combinados
+    return dict(overview, top_reasons=sorted(overview["top_reasons"].values()))
+
+def same(a, b) -> bool:
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(same(a[key], b[key]) for key in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    if isinstance(a, float):
+        return abs(a - b) <= 1e-9 * max(1.0, abs(a))
+    return a == b
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    chunk_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        repository = InteractionRepository(sessionmaker(bind=engine, expire_on_commit=False))
+        repository.upsert_interactions(InteractionBatch.from_records(make_records(n_rows, random.Random(42))))
+
+        streamed, stream_peak, stream_time = measure(lambda: asyncio.run(streaming_report(repository, chunk_rows)))
+        full, full_peak, full_time = measure(lambda: materialized_report(repository))
+        engine.dispose()
+
+    overview, series, queues, agents = streamed
+    assert same(comparable(overview), comparable(full[0])), "KPIs da Tela Inicial diferem"
+    assert same(series, full[1]), "séries por período diferem"
+    for streamed_groups, full_groups in ((queues, full[2]), (agents, full[3])):
+        assert streamed_groups.keys() == full_groups.keys()
+        assert all(same(comparable(streamed_groups[key].to_overview()), comparable(full_groups[key].to_overview())) for key in full_groups)
+
+    print(f"interações: {n_rows:,}  linhas por bloco: {chunk_rows:,}")
+    print(f"período inteiro: pico {full_peak / 2**20:8.1f} MiB  tempo {full_time:6.2f} s")
+    print(f"em blocos:       pico {stream_peak / 2**20:8.1f} MiB  tempo {stream_time:6.2f} s")
+    print(f"redução do pico: {full_peak / stream_peak:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import os
+
+# Settings exige as credenciais na importação; os testes não chamam os serviços reais
+for name in (
+    "GENESYS_CLIENT_ID", "GENESYS_CLIENT_SECRET", "GENESYS_ENVIRONMENT",
+    "POWERBI_CLIENT_ID", "POWERBI_CLIENT_SECRET", "POWERBI_TENANT_ID"
+):
+    os.environ.setdefault(name, "test")
+
+from datetime import timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models.interaction import Base
+from app.services.storage.cache import InteractionBlockCache
+from app.services.storage.repository import InteractionRepository
+
+@pytest.fixture
+def repository(tmp_path):
+    """
+    Repositório sobre um SQLite temporário, com cache de blocos de 1 hora próprio do teste
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'store.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
+    yield InteractionRepository(session_factory, InteractionBlockCache(block_size=timedelta(hours=1)))
+    engine.dispose()
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta
+from app.services.analytics.batch import InteractionBatch
+from app.services.storage.cache import InteractionBlockCache, _Block
+
+DAY = datetime(2024, 3, 1)
+
+def at(hour, minute=0):
+    return DAY + timedelta(hours=hour, minutes=minute)
+
+class Store:
+    """
+    Uma interação a cada 30 minutos; registra as faixas pedidas ao "banco"
+    """
+    def __init__(self):
+        self.records = [
+            {"id": f"c{i}:s1:0", "conversation_id": f"c{i}", "queue_id": "q1", "start_time": at(0, 30 * i)}
+            for i in range(48)
+        ]
+        self.loads = []
+
+    async def load(self, start_date, end_date):
+        self.loads.append((start_date, end_date))
+        return InteractionBatch.from_records([r for r in self.records if start_date <= r["start_time"] < end_date])
+
+    def expected(self, start_date, end_date):
+        return [r["id"] for r in self.records if start_date <= r["start_time"] < end_date]
+
+def get_range(cache, store, start_date, end_date):
+    return asyncio.run(cache.get_range(start_date, end_date, "filters", store.load))
+
+def test_range_is_stitched_from_cached_and_missing_blocks():
+    cache, store = InteractionBlockCache(block_size=timedelta(hours=1)), Store()
+    get_range(cache, store, at(9), at(11))
+    store.loads.clear()
+
+    batch = get_range(cache, store, at(8, 15), at(12, 45))
+    # Só os blocos faltantes vão ao banco, agrupados em faixas contíguas
+    assert store.loads == [(at(8), at(9)), (at(11), at(13))]
+    assert batch.column("id").tolist() == store.expected(at(8, 15), at(12, 45))
+
+    store.loads.clear()
+    batch = get_range(cache, store, at(8), at(13))
+    assert store.loads == []
+    assert batch.column("id").tolist() == store.expected(at(8), at(13))
+
+def test_least_recently_used_blocks_are_evicted_by_size():
+    store = Store()
+    size = _Block(asyncio.run(store.load(at(0), at(1))), None).size
+    cache = InteractionBlockCache(block_size=timedelta(hours=1), max_bytes=2 * size + size // 2)
+
+    get_range(cache, store, at(0), at(1))
+    get_range(cache, store, at(1), at(2))
+    get_range(cache, store, at(0), at(1))  # o bloco 0h passa a ser o mais recente
+    get_range(cache, store, at(2), at(3))
+    assert [key[1] for key in cache._blocks] == [at(0), at(2)]
+    assert cache._bytes == 2 * size <= cache.max_bytes
+
+def test_invalidate_from_the_middle_of_a_block():
+    cache, store = InteractionBlockCache(block_size=timedelta(hours=1)), Store()
+    get_range(cache, store, at(8), at(12))
+    cache.invalidate(at(9, 30), at(10, 15))
+    assert [key[1] for key in cache._blocks] == [at(8), at(11)]
+
+    store.loads.clear()
+    get_range(cache, store, at(8), at(12))
+    assert store.loads == [(at(9), at(11))]
+
+def test_load_that_raced_an_invalidation_is_not_stored():
+    cache, store = InteractionBlockCache(block_size=timedelta(hours=1)), Store()
+
+    async def racing_load(start_date, end_date):
+        batch = await store.load(start_date, end_date)
+        # Uma gravação invalida o período enquanto a leitura (já antiga) estava em voo
+        cache.invalidate(start_date, end_date)
+        return batch
+
+    async def main():
+        batch = await cache.get_range(at(9), at(11), "filters", racing_load)
+        assert batch.column("id").tolist() == store.expected(at(9), at(11))
+
+    asyncio.run(main())
+    assert len(cache._blocks) == 0
+
+    get_range(cache, store, at(9), at(11))
+    assert len(cache._blocks) == 2
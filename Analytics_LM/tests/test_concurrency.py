@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+import numpy as np
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.concurrency import concurrency_curves, concurrency_summary
+
+START = datetime(2024, 3, 1, 9, 0)
+
+def session(conversation, segment, start_minute, end_minute, agent="agent-1"):
+    return {
+        "id": f"{conversation}:s:{segment}",
+        "conversation_id": conversation,
+        "agent_id": agent,
+        "status": "answered",
+        "start_time": START + timedelta(minutes=start_minute),
+        "end_time": START + timedelta(minutes=end_minute)
+    }
+
+def curves(*sessions):
+    return concurrency_curves(InteractionBatch.from_records(list(sessions)), "agent_id", "H", "UTC")
+
+def test_sessions_of_the_same_conversation_are_kept():
+    # Transferência de volta: duas sessões do mesmo agente na mesma conversa
+    result = curves(session("conv-1", 0, 0, 10), session("conv-1", 2, 30, 50))
+    assert np.allclose(result.occupancy, [[0.5]])
+    assert result.peak.tolist() == [[1]]
+
+def test_overlapping_sessions_count_once():
+    result = curves(session("conv-1", 0, 0, 20), session("conv-1", 1, 10, 30))
+    assert result.peak.tolist() == [[1]]
+    assert np.allclose(result.average, [[0.5]])
+
+def test_concurrent_conversations():
+    result = curves(
+        session("conv-1", 0, 0, 30),
+        session("conv-2", 0, 15, 45),
+        session("conv-3", 0, 45, 90)
+    )
+    assert result.timestamps == ["2024-03-01 09:00:00", "2024-03-01 10:00:00"]
+    assert result.peak.tolist() == [[2, 1]]
+    assert np.allclose(result.occupancy, [[1.0, 0.5]])
+    summary = concurrency_summary(result)["agent-1"]
+    assert summary["peak_concurrency"] == 2
+    assert np.isclose(summary["average_concurrency"], 105 / 90)
@@ -0,0 +1,154 @@
+import asyncio
+from datetime import datetime, timedelta
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.contacts import detect_duplicate_channels, detect_repeat_contacts
+from app.services.storage.contacts import ContactFlagger
+
+START = datetime(2024, 3, 1, 9, 0)
+GAP = timedelta(minutes=10)
+CHANNELS = ("voice", "message")
+
+def contact(conversation, segment, channel, start_minute, end_minute):
+    return {
+        "id": f"{conversation}:s:{segment}",
+        "conversation_id": conversation,
+        "customer_id": "cust-1",
+        "channel_type": channel,
+        "status": "answered",
+        "start_time": START + timedelta(minutes=start_minute),
+        "end_time": None if end_minute is None else START + timedelta(minutes=end_minute)
+    }
+
+def test_open_contact_is_still_open():
+    batch = InteractionBatch.from_records([
+        # Ligação ainda em andamento (sem fim) e WhatsApp 10 minutos depois
+        contact("voice-1", 0, "voice", 0, None),
+        contact("chat-1", 0, "message", 10, 15)
+    ])
+    assert detect_duplicate_channels(batch, GAP, CHANNELS).tolist() == [False, True]
+
+def test_contact_end_spans_all_legs():
+    batch = InteractionBatch.from_records([
+        # Ligação transferida: pernas de 0 a 5 e de 5 a 40 minutos; WhatsApp no minuto 20
+        contact("voice-1", 0, "voice", 0, 5),
+        contact("voice-1", 1, "voice", 5, 40),
+        contact("chat-1", 0, "message", 20, 30)
+    ])
+    assert detect_duplicate_channels(batch, GAP, CHANNELS).tolist() == [False, False, True]
+
+def test_gap_after_contact_end():
+    batch = InteractionBatch.from_records([
+        contact("voice-1", 0, "voice", 0, 5),
+        contact("chat-1", 0, "message", 15, 20),
+        contact("chat-2", 0, "message", 40, 45),
+        # Mesmo canal do contato anterior não conta como duplicidade
+        contact("voice-2", 0, "voice", 46, 50)
+    ])
+    assert detect_duplicate_channels(batch, GAP, CHANNELS).tolist() == [False, True, False, True]
+
+WINDOW = timedelta(hours=2)
+
+def call(conversation, start, segment=0, customer="cust-1", queue="q1", reason=None):
+    return {
+        "id": f"{conversation}:s:{segment}",
+        "conversation_id": conversation,
+        "customer_id": customer,
+        "queue_id": queue,
+        "channel_type": "voice",
+        "status": "answered",
+        "reason": reason,
+        "start_time": START + start,
+        "end_time": START + start + timedelta(minutes=5)
+    }
+
+def repeats(rows, same_queue=False):
+    repeat = detect_repeat_contacts(InteractionBatch.from_records(rows), WINDOW, same_queue)
+    return repeat.is_callback.tolist(), repeat.callback_reason.decode().tolist()
+
+def test_repeat_window_is_inclusive():
+    rows = [
+        call("c1", timedelta(0)),
+        # Exatamente uma janela depois do início do contato anterior
+        call("c2", WINDOW),
+        call("c3", WINDOW * 2 + timedelta(seconds=1)),
+        # Outro cliente no mesmo horário não é rechamada
+        call("c4", WINDOW * 2 + timedelta(minutes=1), customer="cust-2")
+    ]
+    assert repeats(rows)[0] == [False, True, False, False]
+
+def test_repeat_same_queue():
+    rows = [
+        call("c1", timedelta(0), queue="q1"),
+        call("c2", timedelta(minutes=30), queue="q2"),
+        call("c3", timedelta(minutes=90), queue="q1"),
+        # Sem cliente nunca é rechamada
+        call("c4", timedelta(minutes=95), customer=None)
+    ]
+    assert repeats(rows)[0] == [False, True, True, False]
+    assert repeats(rows, same_queue=True)[0] == [False, False, True, False]
+
+def test_transfer_legs_are_one_contact():
+    rows = [
+        # Ligação transferida: três pernas da mesma conversa contam como um contato
+        call("c1", timedelta(0), 0, queue="q1", reason="duvida"),
+        call("c1", timedelta(minutes=10), 1, queue="q2", reason="cancelamento"),
+        call("c1", timedelta(minutes=20), 2, queue="q2", reason="cancelamento"),
+        # Rechamada: todas as pernas são marcadas, com o motivo do início do contato anterior
+        call("c2", timedelta(hours=1), 0, reason="financeiro"),
+        call("c2", timedelta(hours=1, minutes=5), 1, queue="q3", reason="financeiro")
+    ]
+    # Embaralhadas: o resultado não depende da ordem de chegada
+    shuffled = [rows[4], rows[2], rows[0], rows[3], rows[1]]
+    is_callback, reasons = repeats(shuffled)
+    assert is_callback == [True, False, False, True, False]
+    assert reasons == ["duvida", None, None, "duvida", None]
+
+def test_callback_reason_is_the_previous_contact_reason():
+    rows = [
+        call("c1", timedelta(0), reason="duvida"),
+        call("c2", timedelta(minutes=40), reason="cancelamento"),
+        call("c3", timedelta(minutes=80), reason=None),
+        call("c4", timedelta(minutes=100), reason="financeiro"),
+        call("c5", timedelta(hours=8), reason="duvida")
+    ]
+    is_callback, reasons = repeats(rows)
+    assert is_callback == [False, True, True, True, False]
+    # Rechamada de um contato sem motivo fica sem callback_reason
+    assert reasons == [None, "duvida", "cancelamento", None, None]
+
+def test_annotate_restates_stored_rows_after_a_late_earlier_contact(repository):
+    flagger = ContactFlagger(repository, window=WINDOW, same_queue=False)
+    stored = [
+        call("c0", -timedelta(hours=5), reason="antigo"),
+        call("c2", timedelta(hours=1), reason="cancelamento"),
+        call("c3", timedelta(hours=1, minutes=30), reason="duvida"),
+        call("c9", timedelta(hours=9), reason="financeiro")
+    ]
+    first = asyncio.run(flagger.annotate(InteractionBatch.from_records(stored)))
+    assert [row.is_callback for row in first] == [False, False, True, False]
+    asyncio.run(repository.save_interactions(first))
+
+    # Contato anterior que chegou atrasado: c2 passa a ser rechamada de c1
+    late = asyncio.run(flagger.annotate(InteractionBatch.from_records([call("c1", timedelta(0), reason="duvida")])))
+    rows = {row.conversation_id: row for row in late}
+    assert list(rows) == ["c1", "c2"]
+    assert (rows["c1"].is_callback, rows["c1"].callback_reason) == (False, None)
+    assert (rows["c2"].is_callback, rows["c2"].callback_reason) == (True, "duvida")
+
+    # Regravar não muda mais nada
+    asyncio.run(repository.save_interactions(late))
+    assert len(asyncio.run(flagger.annotate(InteractionBatch.from_records([call("c1", timedelta(0), reason="duvida")])))) == 1
+
+def test_refresh_reads_the_store_without_the_cache(repository):
+    repository.upsert_interactions([
+        call("c1", timedelta(0), reason="duvida"),
+        call("c2", timedelta(minutes=30), reason="cancelamento"),
+        call("c3", timedelta(hours=5))
+    ])
+    flagger = ContactFlagger(repository, window=WINDOW, same_queue=False)
+    assert asyncio.run(flagger.refresh(START, START + timedelta(days=1))) == 1
+    rows = {row.conversation_id: row for row in repository.query_interactions(START, START + timedelta(days=1))}
+    assert (rows["c2"].is_callback, rows["c2"].callback_reason) == (True, "duvida")
+    assert not rows["c3"].is_callback
+    assert len(repository.cache._blocks) == 0
+    assert asyncio.run(flagger.refresh(START, START + timedelta(days=1))) == 0
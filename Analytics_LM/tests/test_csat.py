@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+from app.models.interaction import CSAT
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.metrics import MetricsService
+
+START = datetime(2024, 3, 1, 10, 0)
+
+def leg(conversation, segment, queue, channel, minutes, status="answered"):
+    return {
+        "id": f"{conversation}:s:{segment}",
+        "conversation_id": conversation,
+        "queue_id": queue,
+        "channel_type": channel,
+        "status": status,
+        "start_time": START + timedelta(minutes=minutes),
+        "end_time": START + timedelta(minutes=minutes + 5)
+    }
+
+def survey(conversation, score):
+    return CSAT(interaction_id=conversation, agent_id="agent", score=score, created_at=START + timedelta(hours=1))
+
+def test_breakdown_joins_surveys_by_conversation():
+    interactions = InteractionBatch.from_records([
+        # Transferida: a nota vai para a última perna atendida (fila de retenção)
+        leg("conv-1", 0, "triagem", "voice", 0),
+        leg("conv-1", 1, "retencao", "voice", 5),
+        # Última perna abandonada depois de uma transferência: vale a perna atendida
+        leg("conv-2", 0, "suporte", "message", 0),
+        leg("conv-2", 1, "retencao", "message", 10, status="abandoned"),
+        leg("conv-3", 0, "suporte", "message", 0)
+    ])
+    breakdown = MetricsService.calculate_csat_breakdown(interactions, [
+        survey("conv-1", 5),
+        survey("conv-2", 3),
+        survey("conv-3", 4),
+        # Conversa fora do lote
+        survey("conv-9", 1)
+    ])
+    assert breakdown["by_queue"] == {
+        "retencao": {"average_score": 5.0, "total_evaluations": 1},
+        "suporte": {"average_score": 3.5, "total_evaluations": 2}
+    }
+    assert breakdown["by_channel"] == {
+        "voice": {"average_score": 5.0, "total_evaluations": 1},
+        "message": {"average_score": 3.5, "total_evaluations": 2}
+    }
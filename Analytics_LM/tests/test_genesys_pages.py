@@ -0,0 +1,65 @@
+import asyncio
+from app.services.genesys.client import CONVERSATION_DETAILS_PATH, GenesysService
+
+class StubTransport:
+    """
+    Devolve `total_hits` conversas paginadas; as páginas em `delays` demoram mais
+    """
+    def __init__(self, total_hits, delays=None):
+        self.total_hits = total_hits
+        self.delays = delays or {}
+        self.pages = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def post(self, path, body, priority=None):
+        assert path == CONVERSATION_DETAILS_PATH
+        paging = body["paging"]
+        number, size = paging["pageNumber"], paging["pageSize"]
+        self.pages.append(number)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(number, 0))
+        finally:
+            self.in_flight -= 1
+        first = (number - 1) * size
+        ids = range(first, min(first + size, self.total_hits))
+        return {"totalHits": self.total_hits, "conversations": [{"conversationId": f"c{i}"} for i in ids]}
+
+def make_service(transport):
+    service = GenesysService.__new__(GenesysService)
+    service.transport = transport
+    return service
+
+def collect(service, **kwargs):
+    async def main():
+        return [page async for page in service.iter_conversation_pages({}, **kwargs)]
+    return asyncio.run(main())
+
+def test_pages_cover_total_hits():
+    transport = StubTransport(total_hits=10)
+    pages = collect(make_service(transport), page_size=3, max_fanout=2)
+    assert sorted(transport.pages) == [1, 2, 3, 4]
+    assert [len(page) for page in pages][0] == 3
+    ids = [conv["conversationId"] for page in pages for conv in page]
+    assert sorted(ids) == sorted(f"c{i}" for i in range(10))
+
+def test_pages_arrive_in_completion_order_within_the_window():
+    # A página 2 demora: a 3 (e a 4, que entra no lugar da 3) chegam antes dela
+    transport = StubTransport(total_hits=12, delays={2: 0.1})
+    pages = collect(make_service(transport), page_size=3, max_fanout=2)
+    order = [int(page[0]["conversationId"][1:]) // 3 + 1 for page in pages]
+    assert order == [1, 3, 4, 2]
+    assert transport.max_in_flight == 2
+
+def test_single_page_when_everything_fits():
+    transport = StubTransport(total_hits=2)
+    pages = collect(make_service(transport), page_size=3, max_fanout=4)
+    assert transport.pages == [1]
+    assert len(pages) == 1
+
+def test_no_hits_fetches_only_the_first_page():
+    transport = StubTransport(total_hits=0)
+    assert collect(make_service(transport), page_size=3) == [[]]
+    assert transport.pages == [1]
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.core.config import settings
+from app.services.genesys.client import CONVERSATION_DETAILS_PATH, GenesysService, genesys_breaker
+from app.services.genesys.transport import GenesysAPIError, close_shared_transports
+
+class StandInGenesys(ThreadingHTTPServer):
+    """
+    Servidor local que simula a Genesys: respostas roteirizadas por caminho
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.scripts = {}
+        self.requests = []
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+
+    def script(self, path, *responses):
+        self.scripts[path] = list(responses)
+
+    def count(self, path):
+        return sum(1 for request_path, _ in self.requests if request_path == path)
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, para o pool reaproveitar conexões
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.requests.append((self.path, self.client_address[1]))
+        if self.path == "/oauth/token":
+            status, headers, body = 200, {}, {"access_token": "token", "expires_in": 3600}
+        else:
+            scripted = self.server.scripts.get(self.path) or [(200, {}, {})]
+            status, headers, body = scripted.pop(0) if len(scripted) > 1 else scripted[0]
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server(monkeypatch):
+    server = StandInGenesys()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("GENESYS_CLIENT_ID", "client")
+    monkeypatch.setenv("GENESYS_CLIENT_SECRET", "secret")
+    monkeypatch.setenv("GENESYS_ENVIRONMENT", "test")
+    monkeypatch.setattr(settings, "GENESYS_API_HOST", server.url)
+    monkeypatch.setattr(settings, "GENESYS_LOGIN_HOST", server.url)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def run(service, coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await close_shared_transports()
+    return asyncio.run(main())
+
+def test_hosts_come_from_settings(server):
+    service = GenesysService()
+    assert service.api_host == server.url
+    assert service.login_host == server.url
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retries_honor_retry_after(server, status):
+    server.script(
+        "/api/v2/test",
+        (status, {"Retry-After": "0.3"}, {"message": "busy"}),
+        (200, {}, {"ok": True})
+    )
+    service = GenesysService()
+    started = time.monotonic()
+    result = run(service, service.transport.post("/api/v2/test", {}))
+    assert result == {"ok": True}
+    assert server.count("/api/v2/test") == 2
+    assert time.monotonic() - started >= 0.3
+
+def test_token_and_connections_are_reused(server):
+    service = GenesysService()
+
+    async def requests():
+        for _ in range(5):
+            await service.transport.post("/api/v2/test", {})
+        # Outra instância usa o mesmo transporte (pool e token) compartilhado
+        await GenesysService().transport.post("/api/v2/test", {})
+
+    run(service, requests())
+    assert server.count("/api/v2/test") == 6
+    assert server.count("/oauth/token") == 1
+    assert len({port for _, port in server.requests}) == 1
+
+def test_fetch_errors_keep_status(server):
+    server.script(CONVERSATION_DETAILS_PATH, (400, {}, {"message": "invalid interval"}))
+    genesys_breaker.record_success()
+    service = GenesysService()
+    with pytest.raises(GenesysAPIError) as error:
+        run(service, service.get_interactions(datetime(2024, 3, 1), datetime(2024, 3, 1, 1)))
+    genesys_breaker.record_success()
+    assert error.value.status_code == 400
+    assert isinstance(error.value.__cause__, GenesysAPIError)
+    # 4xx não é transitório: uma única chamada
+    assert server.count(CONVERSATION_DETAILS_PATH) == 1
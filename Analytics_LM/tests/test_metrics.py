@@ -0,0 +1,129 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.metrics import KPIAggregate, MetricsService
+from app.services.storage.cache import InteractionBlockCache
+
+START = datetime(2024, 3, 1)
+TARGETS = [0, 10, 20, 30, 45, 60]
+
+def make_batch(n_rows=3000, n_customers=400, n_reasons=12, days=3, seed=11):
+    rng = np.random.default_rng(seed)
+    minutes = np.sort(rng.integers(0, days * 24 * 60, n_rows))
+    wait_time = rng.exponential(40, n_rows).round(1)
+    wait_time[rng.random(n_rows) < 0.05] = np.nan
+    talk_time = rng.exponential(300, n_rows).round(1)
+    return InteractionBatch.from_records([
+        {
+            "id": f"conv-{row}:s:0",
+            "conversation_id": f"conv-{row}",
+            "customer_id": f"cust-{customer}",
+            "agent_id": f"agent-{row % 25}",
+            "queue_id": f"queue-{row % 5}",
+            "channel_type": "voice" if row % 3 else "message",
+            "status": "abandoned" if row % 7 == 0 else "answered",
+            "reason": None if row % 11 == 0 else f"reason-{reason}",
+            "start_time": START + timedelta(minutes=int(minute)),
+            "wait_time": float(wait),
+            "talk_time": float(talk),
+            "is_auto_service": row % 13 == 0,
+            "is_callback": row % 17 == 0,
+            "is_duplicate_channel": row % 19 == 0
+        }
+        for row, customer, reason, minute, wait, talk in zip(
+            range(n_rows), rng.integers(0, n_customers, n_rows), rng.zipf(1.5, n_rows) % n_reasons,
+            minutes, wait_time, talk_time
+        )
+    ])
+
+def by_day(batch, days=3):
+    return [batch.between(START + timedelta(days=d), START + timedelta(days=d + 1)) for d in range(days)]
+
+def assert_same_overview(actual, expected):
+    actual, expected = actual.to_overview(top_n=50, targets=TARGETS), expected.to_overview(top_n=50, targets=TARGETS)
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if key in ("percentiles", "top_reasons"):
+            assert actual[key] == value, key
+        else:
+            assert actual[key] == pytest.approx(value), key
+
+def test_day_partitions_merge_to_the_whole_range():
+    batch = make_batch()
+    parts = by_day(batch)
+    assert sum(len(part) for part in parts) == len(batch)
+    assert_same_overview(KPIAggregate.merge_all(KPIAggregate.from_batch(part) for part in parts), KPIAggregate.from_batch(batch))
+
+def test_merge_is_associative_and_commutative():
+    a, b, c = (KPIAggregate.from_batch(part) for part in by_day(make_batch()))
+    assert_same_overview(a.merge(b).merge(c), a.merge(b.merge(c)))
+    assert_same_overview(c.merge(a).merge(b), a.merge(b).merge(c))
+    # merge não altera os operandos
+    assert a.received + b.received + c.received == a.merge(b).merge(c).received
+
+def test_groups_merge_to_the_whole_batch():
+    batch = make_batch()
+    groups = KPIAggregate.group_by(batch, ("queue_id", "channel_type"))
+    assert len(groups) == 10
+    assert_same_overview(KPIAggregate.merge_all(groups.values()), KPIAggregate.from_batch(batch))
+
+@pytest.mark.parametrize("n_customers, n_reasons", [(100, 12), (5000, 400)])
+def test_state_round_trip(n_customers, n_reasons):
+    # Também com o HyperLogLog em registradores e o top-K de motivos acima da capacidade
+    aggregates = [KPIAggregate.from_batch(part) for part in by_day(make_batch(6000, n_customers, n_reasons))]
+    restored = [KPIAggregate.from_state(json.loads(json.dumps(a.to_state()))) for a in aggregates]
+    for original, copy in zip(aggregates, restored):
+        assert_same_overview(copy, original)
+        assert copy.to_state() == original.to_state()
+    assert_same_overview(KPIAggregate.merge_all(restored), KPIAggregate.merge_all(aggregates))
+
+def test_different_targets_do_not_merge():
+    with pytest.raises(ValueError):
+        KPIAggregate(20).update(KPIAggregate(30))
+
+def count_scans(monkeypatch):
+    scanned = []
+    from_batch = KPIAggregate.from_batch
+
+    def counting(cls, interactions, target_seconds=20):
+        scanned.append(len(interactions))
+        return from_batch(interactions, target_seconds)
+
+    monkeypatch.setattr(KPIAggregate, "from_batch", classmethod(counting))
+    return scanned
+
+def test_same_batch_is_scanned_once(monkeypatch):
+    batch = make_batch()
+    scanned = count_scans(monkeypatch)
+    first = MetricsService.compute_overview(batch)
+    assert MetricsService.compute_overview(batch) == first
+    MetricsService.compute_overview(batch, targets=[30])
+    assert scanned == [len(batch)]
+
+def test_sliding_window_scans_only_the_edge_blocks(monkeypatch):
+    batch = make_batch()
+    cache = InteractionBlockCache(block_size=timedelta(hours=1))
+
+    async def load(start_date, end_date):
+        return batch.between(start_date, end_date)
+
+    def window(minute):
+        start_date = START + timedelta(days=1, minutes=minute)
+        return asyncio.run(cache.get_range(start_date, start_date + timedelta(days=1), "filters", load))
+
+    scanned = count_scans(monkeypatch)
+    first = window(10)
+    MetricsService.compute_overview(first)
+    assert sum(scanned) == len(first)
+
+    # Um minuto depois: os 23 blocos inteiros do meio vêm do memo
+    scanned.clear()
+    second = window(11)
+    overview = KPIAggregate.for_batch(second)
+    assert len(second.parts) == 25
+    assert sum(scanned) == len(second.parts[0]) + len(second.parts[-1])
+    assert sum(scanned) < len(second) / 5
+    assert_same_overview(overview, KPIAggregate.from_batch(second))
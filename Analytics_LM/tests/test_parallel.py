@@ -0,0 +1,119 @@
+import asyncio
+import pickle
+from datetime import datetime, timedelta
+import numpy as np
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.metrics import KPIAggregate, MetricsService
+from app.services.analytics.parallel import ParallelAggregator, _attach, _partition_bounds, _partition_state, _share
+
+def make_batch(n_rows, n_customers, seed=7):
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 3, 1)
+    return InteractionBatch.from_records([
+        {
+            "id": f"conv-{row}:s:0",
+            "conversation_id": f"conv-{row}",
+            "customer_id": None if customer == 0 else f"cust-{customer}",
+            "agent_id": f"agent-{row % 40}",
+            "queue_id": f"queue-{row % 6}",
+            "channel_type": "voice" if row % 3 else "message",
+            "status": "answered" if row % 5 else "abandoned",
+            "reason": f"reason-{row % 9}",
+            "start_time": start + timedelta(minutes=int(minute)),
+            "wait_time": float(row % 90),
+            "talk_time": float(row % 600)
+        }
+        for row, customer, minute in zip(
+            range(n_rows), rng.integers(0, n_customers, n_rows), rng.integers(0, 30 * 24 * 60, n_rows)
+        )
+    ])
+
+def shared_states(batch, keys, column):
+    order = np.argsort(keys, kind="stable")
+    block, layout = _share(batch, order)
+    try:
+        states = [
+            _partition_state(_attach(layout, block.buf, start, end), 20, column)
+            for start, end in _partition_bounds(keys[order], 4)
+        ]
+        return states, layout
+    finally:
+        block.close()
+        block.unlink()
+
+def test_task_payload_does_not_grow_with_customers():
+    few = make_batch(4000, 50)
+    many = make_batch(4000, 4000)
+    keys = np.zeros(4000, dtype=np.int64)
+    _, few_layout = shared_states(few, keys, None)
+    _, many_layout = shared_states(many, keys, None)
+    assert len(pickle.dumps(many_layout)) == len(pickle.dumps(few_layout))
+
+def test_shared_partitions_match_inline_aggregate():
+    batch = make_batch(6000, 2500)
+    days = batch.column("start_time").astype("datetime64[D]").astype(np.int64)
+    states, _ = shared_states(batch, days, None)
+    merged = KPIAggregate.merge_all(KPIAggregate.from_state(state) for state in states)
+    expected = KPIAggregate.from_batch(batch)
+    # Clientes distintos: o hash calculado no processo principal é o mesmo do cálculo em linha
+    assert merged.customers.count() == expected.customers.count()
+    assert merged.to_overview()["total_customers"] == expected.to_overview()["total_customers"]
+    assert merged.received == expected.received and merged.answered == expected.answered
+
+def test_shared_group_by_matches_inline():
+    batch = make_batch(6000, 2500)
+    codes = batch.categorical("queue_id").codes.astype(np.int64)
+    states, _ = shared_states(batch, codes, "queue_id")
+    grouped = {key: KPIAggregate.from_state(state) for partial in states for key, state in partial}
+    expected = KPIAggregate.group_by(batch, "queue_id")
+    assert set(grouped) == set(expected)
+    for key, aggregate in expected.items():
+        assert grouped[key].customers.count() == aggregate.customers.count()
+        assert grouped[key].answered == aggregate.answered
+
+def count_scans(monkeypatch):
+    scanned = []
+    from_batch = KPIAggregate.from_batch
+
+    def counting(cls, interactions, target_seconds=20):
+        scanned.append(len(interactions))
+        return from_batch(interactions, target_seconds)
+
+    monkeypatch.setattr(KPIAggregate, "from_batch", classmethod(counting))
+    return scanned
+
+def test_overview_calls_on_the_same_batch_scan_once(monkeypatch):
+    batch = make_batch(3000, 500)
+    scanned = count_scans(monkeypatch)
+    aggregator = ParallelAggregator(workers=1)
+    first = asyncio.run(aggregator.aggregate(batch))
+    assert asyncio.run(aggregator.aggregate(batch)) is first
+    # compute_overview e o endpoint da Tela Inicial compartilham o memo
+    assert MetricsService.compute_overview(batch) == first.to_overview()
+    assert scanned == [len(batch)]
+    asyncio.run(aggregator.aggregate(batch, target_seconds=30))
+    assert scanned == [len(batch), len(batch)]
+
+def test_pool_result_is_memoized(monkeypatch):
+    batch = make_batch(3000, 500)
+    runs = []
+
+    # Partições agregadas em linha, no lugar do pool de processos
+    async def run(batch, keys, target_seconds, column):
+        runs.append(len(batch))
+        return shared_states(batch, keys, column)[0]
+
+    aggregator = ParallelAggregator(workers=4, min_rows=1000)
+    monkeypatch.setattr(aggregator, "_run", run)
+    scanned = count_scans(monkeypatch)
+    first = asyncio.run(aggregator.aggregate(batch))
+    assert asyncio.run(aggregator.aggregate(batch)) is first
+    assert KPIAggregate.for_batch(batch) is first
+    assert runs == [len(batch)]
+    # Só as partições (no "worker") foram varridas
+    assert sum(scanned) == len(batch)
+
+    # Abaixo de min_rows pendentes o agregado é calculado em linha
+    small = make_batch(500, 100)
+    asyncio.run(aggregator.aggregate(small))
+    assert runs == [len(batch)]
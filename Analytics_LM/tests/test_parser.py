@@ -0,0 +1,90 @@
+from datetime import datetime
+from app.services.genesys.parser import parse_conversations
+
+def metrics(**values):
+    return [{"name": name, "value": value} for name, value in values.items()]
+
+TRANSFERRED = {
+    "conversationId": "conv-1",
+    "conversationStart": "2024-03-01T10:00:00.000Z",
+    "conversationEnd": "2024-03-01T10:05:00.000Z",
+    "participants": [
+        {"purpose": "customer", "participantId": "cust-1", "sessions": [{"mediaType": "voice", "segments": []}]},
+        {
+            "purpose": "agent", "userId": "agent-a", "participantId": "p-a",
+            "sessions": [{
+                "sessionId": "s-a", "mediaType": "voice",
+                "metrics": metrics(tWait=30000, tTalk=120000, nConnected=1),
+                "segments": [
+                    {"segmentType": "alert", "queueId": "q1"},
+                    {"segmentType": "interact", "queueId": "q1", "wrapUpCode": "duvida"},
+                ],
+            }],
+        },
+        {
+            "purpose": "agent", "userId": "agent-b", "participantId": "p-b",
+            "sessions": [{
+                "sessionId": "s-b", "mediaType": "voice",
+                # A primeira ocorrência de cada métrica vale
+                "metrics": metrics(tWait=10000, tTalk=60000, nConnected=1) + metrics(tTalk=999000),
+                "segments": [
+                    {"segmentType": "interact", "queueId": "q2"},
+                    {"segmentType": "hold", "queueId": "q2"},
+                    {"segmentType": "interact", "queueId": "q2", "wrapUpCode": "cancelamento"},
+                ],
+            }],
+        },
+    ],
+}
+
+ABANDONED = {
+    "conversationId": "conv-2",
+    "conversationStart": "2024-03-01T10:00:00.000-03:00",
+    "conversationEnd": "2024-03-01T10:01:30.000-03:00",
+    "participants": [
+        {"purpose": "customer", "participantId": "cust-2"},
+        {"purpose": "acd", "sessions": [{"segments": [{"segmentType": "interact", "wrapUpCode": "abandono"}]}]},
+        {
+            "purpose": "agent", "userId": "agent-c",
+            "sessions": [{
+                "sessionId": "s-c", "mediaType": "message",
+                "metrics": metrics(tWait=45000, nConnected=0),
+                "segments": [{"segmentType": "interact", "queueId": "q1"}],
+            }],
+        },
+    ],
+}
+
+def test_transferred_conversation_has_one_row_per_interact_segment():
+    rows = parse_conversations([TRANSFERRED], row_factory=dict)
+    assert [row["id"] for row in rows] == ["conv-1:s-a:1", "conv-1:s-b:0", "conv-1:s-b:2"]
+    assert {row["conversation_id"] for row in rows} == {"conv-1"}
+    assert {row["customer_id"] for row in rows} == {"cust-1"}
+    assert [row["agent_id"] for row in rows] == ["agent-a", "agent-b", "agent-b"]
+    assert [row["queue_id"] for row in rows] == ["q1", "q2", "q2"]
+    assert [row["reason"] for row in rows] == ["duvida", "cancelamento", "cancelamento"]
+
+    first, second, _ = rows
+    assert first["start_time"] == datetime(2024, 3, 1, 10)
+    assert first["end_time"] == datetime(2024, 3, 1, 10, 5)
+    assert first["duration"] == 300
+    assert (first["wait_time"], first["talk_time"], first["status"]) == (30, 120, "answered")
+    assert (second["wait_time"], second["talk_time"], second["status"]) == (10, 60, "answered")
+    assert first["channel_type"] == "voice"
+
+def test_abandoned_conversation():
+    rows = parse_conversations([ABANDONED], row_factory=dict)
+    assert len(rows) == 1
+    row = rows[0]
+    assert row["id"] == "conv-2:s-c:0"
+    assert (row["wait_time"], row["talk_time"], row["status"]) == (45, 0, "abandoned")
+    # Datas convertidas para UTC sem fuso
+    assert row["start_time"] == datetime(2024, 3, 1, 13)
+    assert row["duration"] == 90
+    # Sem wrap-up do agente: vale o de outro participante
+    assert row["reason"] == "abandono"
+    assert not row["is_callback"] and not row["is_duplicate_channel"]
+
+def test_conversation_without_agent_sessions_has_no_rows():
+    bot_only = {"conversationId": "conv-3", "participants": [{"purpose": "customer"}, {"purpose": "agent", "sessions": []}]}
+    assert parse_conversations([bot_only, ABANDONED], row_factory=dict)[0]["conversation_id"] == "conv-2"
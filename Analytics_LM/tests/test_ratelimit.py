@@ -0,0 +1,91 @@
+import asyncio
+import time
+from app.services.genesys.ratelimit import AdaptiveRateLimiter, Priority, _Slot
+
+def make_limiter(**kwargs):
+    options = dict(rate_per_second=1000, burst=100, min_concurrency=1, initial_concurrency=8, max_concurrency=10)
+    options.update(kwargs)
+    return AdaptiveRateLimiter(**options)
+
+async def call(limiter, outcome=None, retry_after=None, priority=Priority.INTERACTIVE):
+    async with limiter.slot(priority) as slot:
+        if outcome == "throttled":
+            slot.throttled(retry_after)
+
+def test_throttling_halves_the_limit_and_waits_for_retry_after():
+    limiter = make_limiter()
+
+    async def main():
+        await call(limiter, "throttled", retry_after=0.2)
+        assert limiter.limit == 4
+        started = time.monotonic()
+        await call(limiter)
+        assert time.monotonic() - started >= 0.19
+
+        # Sem Retry-After só reduz; nunca abaixo do mínimo
+        for _ in range(5):
+            await call(limiter, "throttled")
+        assert limiter.limit == 1
+
+    asyncio.run(main())
+
+def test_limit_grows_by_one_per_window_without_throttling():
+    limiter = make_limiter(initial_concurrency=4, max_concurrency=6)
+
+    async def main():
+        for _ in range(3):
+            await call(limiter)
+        assert limiter.limit == 4
+        await call(limiter)
+        assert limiter.limit == 5
+        for _ in range(5):
+            await call(limiter)
+        assert limiter.limit == 6
+        for _ in range(12):
+            await call(limiter)
+        assert limiter.limit == 6
+
+    asyncio.run(main())
+
+def test_interactive_calls_go_first():
+    limiter = make_limiter(initial_concurrency=1, max_concurrency=1)
+    order = []
+
+    async def waiter(name, priority):
+        async with limiter.slot(priority):
+            order.append(name)
+
+    async def main():
+        await limiter.acquire()
+        tasks = [
+            asyncio.ensure_future(waiter("bulk", Priority.BULK)),
+            asyncio.ensure_future(waiter("sync-1", Priority.SYNC)),
+            asyncio.ensure_future(waiter("interactive", Priority.INTERACTIVE)),
+            asyncio.ensure_future(waiter("sync-2", Priority.SYNC)),
+        ]
+        await asyncio.sleep(0.01)
+        assert order == []
+        limiter.release(_Slot(limiter))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    # Mesma prioridade: ordem de chegada
+    assert order == ["interactive", "sync-1", "sync-2", "bulk"]
+
+def test_timer_from_a_finished_loop_does_not_stall_the_next_one():
+    # Uma ficha a cada 100 ms: a segunda chamada depende do timer de reposição
+    limiter = make_limiter(rate_per_second=10, burst=1)
+
+    async def first():
+        await call(limiter)
+        try:
+            await asyncio.wait_for(limiter.acquire(), 0.01)
+        except asyncio.TimeoutError:
+            pass
+
+    async def second():
+        await asyncio.wait_for(limiter.acquire(), 1)
+
+    asyncio.run(first())
+    asyncio.run(second())
+    assert limiter.in_flight == 1
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from app.models.interaction import Interaction
+from app.services.analytics.batch import InteractionBatch
+
+def interaction(conversation_id, start_time, queue_id="q1", status="answered"):
+    return {
+        "id": f"{conversation_id}:s1:0",
+        "conversation_id": conversation_id,
+        "queue_id": queue_id,
+        "channel_type": "voice",
+        "start_time": start_time,
+        "end_time": start_time + timedelta(minutes=5),
+        "duration": 300,
+        "status": status,
+    }
+
+def stored(repository):
+    with repository.session_factory() as session:
+        count = session.scalar(select(func.count()).select_from(Interaction))
+        rows = {row.id: row for row in session.scalars(select(Interaction))}
+    return count, rows
+
+def test_reingesting_updates_instead_of_duplicating(repository):
+    first = [interaction("c1", datetime(2024, 3, 1, 9)), interaction("c2", datetime(2024, 3, 1, 10))]
+    assert repository.upsert_interactions(first) == 2
+    _, before = stored(repository)
+
+    again = [interaction("c1", datetime(2024, 3, 1, 9), queue_id="q2", status="abandoned"), first[1]]
+    assert repository.upsert_interactions(again) == 2
+    count, after = stored(repository)
+    assert count == 2
+    assert after["c1:s1:0"].queue_id == "q2"
+    assert after["c1:s1:0"].status == "abandoned"
+    # A data da primeira ingestão é preservada
+    assert after["c1:s1:0"].created_at == before["c1:s1:0"].created_at
+    assert after["c1:s1:0"].updated_at >= before["c1:s1:0"].updated_at
+
+def test_upsert_in_several_chunks(repository, monkeypatch):
+    monkeypatch.setattr("app.services.storage.repository.UPSERT_CHUNK_SIZE", 3)
+    rows = [interaction(f"c{i}", datetime(2024, 3, 1, 9, i)) for i in range(7)]
+    repository.upsert_interactions(rows)
+    repository.upsert_interactions(rows + [interaction("c0", datetime(2024, 3, 1, 9), queue_id="q9")])
+    count, after = stored(repository)
+    assert count == 7
+    assert after["c0:s1:0"].queue_id == "q9"
+
+def test_saving_invalidates_only_the_affected_blocks(repository):
+    day = datetime(2024, 3, 1)
+    repository.upsert_interactions([
+        interaction("c1", day + timedelta(hours=9, minutes=10)),
+        interaction("c2", day + timedelta(hours=11, minutes=20)),
+    ])
+
+    async def main():
+        cached = await repository.get_interactions(day, day + timedelta(days=1))
+        assert cached.column("queue_id").tolist() == ["q1", "q1"]
+        assert len(repository.cache._blocks) == 24
+
+        update = InteractionBatch.from_records([interaction("c1", day + timedelta(hours=9, minutes=10), queue_id="q2")])
+        await repository.save_interactions(update)
+        blocks = {key[1] for key in repository.cache._blocks}
+        assert day + timedelta(hours=9) not in blocks
+        assert day + timedelta(hours=11) in blocks
+
+        misses = repository.cache.misses
+        fresh = await repository.get_interactions(day, day + timedelta(days=1))
+        assert fresh.column("queue_id").tolist() == ["q2", "q1"]
+        assert len(fresh) == 2
+        # Só o bloco invalidado volta ao banco
+        assert repository.cache.misses == misses + 1
+
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+import asyncio
+import pytest
+from app.core import resilience
+from app.core.resilience import CircuitBreaker, CircuitOpenError, StaleWhileRevalidate
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Só o relógio do módulo: o event loop continua com o tempo real
+    clock = Clock()
+    monkeypatch.setattr(resilience, "time", clock)
+    return clock
+
+async def fail():
+    raise RuntimeError("upstream fora do ar")
+
+def test_breaker_opens_at_the_failure_threshold(clock):
+    breaker = CircuitBreaker("genesys", failure_threshold=3, reset_timeout=30)
+
+    async def main():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await breaker.call(fail)
+        assert breaker.state == CircuitBreaker.CLOSED
+        with pytest.raises(RuntimeError):
+            await breaker.call(fail)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        calls = []
+        async def ok():
+            calls.append(1)
+            return "ok"
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(ok)
+        assert calls == []
+
+    asyncio.run(main())
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("genesys", failure_threshold=2)
+
+    async def ok():
+        return "ok"
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await breaker.call(fail)
+        await breaker.call(ok)
+        with pytest.raises(RuntimeError):
+            await breaker.call(fail)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(main())
+
+def test_half_open_probe_closes_or_reopens(clock):
+    breaker = CircuitBreaker("genesys", failure_threshold=1, reset_timeout=30)
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await breaker.call(fail)
+        clock.now += 29
+        assert breaker.state == CircuitBreaker.OPEN
+        clock.now += 1
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        # Sonda que falha: abre de novo por mais reset_timeout
+        with pytest.raises(RuntimeError):
+            await breaker.call(fail)
+        assert breaker.state == CircuitBreaker.OPEN
+        clock.now += 30
+
+        # Uma única sonda em voo; as demais chamadas são recusadas
+        release = asyncio.Event()
+        async def probe():
+            await release.wait()
+            return "ok"
+        task = asyncio.ensure_future(breaker.call(probe))
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(probe)
+        release.set()
+        assert await task == "ok"
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.failures == 0
+
+    asyncio.run(main())
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        if self.fail:
+            raise RuntimeError("upstream fora do ar")
+        return f"v{self.calls}"
+
+def test_stale_value_is_served_while_one_refresh_runs(clock):
+    cache = StaleWhileRevalidate(fresh_ttl=60, max_stale=600)
+    loader = Loader()
+
+    async def main():
+        first = await cache.get("key", loader)
+        assert (first.value, first.stale) == ("v1", False)
+        clock.now += 59
+        assert (await cache.get("key", loader)).value == "v1"
+        assert loader.calls == 1
+
+        clock.now += 1
+        loader.release = asyncio.Event()
+        results = await asyncio.gather(*[cache.get("key", loader) for _ in range(5)])
+        assert all(r.value == "v1" and r.stale for r in results)
+        await asyncio.sleep(0)
+        # Várias leituras desatualizadas, uma única atualização em segundo plano
+        assert loader.calls == 2
+        loader.release.set()
+        await asyncio.gather(*cache._background)
+
+        refreshed = await cache.get("key", loader)
+        assert (refreshed.value, refreshed.stale) == ("v2", False)
+
+    asyncio.run(main())
+
+def test_failed_refresh_past_max_stale_serves_last_good_value(clock):
+    cache = StaleWhileRevalidate(fresh_ttl=60, max_stale=600)
+    loader = Loader()
+
+    async def main():
+        await cache.get("key", loader)
+        clock.now += 601
+        loader.fail = True
+        result = await cache.get("key", loader)
+        assert (result.value, result.stale) == ("v1", True)
+        assert loader.calls == 2
+
+        # Sem resultado anterior, a falha chega a quem chamou
+        with pytest.raises(RuntimeError):
+            await cache.get("other", loader)
+
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+import asyncio
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from sqlalchemy import select, update
+from app.models.interaction import Interaction, QueueMetrics
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.metrics import KPIAggregate
+from app.services.storage.access import DataAccessService
+from app.services.storage.rollups import RollupMaterializer, floor_time, plan_ranges
+
+DAY = datetime(2024, 5, 1)
+
+def at(day, hour, minute=0):
+    return DAY + timedelta(days=day, hours=hour, minutes=minute)
+
+def test_plan_ranges_uses_the_largest_closed_granularity():
+    rollups, raw = plan_ranges(at(0, 10, 30), at(3, 5, 15), at(3, 3), ("day", "hour"))
+    assert rollups == [
+        ("hour", at(0, 11), at(1, 0)),
+        ("day", at(1, 0), at(3, 0)),
+        ("hour", at(3, 0), at(3, 3)),
+    ]
+    # Bordas que não fecham uma hora e o trecho depois da cobertura vêm das interações
+    assert raw == [(at(0, 10, 30), at(0, 11)), (at(3, 3), at(3, 5, 15))]
+
+def test_plan_ranges_without_rollups():
+    assert plan_ranges(at(0, 10), at(2, 0), None, ("day", "hour")) == ([], [(at(0, 10), at(2, 0))])
+    assert plan_ranges(at(0, 10, 5), at(0, 10, 55), at(1, 0), ("day", "hour")) == ([], [(at(0, 10, 5), at(0, 10, 55))])
+    # Agentes: só rollups diários; as horas das bordas vêm das interações
+    assert plan_ranges(at(0, 10), at(2, 6), at(3, 0), ("day",)) == (
+        [("day", at(1, 0), at(2, 0))],
+        [(at(0, 10), at(1, 0)), (at(2, 0), at(2, 6))],
+    )
+
+def make_rows(n_rows=1500, days=2, seed=21):
+    rng = np.random.default_rng(seed)
+    minutes = np.sort(rng.integers(0, days * 24 * 60, n_rows))
+    return [
+        {
+            "id": f"conv-{row}:s:0",
+            "conversation_id": f"conv-{row}",
+            "customer_id": f"cust-{rng.integers(0, 300)}",
+            "agent_id": f"agent-{row % 7}",
+            "queue_id": f"queue-{row % 3}",
+            "channel_type": "voice" if row % 4 else "message",
+            "status": "abandoned" if row % 9 == 0 else "answered",
+            "reason": f"reason-{row % 5}",
+            "start_time": DAY + timedelta(minutes=int(minute)),
+            "end_time": DAY + timedelta(minutes=int(minute) + 5),
+            "wait_time": float(rng.exponential(30)),
+            "talk_time": float(rng.exponential(200))
+        }
+        for row, minute in enumerate(minutes)
+    ]
+
+def test_build_rollups_hourly_and_daily():
+    rows = [
+        {"id": "c1:s:0", "conversation_id": "c1", "agent_id": "a1", "queue_id": "q1", "channel_type": "voice", "start_time": at(0, 9, 10), "status": "answered", "wait_time": 5.0},
+        {"id": "c2:s:0", "conversation_id": "c2", "agent_id": "a1", "queue_id": "q1", "channel_type": "voice", "start_time": at(0, 9, 40), "status": "answered", "wait_time": 50.0},
+        {"id": "c3:s:0", "conversation_id": "c3", "agent_id": "a2", "queue_id": "q2", "channel_type": "message", "start_time": at(0, 9, 50), "status": "abandoned"},
+        {"id": "c4:s:0", "conversation_id": "c4", "agent_id": "a2", "queue_id": "q1", "channel_type": "voice", "start_time": at(0, 10, 5), "status": "answered", "wait_time": 10.0},
+    ]
+    queue_rows, agent_rows = RollupMaterializer.build_rollups(DAY, InteractionBatch.from_records(rows))
+
+    hourly = {(r.date, r.queue_id, r.channel_type): r for r in queue_rows if r.granularity == "hour"}
+    daily = {(r.queue_id, r.channel_type): r for r in queue_rows if r.granularity == "day"}
+    assert set(hourly) == {(at(0, 9), "q1", "voice"), (at(0, 9), "q2", "message"), (at(0, 10), "q1", "voice")}
+    assert hourly[(at(0, 9), "q1", "voice")].total_interactions == 2
+    assert set(daily) == {("q1", "voice"), ("q2", "message")}
+    assert {r.date for r in daily.values()} == {DAY}
+    assert daily[("q1", "voice")].total_interactions == 3
+    assert daily[("q1", "voice")].service_level == pytest.approx(200 / 3)
+    assert daily[("q2", "message")].abandoned_interactions == 1
+    # O estado diário é a combinação dos horários
+    merged = KPIAggregate.from_state(hourly[(at(0, 9), "q1", "voice")].aggregate_state).merge(
+        KPIAggregate.from_state(hourly[(at(0, 10), "q1", "voice")].aggregate_state)
+    )
+    assert daily[("q1", "voice")].aggregate_state == merged.to_state()
+
+    agents = {(r.agent_id, r.channel_type): r for r in agent_rows}
+    assert {key: r.total_interactions for key, r in agents.items()} == {("a1", "voice"): 2, ("a2", "message"): 1, ("a2", "voice"): 1}
+    assert {r.granularity for r in agent_rows} == {"day"}
+
+def rollup_days(repository, model=QueueMetrics):
+    with repository.session_factory() as session:
+        return session.execute(select(model.date, model.queue_id).where(model.granularity == "day")).all()
+
+def test_run_once_rematerializes_changed_days(repository, monkeypatch):
+    repository.upsert_interactions(make_rows())
+    now = floor_time(datetime.utcnow(), "hour") + timedelta(hours=3, minutes=5)
+    materializer = RollupMaterializer(repository)
+    materialized = []
+    materialize_day = materializer.materialize_day
+
+    async def spy(day):
+        materialized.append(day)
+        return await materialize_day(day)
+
+    monkeypatch.setattr(materializer, "materialize_day", spy)
+
+    first = asyncio.run(materializer.run_once(now))
+    assert materialized == [at(0, 0), at(1, 0)]
+    assert first["coverage_end"] == floor_time(now, "hour")
+    assert all(queue != "queue-9" for _, queue in rollup_days(repository))
+    # O backfill lê direto do banco, sem ocupar o cache de blocos dos dashboards
+    assert len(repository.cache._blocks) == 0
+
+    # Uma interação do segundo dia foi atualizada pela sincronização depois do primeiro ciclo
+    changed = repository.query_interactions(at(1, 12), at(1, 13)).to_records()[0]
+    repository.upsert_interactions([{**changed, "queue_id": "queue-9"}])
+    with repository.session_factory() as session:
+        session.execute(update(Interaction).where(Interaction.id == changed["id"]).values(updated_at=now + timedelta(minutes=1)))
+        session.commit()
+
+    materialized.clear()
+    second = asyncio.run(materializer.run_once(now + timedelta(minutes=20)))
+    assert materialized == [at(1, 0)]
+    assert second["days"] == 1
+    assert (at(1, 0), "queue-9") in rollup_days(repository)
+    assert (at(0, 0), "queue-9") not in rollup_days(repository)
+
+def overviews(aggregates):
+    return {key: aggregate.to_overview(top_n=20) for key, aggregate in aggregates.items()}
+
+def assert_same_aggregates(actual, expected):
+    actual, expected = overviews(actual), overviews(expected)
+    assert actual.keys() == expected.keys()
+    for key, overview in expected.items():
+        for name, value in overview.items():
+            if name in ("percentiles", "top_reasons"):
+                assert actual[key][name] == value, (key, name)
+            else:
+                assert actual[key][name] == pytest.approx(value), (key, name)
+
+def test_rollups_plus_raw_edges_match_the_raw_rows(repository):
+    rows = make_rows()
+    repository.upsert_interactions(rows)
+    asyncio.run(RollupMaterializer(repository).run_once(floor_time(datetime.utcnow(), "hour")))
+    access = DataAccessService(repository)
+    batch = InteractionBatch.from_records(rows)
+
+    start_date, end_date = at(0, 21, 30), at(1, 2, 45)
+    result = asyncio.run(access.get_queue_aggregates(start_date, end_date))
+    assert_same_aggregates(result.aggregates, KPIAggregate.group_by(batch.between(start_date, end_date), "queue_id"))
+
+    start_date, end_date = at(0, 6, 20), at(2, 0)
+    result = asyncio.run(access.get_agent_aggregates(start_date, end_date))
+    assert_same_aggregates(result.aggregates, KPIAggregate.group_by(batch.between(start_date, end_date), "agent_id"))
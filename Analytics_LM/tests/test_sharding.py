@@ -0,0 +1,76 @@
+from datetime import datetime
+from app.services.genesys.client import GenesysService
+from app.services.genesys.sharding import ShardPlanner
+
+def assert_contiguous(shards, start, end):
+    # Intervalos semiabertos [início, fim): cada shard começa onde o anterior termina
+    assert shards[0][0] == start and shards[-1][1] == end
+    for (_, previous_end), (next_start, _) in zip(shards, shards[1:]):
+        assert previous_end == next_start
+    assert all(shard_start < shard_end for shard_start, shard_end in shards)
+
+def test_inner_boundaries_are_whole_hours():
+    planner = ShardPlanner(expected_per_hour=100, max_per_shard=250)
+    start, end = datetime(2024, 3, 1, 8, 20), datetime(2024, 3, 1, 13, 45)
+    shards = planner.plan(start, end)
+    assert_contiguous(shards, start, end)
+    assert shards == [
+        (datetime(2024, 3, 1, 8, 20), datetime(2024, 3, 1, 10)),
+        (datetime(2024, 3, 1, 10), datetime(2024, 3, 1, 12)),
+        (datetime(2024, 3, 1, 12), datetime(2024, 3, 1, 13, 45)),
+    ]
+
+def test_shards_never_cross_midnight():
+    planner = ShardPlanner(expected_per_hour=1, max_per_shard=1000)
+    start, end = datetime(2024, 3, 1, 20), datetime(2024, 3, 3, 2)
+    shards = planner.plan(start, end)
+    assert_contiguous(shards, start, end)
+    assert shards == [
+        (datetime(2024, 3, 1, 20), datetime(2024, 3, 2)),
+        (datetime(2024, 3, 2), datetime(2024, 3, 3)),
+        (datetime(2024, 3, 3), datetime(2024, 3, 3, 2)),
+    ]
+
+def test_peak_hours_get_their_own_shard():
+    planner = ShardPlanner(expected_per_hour=50, max_per_shard=400, hourly_profile={9: 400, 10: 400})
+    start, end = datetime(2024, 3, 1, 6), datetime(2024, 3, 1, 14)
+    shards = planner.plan(start, end)
+    assert_contiguous(shards, start, end)
+    assert (datetime(2024, 3, 1, 9), datetime(2024, 3, 1, 10)) in shards
+    assert (datetime(2024, 3, 1, 10), datetime(2024, 3, 1, 11)) in shards
+
+def test_shard_length_is_capped():
+    planner = ShardPlanner(expected_per_hour=1, max_per_shard=1000, max_shard_hours=4)
+    shards = planner.plan(datetime(2024, 3, 1), datetime(2024, 3, 1, 10))
+    assert [(e - s).total_seconds() / 3600 for s, e in shards] == [4, 4, 2]
+
+def test_empty_range_has_no_shards():
+    planner = ShardPlanner(expected_per_hour=1, max_per_shard=10)
+    assert planner.plan(datetime(2024, 3, 1, 5), datetime(2024, 3, 1, 5)) == []
+
+def row(conversation_id, segment, start_time, queue_id="q1"):
+    return {
+        "id": f"{conversation_id}:s1:{segment}",
+        "conversation_id": conversation_id,
+        "start_time": start_time,
+        "queue_id": queue_id,
+    }
+
+def test_merge_keeps_conversations_spanning_shards_once():
+    # c2 começa no primeiro shard e ainda aparece no segundo
+    first = {
+        "c1": [row("c1", 0, datetime(2024, 3, 1, 9, 50))],
+        "c2": [row("c2", 0, datetime(2024, 3, 1, 9, 55)), row("c2", 1, datetime(2024, 3, 1, 10, 5), "q2")],
+    }
+    second = {
+        "c2": [row("c2", 0, datetime(2024, 3, 1, 9, 55))],
+        "c3": [row("c3", 0, datetime(2024, 3, 1, 10, 1))],
+        "c4": [],
+    }
+    batch = GenesysService._merge_shards([second, first])
+    ids = batch.column("id").tolist()
+    assert ids == ["c1:s1:0", "c2:s1:0", "c3:s1:0"]
+
+    # A primeira ocorrência vence, e a ordem não depende da ordem dos shards
+    batch = GenesysService._merge_shards([first, second])
+    assert batch.column("id").tolist() == ["c1:s1:0", "c2:s1:0", "c2:s1:1", "c3:s1:0"]
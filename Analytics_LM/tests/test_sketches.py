@@ -0,0 +1,217 @@
+import json
+from collections import Counter
+import numpy as np
+import pytest
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.metrics import KPIAggregate
+from app.services.analytics.sketches import DDSketch, HyperLogLog, SpaceSaving, WaitHistogram
+
+def customers(first, last):
+    return [f"cust-{i}" for i in range(first, last)]
+
+def test_hll_is_exact_up_to_the_limit():
+    sketch = HyperLogLog(precision=12, exact_limit=512)
+    sketch.add(customers(0, 300)).add(customers(200, 512)).add(customers(0, 512))
+    assert sketch.is_exact
+    assert sketch.count() == 512
+
+    sketch.add(customers(512, 513))
+    assert not sketch.is_exact
+    assert abs(sketch.count() - 513) <= 513 * 0.05
+
+@pytest.mark.parametrize("n", [2_000, 20_000, 200_000])
+def test_hll_error_bound_above_the_limit(n):
+    sketch = HyperLogLog(precision=12).add(customers(0, n))
+    # Erro padrão 1.04 / sqrt(4096) ~ 1.6%: quatro erros padrão
+    assert abs(sketch.count() - n) <= 4 * 1.04 / np.sqrt(4096) * n
+    assert sketch.nbytes == 4096
+
+def test_hll_merge_is_the_union():
+    a = HyperLogLog().add(customers(0, 6_000))
+    b = HyperLogLog().add(customers(4_000, 10_000))
+    union = a.merge(b)
+    assert np.array_equal(union._registers, b.merge(a)._registers)
+    assert np.array_equal(union._registers, HyperLogLog().add(customers(0, 10_000))._registers)
+    # merge não altera os operandos
+    assert a.count() == HyperLogLog().add(customers(0, 6_000)).count()
+
+    # Dois contadores exatos cuja união passa do limite
+    small = HyperLogLog(exact_limit=512).add(customers(0, 400))
+    other = HyperLogLog(exact_limit=512).add(customers(300, 700))
+    merged = small.merge(other)
+    assert not merged.is_exact
+    assert np.array_equal(merged._registers, HyperLogLog(exact_limit=512).add(customers(0, 700))._registers)
+    assert small.merge(HyperLogLog().add(customers(350, 450))).count() == 450
+
+def test_hll_state_round_trip():
+    for sketch in (HyperLogLog().add(customers(0, 100)), HyperLogLog().add(customers(0, 5_000))):
+        restored = HyperLogLog.from_state(json.loads(json.dumps(sketch.to_state())))
+        assert restored.is_exact == sketch.is_exact
+        assert restored.count() == sketch.count()
+        assert restored.to_state() == sketch.to_state()
+
+def test_hll_precisions_do_not_merge():
+    with pytest.raises(ValueError):
+        HyperLogLog(precision=12).update(HyperLogLog(precision=10))
+
+def space_saving_bounds_hold(sketch, truth):
+    # Cada contagem é limite superior, com erro de no máximo errors[item]
+    for item, count in sketch.counts.items():
+        assert count - sketch.errors[item] <= truth.get(item, 0) <= count
+
+def test_space_saving_is_exact_below_capacity():
+    stream = ["b", "a", "b", "c", "a", "b", "d"]
+    sketch = SpaceSaving(capacity=4)
+    for item in stream:
+        sketch.add(item)
+    assert sketch.is_exact
+    assert sketch.counts == Counter(stream)
+    assert set(sketch.errors.values()) == {0}
+    assert sketch.top(2) == [("b", 3), ("a", 2)]
+
+def test_space_saving_add_past_capacity():
+    stream = ["a"] * 5 + ["b"] * 3 + ["c", "d", "e", "a", "f"]
+    sketch = SpaceSaving(capacity=3)
+    for item in stream:
+        sketch.add(item)
+    assert not sketch.is_exact
+    assert len(sketch.counts) == 3
+    # "f" herda a contagem do menor contador ("b", 3) como erro
+    assert sketch.top(2) == [("a", 6), ("f", 4)]
+    assert sketch.errors["f"] == 3
+    space_saving_bounds_hold(sketch, Counter(stream))
+
+def test_space_saving_add_counts():
+    counts = {"a": 5, "b": 2, "c": 9}
+    sketch = SpaceSaving(capacity=10).add_counts(counts).add_counts({"b": 4, "d": 1})
+    assert sketch.counts == {"a": 5, "b": 6, "c": 9, "d": 1}
+    assert sketch.is_exact
+
+    # Acima da capacidade ficam os mais frequentes
+    small = SpaceSaving(capacity=2).add_counts(counts)
+    assert small.counts == {"c": 9, "a": 5}
+    assert not small.is_exact
+
+def test_space_saving_merge():
+    first, second = Counter("aaaabbbcd"), Counter("bbbbeeeaf")
+    merged = SpaceSaving(capacity=10).add_counts(first).merge(SpaceSaving(capacity=10).add_counts(second))
+    assert merged.is_exact
+    assert merged.counts == first + second
+
+    rng = np.random.default_rng(3)
+    parts = [Counter(f"reason-{v}" for v in rng.zipf(1.3, 3000) % 60) for _ in range(4)]
+    sketches = [SpaceSaving(capacity=15).add_counts(part) for part in parts]
+    merged = sketches[0].merge(sketches[1]).merge(sketches[2].merge(sketches[3]))
+    truth = sum(parts, Counter())
+    space_saving_bounds_hold(merged, truth)
+    # Os itens frequentes (acima de total / capacidade) nunca se perdem
+    heavy = [item for item, count in truth.items() if count > sum(truth.values()) / 15]
+    assert heavy and all(item in merged.counts for item in heavy)
+    # merge não altera os operandos
+    assert sketches[0].counts == SpaceSaving(capacity=15).add_counts(parts[0]).counts
+
+def test_space_saving_ties_keep_first_appearance():
+    sketch = SpaceSaving(capacity=10)
+    for item in ["c", "a", "b", "a", "c", "b"]:
+        sketch.add(item)
+    assert sketch.top() == [("c", 2), ("a", 2), ("b", 2)]
+    merged = SpaceSaving(capacity=10).add_counts({"x": 2, "a": 1}).merge(sketch)
+    assert merged.top() == [("a", 3), ("x", 2), ("c", 2), ("b", 2)]
+
+def test_space_saving_state_round_trip():
+    sketch = SpaceSaving(capacity=3)
+    for item in "aaabbcdde":
+        sketch.add(item)
+    restored = SpaceSaving.from_state(json.loads(json.dumps(sketch.to_state())))
+    assert restored.counts == sketch.counts and restored.errors == sketch.errors
+    assert restored.is_exact == sketch.is_exact
+    assert restored.top() == sketch.top()
+
+def waits(n=20_000, seed=5):
+    rng = np.random.default_rng(seed)
+    values = rng.exponential(90, n).round(1)
+    # Valores exatamente nos limites, esperas zeradas e vazias
+    values[:300] = rng.choice(WaitHistogram.EDGES[:80], 300)
+    values[300:400] = 0
+    values[400:450] = np.nan
+    return values
+
+def test_histogram_is_exact_at_bin_edges():
+    values = waits()
+    histogram = WaitHistogram.from_values(values)
+    assert histogram.total == np.count_nonzero(~np.isnan(values))
+    for target in list(WaitHistogram.EDGES[:90]) + [20, 60, 120, 320]:
+        assert histogram.count_at_most(target) == np.count_nonzero(values <= target), target
+    assert histogram.count_at_most(-1) == 0
+    assert histogram.count_at_most(10 ** 7) == histogram.total
+
+def test_histogram_interpolates_inside_a_bin():
+    values = waits()
+    histogram = WaitHistogram.from_values(values)
+    for target in (33.0, 50.5, 100.0, 250.0, 1000.0):
+        bin_count = histogram.counts[WaitHistogram.bin_index(np.array([target]))[0]]
+        assert abs(histogram.count_at_most(target) - np.count_nonzero(values <= target)) <= bin_count
+
+def test_service_level_at_any_target():
+    values = waits(4000)
+    batch = InteractionBatch.from_records([
+        {"id": f"c{i}:s:0", "conversation_id": f"c{i}", "status": "answered", "wait_time": float(value)}
+        for i, value in enumerate(values)
+    ])
+    aggregate = KPIAggregate.from_batch(batch, target_seconds=20)
+    for target in (0, 10, 20, 30, 64, 96):
+        assert aggregate.service_level_at(target) == pytest.approx(np.count_nonzero(values <= target) / len(values) * 100)
+
+def test_histograms_merge_and_round_trip():
+    values = waits()
+    first, second = WaitHistogram.from_values(values[:7000]), WaitHistogram.from_values(values[7000:])
+    merged = first.merge(second)
+    assert np.array_equal(merged.counts, WaitHistogram.from_values(values).counts)
+    assert first.total == np.count_nonzero(~np.isnan(values[:7000]))
+
+    restored = WaitHistogram.from_state(json.loads(json.dumps(merged.to_state())))
+    assert np.array_equal(restored.counts, merged.counts)
+    curve = restored.cumulative()
+    assert curve[-1][1] == merged.total
+    assert all(count == np.count_nonzero(values <= edge) for edge, count in curve[:60])
+
+def exact_quantile(values, q):
+    # Mesmo posto do DDSketch: o valor na posição floor(q * (n - 1)) da amostra ordenada
+    ordered = np.sort(values[~np.isnan(values)])
+    return ordered[int(np.floor(q * (len(ordered) - 1)))]
+
+@pytest.mark.parametrize("alpha", [0.01, 0.05])
+def test_ddsketch_quantiles_within_relative_accuracy(alpha):
+    rng = np.random.default_rng(9)
+    values = np.concatenate([rng.lognormal(3, 1.5, 50_000), np.zeros(2_000), [np.nan] * 10])
+    sketch = DDSketch.from_values(values, alpha)
+    assert sketch.count == 52_000
+    for q in (0, 0.01, 0.03, 0.05, 0.25, 0.5, 0.9, 0.95, 0.99, 0.999, 1):
+        exact = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - exact) <= alpha * exact + 1e-9, q
+    assert DDSketch(alpha).quantile(0.5) == 0.0
+
+def test_ddsketch_merge_and_grouped():
+    rng = np.random.default_rng(4)
+    values = rng.exponential(200, 9_000)
+    values[::50] = 0
+    parts = np.array_split(values, 3)
+    merged = DDSketch.from_values(parts[0]).merge(DDSketch.from_values(parts[1])).update(DDSketch.from_values(parts[2]))
+    assert merged.to_state() == DDSketch.from_values(values).to_state()
+    assert merged.quantiles() == DDSketch.from_values(values).quantiles()
+
+    codes = rng.integers(0, 4, len(values))
+    grouped = DDSketch.grouped(codes, values, 5)
+    for code in range(5):
+        assert grouped[code].to_state() == DDSketch.from_values(values[codes == code]).to_state()
+    assert grouped[4].count == 0
+
+def test_ddsketch_state_round_trip():
+    sketch = DDSketch.from_values(np.random.default_rng(2).lognormal(2, 1, 1_000))
+    restored = DDSketch.from_state(json.loads(json.dumps(sketch.to_state())))
+    assert restored.to_state() == sketch.to_state()
+    assert restored.quantiles() == sketch.quantiles()
+
+def test_ddsketch_accuracies_do_not_merge():
+    with pytest.raises(ValueError):
+        DDSketch(0.01).update(DDSketch(0.02))
@@ -0,0 +1,155 @@
+import asyncio
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from app.services.analytics.batch import InteractionBatch
+from app.services.analytics.buckets import bucketize
+from app.services.analytics.metrics import KPIAggregate, MetricsService
+from app.services.analytics.streaming import PeriodAccumulator, StreamingAggregator
+
+START = datetime(2024, 2, 5, 13, 17)
+TZ = "America/Sao_Paulo"
+TARGETS = [10, 20, 60]
+
+def make_rows(n_rows=5000, days=33, seed=17):
+    rng = np.random.default_rng(seed)
+    minutes = np.sort(rng.integers(0, days * 24 * 60, n_rows))
+    wait_time = rng.exponential(40, n_rows).round(1)
+    wait_time[rng.random(n_rows) < 0.05] = np.nan
+    return [
+        {
+            "id": f"conv-{row}:s:0",
+            "conversation_id": f"conv-{row}",
+            # Poucos clientes: o mesmo cliente volta em blocos diferentes da mesma semana
+            "customer_id": None if customer == 0 else f"cust-{customer}",
+            "agent_id": f"agent-{row % 23}",
+            "queue_id": None if row % 29 == 0 else f"queue-{row % 4}",
+            "channel_type": "voice" if row % 3 else "message",
+            "status": "abandoned" if row % 7 == 0 else "answered",
+            "reason": f"reason-{rng.integers(0, 15)}",
+            "start_time": START + timedelta(minutes=int(minute), seconds=int(second)),
+            "wait_time": float(wait),
+            "talk_time": float(rng.exponential(250))
+        }
+        for row, customer, minute, second, wait in zip(
+            range(n_rows), rng.integers(0, 350, n_rows), minutes, rng.integers(0, 60, n_rows), wait_time
+        )
+    ]
+
+def make_chunks(batch, n_chunks=11, seed=3):
+    # Cortes em posições quaisquer (meio de hora, de dia e de semana), blocos de tamanhos diferentes
+    cuts = np.sort(np.random.default_rng(seed).choice(np.arange(1, len(batch)), n_chunks - 1, replace=False))
+    bounds = np.concatenate(([0], cuts, [len(batch)]))
+    return [batch.take(slice(int(start), int(end))) for start, end in zip(bounds[:-1], bounds[1:])]
+
+def bucket_starts(chunk, period):
+    buckets = bucketize(chunk.column("start_time"), period, TZ)
+    return set(buckets.starts[np.unique(buckets.ids[buckets.ids >= 0])].astype(np.int64).tolist())
+
+def assert_same_aggregate(actual, expected):
+    actual, expected = actual.to_overview(top_n=20, targets=TARGETS), expected.to_overview(top_n=20, targets=TARGETS)
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if key in ("percentiles", "top_reasons"):
+            assert actual[key] == value, key
+        else:
+            assert actual[key] == pytest.approx(value), key
+
+def assert_same_series(actual, expected):
+    assert actual.keys() == expected.keys()
+    for name in ("timestamps", "total_customers", "total_received_calls", "total_answered_calls"):
+        assert actual[name] == expected[name], name
+    for name in ("tma", "tme"):
+        assert actual[name] == pytest.approx(expected[name]), name
+
+@pytest.mark.parametrize("period", ["15min", "H", "D", "W"])
+def test_period_accumulator_matches_compute_period_series(period):
+    batch = InteractionBatch.from_records(make_rows())
+    chunks = make_chunks(batch)
+    accumulator = PeriodAccumulator(period, TZ)
+    for chunk in chunks:
+        accumulator.add(chunk)
+    # Buckets que atravessam o corte entre blocos (todos os cortes, nos dias e semanas)
+    shared = [bool(bucket_starts(a, period) & bucket_starts(b, period)) for a, b in zip(chunks, chunks[1:])]
+    assert all(shared) if period in ("D", "W") else any(shared)
+    assert_same_series(accumulator.series(), MetricsService.compute_period_series(batch, period, TZ))
+
+def test_weeks_stay_open_across_chunks():
+    batch = InteractionBatch.from_records(make_rows())
+    chunks = make_chunks(batch, n_chunks=20)
+    accumulator = PeriodAccumulator("W", TZ)
+    open_for = {}
+    for chunk in chunks:
+        accumulator.add(chunk)
+        for start in accumulator._open_customers:
+            open_for[start] = open_for.get(start, 0) + 1
+    # Cada semana recebe linhas de vários blocos antes de ter os clientes fechados
+    assert max(open_for.values()) >= 4
+    assert accumulator.customers
+    expected = MetricsService.compute_period_series(batch, "W", TZ)
+    assert accumulator.series()["total_customers"] == expected["total_customers"]
+    assert sum(expected["total_customers"]) > MetricsService.get_total_customers(batch)
+
+async def stream(chunks):
+    for chunk in chunks:
+        yield chunk
+
+def test_streaming_aggregator_matches_full_batch():
+    batch = InteractionBatch.from_records(make_rows())
+    report = asyncio.run(StreamingAggregator(target_seconds=30, period="D", tz=TZ).consume(stream(make_chunks(batch))))
+    assert report.rows == len(batch)
+
+    assert_same_aggregate(report.overview, KPIAggregate.from_batch(batch, target_seconds=30))
+    overview = report.overview.to_overview(targets=TARGETS)
+    expected = MetricsService.compute_overview(batch, target_seconds=30, targets=TARGETS)
+    assert overview.keys() == expected.keys()
+    assert overview["total_customers"] == expected["total_customers"]
+    assert overview["service_level"] == pytest.approx(expected["service_level"])
+    assert_same_series(report.periods.series(), MetricsService.compute_period_series(batch, "D", TZ))
+
+    for column, aggregates in (("queue_id", report.queues), ("agent_id", report.agents)):
+        expected = KPIAggregate.group_by(batch, column, target_seconds=30)
+        assert set(aggregates) == set(expected)
+        for key, aggregate in expected.items():
+            assert_same_aggregate(aggregates[key], aggregate)
+
+def test_streaming_rows_match_queue_and_agent_metrics():
+    batch = InteractionBatch.from_records(make_rows())
+    report = StreamingAggregator(period="H", tz=TZ)
+    for chunk in make_chunks(batch):
+        report.add(chunk)
+
+    queues = {row.queue_id: row for row in MetricsService.calculate_queue_metrics(batch, START, START, targets=TARGETS)}
+    assert set(queues) == set(report.queues)
+    for key, aggregate in report.queues.items():
+        row = MetricsService.build_queue_metrics(key, aggregate, START, targets=TARGETS)
+        expected = queues[key]
+        assert (row.total_interactions, row.answered_interactions, row.abandoned_interactions) == (
+            expected.total_interactions, expected.answered_interactions, expected.abandoned_interactions
+        )
+        assert row.average_wait_time == pytest.approx(expected.average_wait_time)
+        assert row.service_level == pytest.approx(expected.service_level)
+        assert row.wait_histogram == expected.wait_histogram
+        assert row.service_level_curve == pytest.approx(expected.service_level_curve)
+
+    agents = {row.agent_id: row for row in MetricsService.calculate_agent_metrics(batch, [], START, START)}
+    assert set(agents) == set(report.agents)
+    for key, aggregate in report.agents.items():
+        row = MetricsService.build_agent_metrics(key, aggregate, START)
+        expected = agents[key]
+        assert (row.total_interactions, row.answered_interactions) == (expected.total_interactions, expected.answered_interactions)
+        for name in ("average_handle_time", "average_wait_time", "average_talk_time", "service_level"):
+            assert getattr(row, name) == pytest.approx(getattr(expected, name)), name
+
+def test_streamed_from_the_repository(repository):
+    rows = make_rows(2000, days=10)
+    repository.upsert_interactions(rows)
+    batch = InteractionBatch.from_records(rows)
+    start_date, end_date = START + timedelta(days=1, hours=5), START + timedelta(days=9)
+    chunks = repository.stream_interactions(start_date, end_date, chunk_rows=137)
+    report = asyncio.run(StreamingAggregator(period="W", tz=TZ).consume(chunks))
+
+    expected = batch.between(start_date, end_date)
+    assert report.rows == len(expected)
+    assert_same_aggregate(report.overview, KPIAggregate.from_batch(expected))
+    assert_same_series(report.periods.series(), MetricsService.compute_period_series(expected, "W", TZ))
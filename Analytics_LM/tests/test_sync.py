@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime, timedelta
+from app.services.analytics.batch import InteractionBatch
+from app.services.storage.sync import SyncService
+
+class StubRepository:
+    def __init__(self):
+        self.watermark = None
+
+    def get_watermark(self, source):
+        return self.watermark
+
+    def save_watermark(self, source, last_conversation_end, synced_at):
+        self.watermark = type("Watermark", (), {"last_conversation_end": last_conversation_end})()
+
+    def get_oldest_open_start(self, since):
+        return None
+
+    async def get_interactions(self, **filters):
+        return InteractionBatch.empty()
+
+    async def save_interactions(self, interactions):
+        return len(interactions)
+
+class StubGenesys:
+    """
+    A primeira busca demora e traz a conversa que termina mais tarde
+    """
+    def __init__(self, ends):
+        self.ends = list(ends)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_interactions(self, **filters):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        end = self.ends.pop(0)
+        await asyncio.sleep(0.05 if end == max([end] + self.ends) else 0)
+        self.in_flight -= 1
+        return InteractionBatch.from_records([{
+            "id": f"conv-{end:%H%M}:s:0",
+            "conversation_id": f"conv-{end:%H%M}",
+            "start_time": end - timedelta(minutes=5),
+            "end_time": end
+        }])
+
+def test_instances_share_the_sync_lock():
+    later, earlier = datetime(2024, 3, 1, 12, 30), datetime(2024, 3, 1, 12, 10)
+    repository = StubRepository()
+    genesys = StubGenesys([later, earlier])
+    # Uma instância para o laço de background e outra para o endpoint, como na aplicação
+    background = SyncService(genesys_service=genesys, repository=repository)
+    endpoint = SyncService(genesys_service=genesys, repository=repository)
+
+    async def main():
+        now = datetime(2024, 3, 1, 13, 0)
+        await asyncio.gather(background.sync_once(now), endpoint.sync_once(now))
+
+    asyncio.run(main())
+    assert genesys.max_in_flight == 1
+    # O watermark nunca volta: fica no maior fim visto pelas duas execuções
+    assert repository.watermark.last_conversation_end == later